@@ -1,83 +1,125 @@
 #!/bin/bash
-# Bash completion function
-_command_completion() {
-    local cur prev words cword
-    _init_completion -s || return
+# Bash completion for foco. The commands, their flags and the kind of values they take are read from an index that
+# is generated by tools/utilities/completionIndex.py and only rebuilt when the tools directory changes.
 
-    # Specify the command name
-    COMMAND_NAME="foco"
+# Find the tools directory relative to the completion script (resolved once, when the script is sourced)
+FOCO_TOOL_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../tools" 2>/dev/null && pwd)"
+FOCO_INDEX_FILE="${XDG_CACHE_HOME:-$HOME/.cache}/foco/completionIndex.bash"
+FOCO_INDEX_LOADED=""
+# Time directories: integers, decimals and exponents such as 0, 0.005 or 1e-05
+FOCO_TIME_PATTERN='^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$'
 
-    # Find the completion script's directory
-    COMPLETION_DIR="$(dirname "${BASH_SOURCE[0]}")"
+# Load the index, rebuilding it first if a tool was added, removed or renamed since it was generated
+_foco_load_index() {
+    if [[ ! -f "$FOCO_INDEX_FILE" || "$FOCO_TOOL_DIR" -nt "$FOCO_INDEX_FILE" ]]; then
+        python3 "$FOCO_TOOL_DIR/utilities/completionIndex.py" "$FOCO_INDEX_FILE" 2>/dev/null || return 1
+        FOCO_INDEX_LOADED=""
+    fi
+    if [[ -z "$FOCO_INDEX_LOADED" ]]; then
+        source "$FOCO_INDEX_FILE" || return 1
+        FOCO_INDEX_LOADED=1
+    fi
+}
 
-    # Set the base directory relative to the completion script
-    BASE_DIR="$COMPLETION_DIR/.."
+# Time directories of the case, or of processor0 for a decomposed case without reconstructed times
+_foco_times() {
+    local directory time times=()
+    for directory in . processor0; do
+        for time in "$directory"/*/; do
+            time="${time%/}"
+            time="${time##*/}"
+            [[ "$time" =~ $FOCO_TIME_PATTERN ]] && times+=("$time")
+        done
+        (( ${#times[@]} )) && break
+    done
+    printf '%s\n' "${times[@]}"
+}
 
-    # Set the command path relative to the completion script
-    COMMAND_PATH="$BASE_DIR/$COMMAND_NAME"
+# Fields of the initial and the latest time directory
+_foco_fields() {
+    local latest field fields=()
+    latest="$(_foco_times | sort -g | tail -n 1)"
+    for field in 0/* "$latest"/*; do
+        [[ -f "$field" ]] || continue
+        field="${field##*/}"
+        fields+=("${field%.gz}")
+    done
+    printf '%s\n' "${fields[@]}" | sort -u
+}
 
-    # Check if the script exists
-    if [ ! -f "$COMMAND_PATH" ]; then
-        echo "Error: command script not found at $COMMAND_PATH" >&2
-        return 1
-    fi
+# Patch names of the surfaces in constant/triSurface
+_foco_patches() {
+    local surface
+    for surface in constant/triSurface/*.{stl,STL,obj,vtk}; do
+        [[ -f "$surface" ]] || continue
+        surface="${surface##*/}"
+        echo "${surface%.*}"
+    done
+}
 
-    # Set tool directory
-    TOOL_DIR="$BASE_DIR/tools"
+# Complete a value of the given kind (see completionIndex.py)
+_foco_complete_value() {
+    local hint="${1%...}" cur="$2"
+    case "$hint" in
+        time)      COMPREPLY=($(compgen -W "$(_foco_times)" -- "$cur")) ;;
+        field)     COMPREPLY=($(compgen -W "$(_foco_fields)" -- "$cur")) ;;
+        patch)     COMPREPLY=($(compgen -W "$(_foco_patches)" -- "$cur")) ;;
+        stl)       compopt -o filenames; COMPREPLY=($(compgen -f -X '!*.[sS][tT][lL]' -- "$cur") $(compgen -d -- "$cur")) ;;
+        file)      compopt -o filenames; COMPREPLY=($(compgen -f -- "$cur")) ;;
+        directory) compopt -o filenames; COMPREPLY=($(compgen -d -- "$cur")) ;;
+        words:*)   local choices="${hint#words:}"; COMPREPLY=($(compgen -W "${choices//,/ }" -- "$cur")) ;;
+        *)         COMPREPLY=() ;;
+    esac
+}
 
-    # Check if tools directory exists
-    if [ ! -d "$TOOL_DIR" ]; then
-        echo "Error: Tools directory not found at $TOOL_DIR" >&2
-        return 1
-    fi
+_command_completion() {
+    local cur prev words cword
+    _init_completion -s || return
+    _foco_load_index || return 1
 
     # Command name completion (first argument)
-    if (( COMP_CWORD == 1 )); then
-        compopt -o nospace
-
-        # Get base filenames without extensions or directories
-        local tools
-        tools=$(find "$TOOL_DIR" -maxdepth 1 -type f \( ! -name ".*" \) -not -path "${TOOL_DIR}/utilities/*" \
-            -exec basename {} \; | sed -E 's/\.[^.]+$//')
+    if (( cword == 1 )); then
+        if [[ "$cur" == -* ]]; then
+            COMPREPLY=($(compgen -W "--batch --benchmark-imports" -- "$cur"))
+        else
+            COMPREPLY=($(compgen -W "$FOCO_COMMANDS" -- "$cur"))
+        fi
+        return
+    fi
 
-        COMPREPLY=($(compgen -W "$tools" -- "$cur"))
+    local cmd="${words[1]}"
+    # Flags, leaving out the ones that were already given
+    if [[ "$cur" == -* ]]; then
+        local flag flags=()
+        for flag in ${FOCO_FLAGS[$cmd]}; do
+            [[ " ${words[*]:2:cword-2} " == *" $flag "* ]] || flags+=("$flag")
+        done
+        COMPREPLY=($(compgen -W "${flags[*]}" -- "$cur"))
+        compopt -o nosort 2>/dev/null
         return
     fi
 
-    local cmd="${COMP_WORDS[1]}"
-    case "$cmd" in
-        estimateInternalFields|prepare)
-            # Available options with metadata
-            local opts=(
-                '-hydraulic_diameter'
-                '-free_stream_velocity'
-                '-kinematic_viscosity'
-                '-reynolds_number'
-                '-turb_intensity'
-                '-turb_kinetic_energy'
-                '-turb_length_scale'
-                '-turb_dissipation_rate'
-                '-specific_dissipation'
-                '-turb_viscosity'
-            )
-            # Filter used options using array operations
-            for existing_opt in "${COMP_WORDS[@]:2}"; do
-                for i in "${!opts[@]}"; do
-                    [[ "${opts[i]%%:*}" == "$existing_opt" ]] && unset -v 'opts[i]'
-                done
-            done
-            # Generate completion with descriptions
-            if [[ -n "$cur" ]]; then  # If user has started typing show matching options
-                COMPREPLY=($(printf '%s\n' "${opts[@]}" | compgen -W "$(printf '%s ' "${opts[@]}")" -- "$cur"))
-            else  # If user has not started typing show all options
-                COMPREPLY=("${opts[@]}")
-            fi
-            compopt -o nospace -o nosort
-            ;;
-        *)
-            COMPREPLY=()
-            ;;
-    esac
+    # Values: the words after a flag belong to it (all of them if it takes several values), the others are positionals
+    local i word hint="" positional=0
+    for (( i = 2; i < cword; i++ )); do
+        word="${words[i]}"
+        if [[ "$word" == -* ]]; then
+            hint="${FOCO_FLAG_HINTS[$cmd $word]}"
+        elif [[ -n "$hint" && "$hint" != *... ]]; then
+            hint=""
+        elif [[ -z "$hint" ]]; then
+            (( positional++ ))
+        fi
+    done
+    if [[ -z "$hint" ]]; then
+        local positionals=(${FOCO_POSITIONALS[$cmd]})
+        local count=${#positionals[@]}
+        if (( positional < count )); then
+            hint="${positionals[positional]}"
+        elif (( count )) && [[ "${positionals[count-1]}" == *... ]]; then
+            hint="${positionals[count-1]}"
+        fi
+    fi
+    _foco_complete_value "$hint" "$cur"
 }
 complete -o nospace -F _command_completion foco
-
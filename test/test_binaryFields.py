@@ -0,0 +1,192 @@
+"""Reading and editing field files in binary format, written in the layout of OpenFOAM: the count and the opening
+parenthesis of a list are on lines of their own (List<vector> \\nN\\n(<raw bytes>)\\n;) and the raw bytes contain
+arbitrary characters, e.g. ')', '}' and ';'."""
+
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+from generateInletTurbulence import inlet_velocity, write_inlet_values  # noqa: E402
+from reconstructFields import reconstruct_field  # noqa: E402
+from switchToDynamic import ROTATING_BOUNDARY_TYPE, switch_boundaries_in_file  # noqa: E402
+from utilities.classFieldFile import FieldFile  # noqa: E402
+from utilities.classFieldReader import FieldReader  # noqa: E402
+from utilities.classTimeIndex import TimeIndex  # noqa: E402
+
+HEADER = b"""FoamFile
+{
+    format      binary;
+    class       volVectorField;
+    arch        "LSB;label=32;scalar=64";
+    location    "0";
+    object      U;
+}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+dimensions      [0 1 -1 0 0 0 0];
+
+"""
+
+
+PROCESSOR_BOUNDARY = b"""FoamFile
+{
+    format      ascii;
+    class       polyBoundaryMesh;
+    location    "constant/polyMesh";
+    object      boundary;
+}
+
+2
+(
+    inlet
+    {
+        type            patch;
+        nFaces          0;
+        startFace       0;
+    }
+    procBoundary%dto%d
+    {
+        type            processor;
+        nFaces          0;
+        startFace       0;
+    }
+)
+"""
+
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, 3))
+
+
+def binary_list(values: np.ndarray, dtype: str = '<f8') -> bytes:
+    return f"\n{len(values)}\n(".encode() + values.astype(dtype).tobytes() + b")\n"
+
+
+def nonuniform(values: np.ndarray) -> bytes:
+    return f"nonuniform List<{'vector' if values.ndim > 1 else 'scalar'}> ".encode() + binary_list(values)
+
+
+def patch_value(faces: int, seed: int, scalar: bool = False) -> bytes:
+    """Entries of a fixedValue patch with a binary nonuniform value"""
+    values = random_vectors(faces, seed)
+    value = nonuniform(values[:, 0] if scalar else values)
+    return b"        type            fixedValue;\n        value           " + value + b";\n"
+
+
+def write_binary_field(path: str, values: np.ndarray, patches: dict[str, bytes]) -> bytes:
+    """Writes a binary vector (or scalar) field with the given values and patch entries. Returns the internalField"""
+    header = HEADER if values.ndim > 1 else HEADER.replace(b'volVectorField', b'volScalarField')
+    internal_field = b"internalField   " + nonuniform(values) + b";"
+    boundary = b"".join(b"    %s\n    {\n%s    }\n" % (name.encode(), entries) for name, entries in patches.items())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(header + internal_field + b"\n\nboundaryField\n{\n" + boundary + b"}\n\n\n// ***** //\n")
+    return internal_field
+
+
+class BinaryFieldFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory(prefix='foco-test-binary.')
+        self.path = os.path.join(self.directory.name, 'U')
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_field_file_spans(self):
+        patches = {'inlet': b"        type            fixedValue;\n        value           uniform (1 0 0);\n",
+                   'outlet': b"        type            zeroGradient;\n"}
+        for seed in range(20):
+            internal_field = write_binary_field(self.path, random_vectors(1000, seed), patches)
+            field_file = FieldFile(self.path)
+            self.assertEqual(field_file.read_section('internalField'), internal_field)
+            boundary = field_file.read_text('boundaryField')
+            self.assertTrue(boundary.startswith('boundaryField') and boundary.endswith('}'))
+            self.assertIn('outlet', boundary)
+
+
+    def test_switch_to_dynamic_after_binary_patch_value(self):
+        patches = {'inlet': patch_value(200, 1), 'rotating1': b"        type            noSlip;\n",
+                   'outlet': patch_value(50, 2)}
+        internal_field = write_binary_field(self.path, random_vectors(1000), patches)
+        _, _, missing = switch_boundaries_in_file(self.path, ['rotating1'])
+        self.assertEqual(missing, [])
+        field_file = FieldFile(self.path)
+        self.assertEqual(field_file.read_section('internalField'), internal_field)
+        boundary = field_file.read_text('boundaryField')
+        for name in patches:
+            self.assertIn(name, boundary)
+        for entries in [patch_value(200, 1), patch_value(50, 2), f"type            {ROTATING_BOUNDARY_TYPE};".encode()]:
+            self.assertIn(entries.decode('latin-1'), boundary)
+
+
+    def test_field_reader_boundary_field(self):
+        patches = {'inlet': patch_value(200, 1), 'outlet': patch_value(50, 2),
+                   'walls': b"        type            noSlip;\n"}
+        values = random_vectors(1000)
+        write_binary_field(self.path, values, patches)
+        reader = FieldReader(self.path)
+        np.testing.assert_array_equal(reader.internal_field(), values)
+        boundary = reader.boundary_field()
+        self.assertEqual(list(boundary), ['inlet', 'outlet', 'walls'])
+        np.testing.assert_array_equal(boundary['inlet']['value'], random_vectors(200, 1))
+        np.testing.assert_array_equal(boundary['outlet']['value'], random_vectors(50, 2))
+        self.assertEqual(boundary['walls'], {'type': 'noSlip'})
+
+
+    def test_inlet_turbulence_after_binary_patch_value(self):
+        u_patches = {'walls': patch_value(100, 1), 'inlet': patch_value(20, 2)}
+        write_binary_field(os.path.join(self.directory.name, '0', 'U'), random_vectors(1000), u_patches)
+        k_path = os.path.join(self.directory.name, '0', 'k')
+        k_patches = {'walls': patch_value(100, 3, scalar=True), 'inlet': patch_value(20, 4, scalar=True),
+                     'outlet': b"        type            zeroGradient;\n"}
+        write_binary_field(k_path, random_vectors(1000)[:, 0], k_patches)
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            velocity = inlet_velocity('0', 'inlet', 20)
+        finally:
+            os.chdir(cwd)
+        np.testing.assert_array_equal(velocity, np.linalg.norm(random_vectors(20, 2), axis=1))
+
+        k = np.linspace(0.1, 0.2, 20)
+        write_inlet_values(k_path, 'fixedValue', {'inlet': k}, 6)
+        boundary = FieldReader(k_path).boundary_field()
+        self.assertEqual(list(boundary), ['walls', 'inlet', 'outlet'])
+        np.testing.assert_array_equal(boundary['walls']['value'], random_vectors(100, 3)[:, 0])
+        np.testing.assert_array_equal(boundary['inlet']['value'], k)
+
+
+    def test_reconstruct_binary_processor_fields(self):
+        cells = {0: np.arange(0, 600, 2), 1: np.arange(1, 600, 2)}
+        values = random_vectors(600, 3)
+        patches = {'inlet': b"        type            fixedValue;\n        value           uniform (1 0 0);\n"}
+        for processor, addressing in cells.items():
+            processor_dir = os.path.join(self.directory.name, f'processor{processor}')
+            os.makedirs(os.path.join(processor_dir, 'constant', 'polyMesh'))
+            os.makedirs(os.path.join(processor_dir, '0.5'))
+            with open(os.path.join(processor_dir, 'constant', 'polyMesh', 'cellProcAddressing'), 'wb') as file:
+                file.write(HEADER.replace(b'volVectorField', b'labelList').split(b'dimensions')[0]
+                           + binary_list(addressing, '<i4'))
+            with open(os.path.join(processor_dir, 'constant', 'polyMesh', 'boundary'), 'wb') as file:
+                file.write(PROCESSOR_BOUNDARY % (processor, 1 - processor))
+            write_binary_field(os.path.join(processor_dir, '0.5', 'U'), values[addressing], patches)
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            self.assertTrue(reconstruct_field(TimeIndex(), '0.5', 'U', 6))
+        finally:
+            os.chdir(cwd)
+        reconstructed = os.path.join(self.directory.name, '0.5', 'U')
+        np.testing.assert_array_equal(FieldReader(reconstructed).internal_field(), values)
+        self.assertIn(b"nonuniform List<vector> \n600\n(", FieldFile(reconstructed).read_section('internalField'))
+
+
+if __name__ == '__main__':
+    unittest.main()
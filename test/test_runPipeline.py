@@ -0,0 +1,97 @@
+"""Resuming the mesh pipeline of runPipeline with stub OpenFOAM applications. The stubs write the name of the mesh
+they produce into polyMesh/boundary and fail like the real applications would produce a broken mesh: decomposePar
+on a snapped mesh and snappyHexMesh on a mesh it has already snapped."""
+
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+from runPipeline import WORKFLOWS  # noqa: E402
+from utilities.classPipeline import Pipeline  # noqa: E402
+
+STUBS = {
+    'blockMesh': 'mkdir -p constant/polyMesh && echo block > constant/polyMesh/boundary',
+    'surfaceFeatures': 'true',
+    'decomposePar': 'grep -q block constant/polyMesh/boundary || exit 1\n'
+                    'rm -rf processor0 && mkdir -p processor0/constant && cp -r constant/polyMesh processor0/constant',
+    'snappyHexMesh': 'grep -q block processor0/constant/polyMesh/boundary || exit 1\n'
+                     'echo snapped > processor0/constant/polyMesh/boundary',
+    'reconstructPar': 'cp processor0/constant/polyMesh/boundary constant/polyMesh/boundary',
+    'checkMesh': 'true',
+}
+
+
+class MeshPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.path = os.environ['PATH']
+        self.directory = tempfile.TemporaryDirectory(prefix='foco-test-pipeline.')
+        bin_directory = os.path.join(self.directory.name, 'bin')
+        os.makedirs(bin_directory)
+        for name, script in STUBS.items():
+            path = os.path.join(bin_directory, name)
+            with open(path, 'w') as file:
+                file.write(f"#!/bin/sh\necho {name} >> ../runs\n{script}\n")
+            os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        os.environ['PATH'] = f"{bin_directory}{os.pathsep}{self.path}"
+        case_directory = os.path.join(self.directory.name, 'case')
+        for name in ['blockMeshDict', 'surfaceFeaturesDict', 'decomposeParDict', 'snappyHexMeshDict',
+                     'meshQualityDict']:
+            self.write(os.path.join(case_directory, 'system', name), f'{name}\n')
+        os.makedirs(os.path.join(case_directory, '0'))
+        os.chdir(case_directory)
+
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        os.environ['PATH'] = self.path
+        self.directory.cleanup()
+
+
+    @staticmethod
+    def write(path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+
+    def run_pipeline(self) -> list[str]:
+        """Runs the mesh pipeline and returns the stages that ran"""
+        runs = os.path.join('..', 'runs')
+        if os.path.exists(runs):
+            os.remove(runs)
+        # Without a launcher, snappyHexMesh runs as a plain command
+        self.assertTrue(Pipeline('mesh', WORKFLOWS['mesh'], {'mpirun': []}).run())
+        if not os.path.exists(runs):
+            return list()
+        with open(runs) as file:
+            return file.read().split()
+
+
+    def test_rerun_skips_all_stages(self):
+        self.run_pipeline()
+        self.assertEqual(self.run_pipeline(), [])
+
+
+    def test_snappy_hex_mesh_runs_on_a_fresh_decomposition(self):
+        self.run_pipeline()
+        self.write(os.path.join('system', 'snappyHexMeshDict'), 'snappyHexMeshDict changed\n')
+        runs = self.run_pipeline()
+        self.assertLess(runs.index('decomposePar'), runs.index('snappyHexMesh'))
+
+
+    def test_block_mesh_runs_again_after_reconstruction(self):
+        self.run_pipeline()
+        self.write(os.path.join('system', 'decomposeParDict'), 'decomposeParDict changed\n')
+        runs = self.run_pipeline()
+        self.assertLess(runs.index('blockMesh'), runs.index('decomposePar'))
+        self.assertNotIn('surfaceFeatures', runs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,63 +2,63 @@
 
 """Updates the 'dimensions' field from [] to [0 0 0 0 0 0 0] for ParaView compatibility"""
 
+import argparse
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from utilities.classFieldFile import FieldFile
+from utilities.classTimeIndex import TimeIndex
 
 # Global Variables
-DESIRED_FIELDS = {'yPlus', 'Co'}
+DEFAULT_FIELDS = {'yPlus', 'Co'}
+HEADER_WINDOW = 16 * 1024  # The dimensions are located within the first few KB of a field file
+NEW_DIMENSIONS = b'dimensions      [0 0 0 0 0 0 0];'
+EMPTY_DIMENSIONS_PATTERN = re.compile(rb'dimensions\s*\[\s*\]\s*;')
 
-def is_numeric(text: str):
-    """
-    Checks if a string can be converted to a float.
-    """
+def update_dimensions(file_path: str) -> bool:
+    """Updates empty 'dimensions' to [0 0 0 0 0 0 0] for ParaView compatibility. Returns True if the file changed"""
+    # Only the header is read, the (potentially huge) internalField is streamed and never loaded
     try:
-        float(text)
-        return True
-    except ValueError:
+        field_file = FieldFile(file_path, HEADER_WINDOW)
+    except ValueError as e:
+        print(f"Skipping {file_path}: {e}")
         return False
-
-def update_dimensions(file_path: str):
-    """Updates the 'dimensions' field to [0 0 0 0 0 0 0] for ParaView compatibility"""
-    with open(file_path, 'rb') as file:
-        data = file.read()
-    # Locate the 'dimensions' string within the file
-    start_index = data.find(b'dimensions      [')  # Find where 'dimensions [' starts
-    if start_index == -1:
+    if not field_file.has_section('dimensions'):
         print(f"No 'dimensions' field found in {file_path}")
-        return
-    # We need to know where the "]" corresponding to the 'dimensions' field is
-    end_index = data.find(b'];', start_index)
-    if end_index == -1:
-        print(f"No closing '];' found for dimensions field in {file_path}")
-        return
+        return False
+    # Files that already have their dimensions are left untouched
+    if not EMPTY_DIMENSIONS_PATTERN.fullmatch(field_file.read_section('dimensions')):
+        return False
     # Replace the old dimensions with the new ones
-    new_dimensions = b'dimensions      [0 0 0 0 0 0 0];'
-    new_data = data[:start_index] + new_dimensions + data[end_index+2:]
-    # Write the modified binary data back to the file
-    with open(file_path, 'wb') as file:
-        file.write(new_data)
+    return field_file.replace_sections({'dimensions': NEW_DIMENSIONS})
+
+def find_time_directories(base_dir: str) -> list[str]:
+    """Finds the reconstructed time directories and the decomposed processor*/<time> directories"""
+    return [path for paths in TimeIndex(base_dir).all_time_directories().values() for path in paths]
 
-def obtain_paths_of_relevant_files(desired_fields: set):
+def obtain_paths_of_relevant_files(desired_fields: set, base_dir: str | None = None):
     """Obtains the paths of files that contain one of the specified desired fields"""
-    base_dir = os.getcwd()
-    time_steps = [i for i in os.listdir(base_dir) if is_numeric(i)]
+    base_dir = os.getcwd() if base_dir is None else base_dir
     relevant_paths = list()
-    for time_step in time_steps:
-        time_dir = os.path.join(base_dir, time_step)
-        print(f'Processing directory {time_dir}')
-        fields = set([i for i in os.listdir(time_dir)])
-        for desired_field in desired_fields:
-            if desired_field in fields:
-                relevant_paths.append(str(os.path.join(time_dir, desired_field)))
+    for time_dir in find_time_directories(base_dir):
+        with os.scandir(time_dir) as entries:
+            relevant_paths.extend(entry.path for entry in entries if entry.name in desired_fields and entry.is_file())
     return relevant_paths
 
 def main():
-    global DESIRED_FIELDS
-    print(f'Changing dimensions for the following fields: {DESIRED_FIELDS}')
-    file_paths = obtain_paths_of_relevant_files(DESIRED_FIELDS)
-    for relevant_path in file_paths:
-        update_dimensions(relevant_path)
-    print(f'Updated {len(file_paths)} files')
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('fields', nargs='*', default=sorted(DEFAULT_FIELDS),
+                        help=f'Fields to update (default: {" ".join(sorted(DEFAULT_FIELDS))})')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of files processed concurrently (default: based on the number of CPUs)')
+    args = parser.parse_args()
+    desired_fields = set(args.fields)
+    print(f'Changing dimensions for the following fields: {desired_fields}')
+    file_paths = obtain_paths_of_relevant_files(desired_fields)
+    print(f'Found {len(file_paths)} files in the time and processor directories')
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        updated = sum(executor.map(update_dimensions, file_paths))
+    print(f'Updated {updated} files')
 
 if __name__ == '__main__':
     main()
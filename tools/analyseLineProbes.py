@@ -1,16 +1,32 @@
-import matplotlib.pyplot as plt
+from __future__ import annotations
+
+import argparse
+import functools
 import numpy as np
 import os
-import pandas as pd
 import re
 import shutil
 import subprocess
 import sys
+from utilities.calculateFlowMetrics import ATMOSPHERE_PA
+from utilities.classComponentGraph import ComponentGraph
+from utilities.classFluidProperties import (CASE_TEMPERATURE_RANGE, DEFAULT_TEMPERATURE, FLUID_TABLE_RANGES,
+                                            FluidProperties, identify_fluid, read_kinematic_viscosity)
+from utilities.classLineSampler import LineSampler
+from utilities.classTimeIndex import TimeIndex, parse_time
+from utilities.classTimeSeriesAggregator import TIME_SERIES_FILE, TimeSeriesAggregator
+from utilities.instrumentation import instrumented
+from utilities.lazyImports import lazy_import
+
+# pandas and matplotlib are only loaded once they are used
+pd = lazy_import('pandas')
+plt = lazy_import('matplotlib.pyplot')
 
 # ----- Define various constants ------------------------------------------------------------------------------------ #
 
 # Set the target directory
 SAMPLE_DIRECTORY = os.path.join(os.getcwd(), 'postProcessing/sampleDict')
+TIME_SERIES_DIRECTORY = os.path.join(SAMPLE_DIRECTORY, 'timeSeries')
 
 # Specify names to be used in the plots
 FIELD_NAMES = {
@@ -54,6 +70,9 @@ LOCATION_FIELDS = {'U_mag', 'p_at', 'pol_ang_xy'}
 # Specify which changing fields should be graphed
 COMPONENT_FIELDS = {'k_factor', 'delta_p_at'}
 
+# Specify which location and component fields should be tracked over time
+TIME_SERIES_FIELDS = {'U_mag', 'p_at', 'k_factor', 'delta_p_at'}
+
 # Specify the dimensions of the plots
 FIG_WIDTH_PROFILE_MM = 80
 FIG_HEIGHT_PROFILE_MM = 80
@@ -73,8 +92,9 @@ def check_directory_exists(directory) -> None:
 
 
 def get_timestep_directories(p_dir: str) -> list[str]:
-    """Get all the time step directories within the sampleDict directory"""
-    return sorted([os.path.join(p_dir, dir) for dir in os.listdir(p_dir) if os.path.isdir(os.path.join(p_dir, dir))])
+    """Get all the time step directories within the sampleDict directory, sorted by time"""
+    time_dirs = [dir for dir in os.listdir(p_dir) if os.path.isdir(os.path.join(p_dir, dir)) and parse_time(dir) is not None]
+    return [os.path.join(p_dir, dir) for dir in sorted(time_dirs, key=parse_time)]
 
 
 def create_directory(path: str) -> None:
@@ -93,6 +113,7 @@ def get_list_of_probe_names(directory: str) -> list[str]:
     return probe_names
 
 
+@instrumented
 def load_csv_files_into_pandas(directory: str, probe_numbers_and_names: list[str]) -> list[pd.DataFrame]:
     """Import the probe data stored in various probe CSV files"""
     dfs = list()
@@ -100,18 +121,35 @@ def load_csv_files_into_pandas(directory: str, probe_numbers_and_names: list[str
         probe_path = os.path.join(directory, probe_number_and_name)
         print(f'Processing file: {probe_number_and_name.split("/")[-1]}')
         df = pd.read_csv(probe_path)
-        probe_number_and_name = os.path.splitext(os.path.basename(probe_path))[0].lstrip('_')
-        probe_number, probe_name, match = strip_probe_number_and_name(probe_number_and_name)
-        df.attrs['number_and_name'] = probe_number_and_name
-        df.attrs['number'] = probe_number if match else None
-        df.attrs['name'] = probe_name
-        # Rename the pressure columns to show it is actually kinematic static pressure
-        df.rename(columns={"p": "p_ks"}, inplace=True)
-        df.rename(columns={"total(p)": "p_kt"}, inplace=True)
-        dfs.append(df)
+        probe_number_and_name = os.path.splitext(os.path.basename(probe_path))[0]
+        dfs.append(label_probe_data(df, probe_number_and_name))
     return dfs
 
 
+def sample_probes_into_pandas(time_names: list[str], jobs: int | None = None):
+    """Sample the line probes of the sampleDict straight from the field files, yielding one time step after another"""
+    sampler = LineSampler()
+    for line in sampler.lines:
+        if len(line['cells']) == 0:
+            print(f"WARNING: Probe {line['name']} lies outside the mesh and is skipped")
+    for time_name, probes in sampler.sample_times(time_names, jobs=jobs):
+        yield time_name, [label_probe_data(pd.DataFrame(columns), probe_number_and_name)
+                          for probe_number_and_name, columns in probes.items() if len(next(iter(columns.values())))]
+
+
+def label_probe_data(df: pd.DataFrame, probe_number_and_name: str) -> pd.DataFrame:
+    """Attach the probe number and name to the probe data"""
+    probe_number_and_name = probe_number_and_name.lstrip('_')
+    probe_number, probe_name, match = strip_probe_number_and_name(probe_number_and_name)
+    df.attrs['number_and_name'] = probe_number_and_name
+    df.attrs['number'] = probe_number if match else None
+    df.attrs['name'] = probe_name
+    # Rename the pressure columns to show it is actually kinematic static pressure
+    df.rename(columns={"p": "p_ks"}, inplace=True)
+    df.rename(columns={"total(p)": "p_kt"}, inplace=True)
+    return df
+
+
 def delete_sample_dir_analysis() -> None:
     """Deletes the current analysis folders in sampleDict"""
     sample_dict_file = os.path.join(SAMPLE_DIRECTORY, "sampleDict.7z")
@@ -122,6 +160,13 @@ def delete_sample_dir_analysis() -> None:
         except OSError as e:
             print(f"Error deleting file {sample_dict_file}: {e}")
 
+    if os.path.isdir(TIME_SERIES_DIRECTORY):
+        try:
+            shutil.rmtree(TIME_SERIES_DIRECTORY)
+            print(f"Deleted time series directory {TIME_SERIES_DIRECTORY}")
+        except OSError as e:
+            print(f"Error deleting directory {TIME_SERIES_DIRECTORY}: {e}")
+
     time_step_dirs = get_timestep_directories(SAMPLE_DIRECTORY)
     for time_step_dir in time_step_dirs:
         analysis_path = os.path.join(time_step_dir, "analysis")
@@ -139,7 +184,7 @@ def compress_sample_dir() -> None:
     try:
         os.chdir(SAMPLE_DIRECTORY)
         subprocess.run(["foco", "compress"], check=True)
-    except subprocess.CalledProcessError:
+    except (subprocess.CalledProcessError, FileNotFoundError):
         print(f'Could not compress {SAMPLE_DIRECTORY}')
     finally:
         os.chdir(cwd)
@@ -154,6 +199,35 @@ def strip_probe_number_and_name(probe_name:str) -> tuple[str, str, bool]:
 
 # ----- Calculate point data ---------------------------------------------------------------------------------------- #
 
+def determine_density(density: float | None = None, fluid: str | None = None, temperature: float | None = None,
+                      pressure: float = ATMOSPHERE_PA) -> float | None:
+    """Determines the fluid density: as given, from the fluid property tables, from the kinematic viscosity of the
+    case (which identifies the fluid and its temperature if it is a plausible one) or, if all of that fails, from the
+    user"""
+    if density is not None:
+        return density
+    if fluid is None:
+        nu = read_kinematic_viscosity()
+        identified = identify_fluid(nu, pressure) if nu is not None else None
+        if identified is not None:
+            fluid, case_temperature = identified
+            temperature = case_temperature if temperature is None else temperature
+            print(f"Identified {fluid} at {temperature:.1f}°C from the kinematic viscosity of the case ({nu:g})")
+        elif nu is not None:
+            print(f"The kinematic viscosity of the case ({nu:g}) matches no fluid between "
+                  f"{CASE_TEMPERATURE_RANGE[0]:g} and {CASE_TEMPERATURE_RANGE[1]:g}°C, use --fluid and --temperature")
+    if fluid is None:
+        return get_density()
+    temperature = DEFAULT_TEMPERATURE if temperature is None else temperature
+    try:
+        density = float(FluidProperties(fluid).density(temperature, pressure))
+    except ValueError as e:
+        print(f"Cannot determine the density of {fluid}: {e}")
+        return get_density()
+    print(f"Density of {fluid} at {temperature:.1f}°C: {density:.5g}")
+    return density
+
+
 def get_density():
     """Get the user input for fluid density to carry out pressure calculations for real pressure"""
     print("To calculate actual pressures, please enter the fluid density. For reference:")
@@ -214,6 +288,7 @@ def calculate_actual_pressures(df: pd.DataFrame, density: float):
 
 # ----- Plot point data --------------------------------------------------------------------------------------------- #
 
+@instrumented
 def plot_flow_profiles(df: pd.DataFrame, fields: dict, directory: str):
     """Plot the flow profiles for various flow fields from a pandas DataFrame"""
     # Process the various output fields
@@ -289,6 +364,7 @@ def categorise_ordered_and_unordered_probes(dfs: list[pd.DataFrame]) -> tuple[li
     return ordered_dfs, unordered_dfs
 
 
+@instrumented
 def calculate_location_stats(dfs: list[pd.DataFrame]) -> dict:
     """
     Calculate collective statistics (avg, std, cov) for each probe and each field.
@@ -311,60 +387,32 @@ def calculate_location_stats(dfs: list[pd.DataFrame]) -> dict:
     return location_stats
 
 
-def find_component_pairs(dfs: list[pd.DataFrame], density: float) -> list[tuple[str, str]]:
-    """Pairs up line probes (i.e. Vanes_US and Vanes_DS) to determine the changes across them"""
-    if density is None:
-        print('Cannot compute loss factor without density. Continuing...')
-        return []
-    # Map the probe stem to the full name for later retrieval
-    upstream_components, downstream_components = dict(), dict()
-    for df in dfs:
-        probe_number_and_name = df.attrs.get("number_and_name")
-        probe_name = df.attrs.get("name")
-        ending = probe_number_and_name.split("_")[-1]
-        stem = probe_name.replace(f'_{ending}', "")
-        if ending.upper() == "US":
-            upstream_components[stem] = probe_number_and_name
-        elif ending.upper() == "DS":
-            downstream_components[stem] = probe_number_and_name
-    # Find the intersection of the keys (the core probe names).
-    paired_components = list()
-    common_names = set(upstream_components.keys()).intersection(downstream_components.keys())
-    for name in common_names:
-        upstream_full_name = upstream_components[name]
-        downstream_full_name = downstream_components[name]
-        paired_components.append((upstream_full_name, downstream_full_name))
-    paired_components = sorted(paired_components, key=lambda x: x[0])
-    return paired_components
-
-
-def calculate_cross_component_stats(location_stats: dict, pairs: list[tuple[str, str]], density: float,
-                                    fields: set) -> dict:
-    """Calculates cross component statistics such as pressure change or loss factor"""
-    component_stats = dict()
-    for us_key, ds_key in pairs:
-        _, component, _ = strip_probe_number_and_name(us_key)
-        ending = component.split("_")[-1]
-        component = component.replace(f'_{ending}','')
-        component_stats[component] = dict()
-        delta_p_kt = location_stats[us_key]['p_kt']['avg'] - location_stats[ds_key]['p_kt']['avg']
-        component_stats[component]['delta_p_kt'] = delta_p_kt
-        component_stats[component]['U_mag'] = location_stats[us_key]['U_mag']['avg']
-        if 'p_at' not in location_stats[us_key] or 'p_at' not in location_stats[ds_key]:
-            continue
-        u_mag = location_stats[us_key]['U_mag']['avg']
-        delta_p_at = location_stats[us_key]['p_at']['avg'] - location_stats[ds_key]['p_at']['avg']
-        component_stats[component]['delta_p_at'] = delta_p_at
-        component_stats[component]['k_factor'] = abs(delta_p_at / (0.5 * density * u_mag ** 2))
+@functools.lru_cache(maxsize=1)
+def build_component_graph(locations: tuple[str, ...]) -> ComponentGraph:
+    """Links the line probes of every component (i.e. Vanes_US -> Vanes_MID -> Vanes_DS) to determine the changes
+    across them. The graph is built once and reused for all time steps sampling the same probes"""
+    return ComponentGraph(list(locations))
 
-        for field in fields:
-            if field not in location_stats[us_key] or field not in location_stats[ds_key] or field == 'U_mag':
-                continue
-            component_stats[component][f'delta_{field}'] = location_stats[us_key][field] - location_stats[ds_key][
-                field]
-    return component_stats
+
+@instrumented
+def calculate_cross_component_stats(location_stats: dict, graph: ComponentGraph, density: float,
+                                    fields: set) -> dict:
+    """Calculates cross component statistics such as pressure change or loss factor for all components at once"""
+    if not len(graph):
+        return dict()
+    averages = {location: {field: stats['avg'] for field, stats in location_fields.items()}
+                for location, location_fields in location_stats.items()}
+    component_fields = {'U_mag': graph.upstream_values(graph.values(averages, 'U_mag'))}
+    delta_fields = {'p_kt', 'p_at'} | {field for field in fields if any(field in stats for stats in averages.values())}
+    for field in sorted(delta_fields - {'U_mag'}):
+        component_fields[f'delta_{field}'] = graph.delta(graph.values(averages, field))
+    component_fields['k_factor'] = graph.loss_factor(component_fields['delta_p_kt'], component_fields['U_mag'])
+    if density is None:
+        print('Cannot compute the change in actual pressures without density. Continuing...')
+    return graph.to_dict(component_fields)
 
 
+@instrumented
 def plot_and_save_location_data(location_stats: dict, selected_fields: set, field_names: dict, directory:str):
     """Takes the location statistics and plots them on a bar graph and saves them as a CSV"""
     file_name_start = 'plot_overview_locations'
@@ -393,6 +441,7 @@ def plot_and_save_location_data(location_stats: dict, selected_fields: set, fiel
     plot_df.to_csv(file_location, index=False)
 
 
+@instrumented
 def plot_and_save_component_data(component_stats: dict, selected_fields: set, field_names: dict, directory:str):
     """Takes the Component statistics and plots them on a bar graph and saves them as a CSV"""
     file_name_start = 'plot_overview_components'
@@ -455,33 +504,106 @@ def plot_horizontal_bar_graph(labels, values, title: str, x_label: str, file_loc
     plt.close()
 
 
+# ----- Plot time series data -------------------------------------------------------------------------------------- #
+
+@instrumented
+def plot_time_series(directory: str, fields: set, field_names: dict):
+    """Plots the time series and running averages of every location, reading the table one field at a time"""
+    table_path = os.path.join(directory, TIME_SERIES_FILE)
+    if not os.path.isfile(table_path):
+        return
+    for field in sorted(fields):
+        chunks = [chunk[chunk['field'] == field] for chunk in pd.read_csv(table_path, chunksize=100000)]
+        field_df = pd.concat(chunks) if chunks else pd.DataFrame()
+        if field_df.empty:
+            print(f"WARNING: field '{field}' not found in the time series")
+            continue
+        field_name = field_names.get(field, field)
+        fig, ax = plt.subplots(figsize=(FIG_WIDTH_OVERVIEW_MM / INCHES_TO_MM, FIG_HEIGHT_OVERVIEW_MM / INCHES_TO_MM))
+        for location, location_df in field_df.groupby('location', sort=False):
+            line, = ax.plot(location_df['time'], location_df['value'], label=location)
+            ax.plot(location_df['time'], location_df['running_avg'], linestyle='--', color=line.get_color())
+        ax.set_xlabel('Time')
+        ax.set_ylabel(field_name)
+        ax.set_title(f'{field_name} (dashed: running average)')
+        ax.grid(True)
+        ax.legend(fontsize='small', loc='center left', bbox_to_anchor=(1, 0.5))
+        file_location = os.path.join(directory, f'plot_timeSeries_{field}.png')
+        plt.savefig(file_location, dpi=FIG_DPI, bbox_inches='tight')
+        plt.close()
+        print(f"Saved: {os.path.basename(file_location)}")
+
+
 # ----- Main function ----------------------------------------------------------------------------------------------- #
 
+@instrumented
+def analyse_time_step(flow_data_dfs: list[pd.DataFrame], density: float, analysis_directory: str) -> dict:
+    """Process the data of the line probes of one time step. Returns the averages of the locations and the
+    statistics of the components as {name: {field: value}}"""
+    create_directory(analysis_directory)
+    # Process the data across individual probes
+    for df in flow_data_dfs:
+        calculate_velocity_magnitude(df)
+        calculate_polar_velocity_angles_in_degrees(df)
+        calculate_kinematic_dynamic_and_total_pressures(df)
+        calculate_actual_pressures(df, density)
+        plot_flow_profiles(df, PROFILE_FIELDS, analysis_directory)
+
+    ordered_dfs, unordered_dfs = categorise_ordered_and_unordered_probes(flow_data_dfs)
+    flow_data_dfs = ordered_dfs + unordered_dfs
+    location_stats = calculate_location_stats(flow_data_dfs)
+    component_graph = build_component_graph(tuple(df.attrs.get("number_and_name") for df in ordered_dfs))
+    component_stats = calculate_cross_component_stats(location_stats, component_graph, density, COMPONENT_FIELDS)
+    plot_and_save_location_data(location_stats, LOCATION_FIELDS, FIELD_NAMES, analysis_directory)
+    plot_and_save_component_data(component_stats, COMPONENT_FIELDS, FIELD_NAMES, analysis_directory)
+    time_step_values = {location: {field: stats['avg'] for field, stats in fields.items()}
+                        for location, fields in location_stats.items()}
+    time_step_values.update(component_stats)
+    return time_step_values
+
+
 def main():
-    check_directory_exists(SAMPLE_DIRECTORY)
-    density = get_density()
-    delete_sample_dir_analysis()
-    for timestep_directory in get_timestep_directories(SAMPLE_DIRECTORY):
-        # Carry out directory and file management and fetch relevant files
-        analysis_directory = os.path.join(timestep_directory, 'analysis')
-        create_directory(analysis_directory)
-        probe_names = get_list_of_probe_names(timestep_directory)
-        # Process the data across individual probes
-        flow_data_dfs = load_csv_files_into_pandas(timestep_directory, probe_names)
-        for df in flow_data_dfs:
-            calculate_velocity_magnitude(df)
-            calculate_polar_velocity_angles_in_degrees(df)
-            calculate_kinematic_dynamic_and_total_pressures(df)
-            calculate_actual_pressures(df, density)
-            plot_flow_profiles(df, PROFILE_FIELDS, analysis_directory)
-
-        ordered_dfs, unordered_dfs = categorise_ordered_and_unordered_probes(flow_data_dfs)
-        flow_data_dfs = ordered_dfs + unordered_dfs
-        location_stats = calculate_location_stats(flow_data_dfs)
-        component_pairs = find_component_pairs(ordered_dfs, density)
-        component_stats = calculate_cross_component_stats(location_stats, component_pairs, density, COMPONENT_FIELDS)
-        plot_and_save_location_data(location_stats, LOCATION_FIELDS, FIELD_NAMES, analysis_directory)
-        plot_and_save_component_data(component_stats, COMPONENT_FIELDS, FIELD_NAMES, analysis_directory)
+    parser = argparse.ArgumentParser(description="Analyse the line probes defined in system/sampleDict")
+    parser.add_argument('--sample', action='store_true',
+                        help='Sample the line probes from the field files instead of reading the CSV files of '
+                             'foamPostProcess -func sampleDict')
+    parser.add_argument('-t', '--time', nargs='+', default=None, metavar='TIME',
+                        help='Times to sample with --sample (default: the latest time)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of time steps sampled in parallel (default: based on the number of CPUs)')
+    parser.add_argument('--density', type=float, default=None,
+                        help='Fluid density (default: from --fluid, or from the kinematic viscosity of the case)')
+    parser.add_argument('--fluid', choices=sorted(FLUID_TABLE_RANGES), default=None,
+                        help='Fluid of the case, its density is taken from the fluid property tables')
+    parser.add_argument('--temperature', type=float, default=None,
+                        help=f'Fluid temperature in °C (default: {DEFAULT_TEMPERATURE:g}, or from the viscosity)')
+    parser.add_argument('--pressure', type=float, default=ATMOSPHERE_PA, help='Fluid pressure in Pa')
+    args = parser.parse_args()
+
+    if args.sample:
+        time_index = TimeIndex()
+        time_names = [time_index.latest()] if args.time is None else [time_index.nearest(t) for t in args.time]
+        if None in time_names:
+            sys.exit('No time directories found')
+        density = determine_density(args.density, args.fluid, args.temperature, args.pressure)
+        if os.path.isdir(SAMPLE_DIRECTORY):
+            delete_sample_dir_analysis()
+        time_steps = ((time_name, flow_data_dfs, os.path.join(SAMPLE_DIRECTORY, time_name, 'analysis'))
+                      for time_name, flow_data_dfs in sample_probes_into_pandas(time_names, args.jobs))
+    else:
+        check_directory_exists(SAMPLE_DIRECTORY)
+        density = determine_density(args.density, args.fluid, args.temperature, args.pressure)
+        delete_sample_dir_analysis()
+        time_steps = ((os.path.basename(timestep_directory),
+                       load_csv_files_into_pandas(timestep_directory, get_list_of_probe_names(timestep_directory)),
+                       os.path.join(timestep_directory, 'analysis'))
+                      for timestep_directory in get_timestep_directories(SAMPLE_DIRECTORY))
+
+    # The time steps are analysed one by one and folded into the running statistics of the time series
+    with TimeSeriesAggregator(TIME_SERIES_DIRECTORY, TIME_SERIES_FIELDS) as aggregator:
+        for time_name, flow_data_dfs, analysis_directory in time_steps:
+            aggregator.add(float(parse_time(time_name)), analyse_time_step(flow_data_dfs, density, analysis_directory))
+    plot_time_series(TIME_SERIES_DIRECTORY, TIME_SERIES_FIELDS, FIELD_NAMES)
     compress_sample_dir()
 
 
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""Benchmarks the foco tools on synthetic cases: STL surfaces, solver logs, sampleDict trees and field files of a
+selectable scale. The results are written to JSON and compared with the baseline of the scale, e.g.
+
+    foco benchmark --save-baseline      records the baseline
+    foco benchmark                      compares against it, exiting with 1 on a regression
+    foco benchmark --generate case      writes a synthetic case to use as a fixture"""
+
+import argparse
+import os
+import sys
+import time
+from benchmarks.benchmarkSuite import (BENCHMARK_DIRECTORY, BENCHMARKS, SCALES, compare, load_record, make_record,
+                                       run_benchmarks, save_record)
+from benchmarks.syntheticCases import write_case
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*', help='Benchmarks to run (default: all, see --list)')
+    parser.add_argument('-s', '--scale', choices=list(SCALES), default='small', help='Size of the inputs')
+    for key in SCALES['small']:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=None,
+                            help=f"Override the {key.replace('_', ' ')} of the scale")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs of every benchmark (default: 3)')
+    parser.add_argument('-o', '--output', default=None,
+                        help=f'Results file (default: a new file in {BENCHMARK_DIRECTORY})')
+    parser.add_argument('--baseline', default=None,
+                        help=f'Baseline file (default: baseline-<scale>.json in {BENCHMARK_DIRECTORY})')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Slowdown relative to the baseline reported as a regression (default: 0.25)')
+    parser.add_argument('--generate', default=None, metavar='DIR',
+                        help='Write a synthetic case of the scale into a directory instead of benchmarking')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the output of the tools')
+    args = parser.parse_args()
+
+    parameters = dict(SCALES[args.scale])
+    for key in parameters:
+        if getattr(args, key) is not None:
+            parameters[key] = getattr(args, key)
+    if args.generate:
+        write_case(args.generate, parameters)
+        print(f"Synthetic {args.scale} case written to {args.generate}")
+        return
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print(f"{benchmark.name:<20} {benchmark.description.format(**parameters)}")
+        return
+    unknown = [name for name in args.benchmarks if name not in [benchmark.name for benchmark in BENCHMARKS]]
+    if unknown:
+        print(f"Unknown benchmark {', '.join(unknown)}, see --list. Exiting.")
+        sys.exit(1)
+    if args.repeat < 1:
+        print("The number of runs must be at least 1. Exiting.")
+        sys.exit(1)
+
+    # The plots of analyseLineProbes must not need a display
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    benchmarks = [benchmark for benchmark in BENCHMARKS if not args.benchmarks or benchmark.name in args.benchmarks]
+    print(f"Running {len(benchmarks)} benchmarks at scale {args.scale}: "
+          + ', '.join(f"{key} {value}" for key, value in parameters.items()))
+    record = make_record(run_benchmarks(benchmarks, parameters, args.repeat, args.verbose), args.scale, parameters)
+    output = args.output or os.path.join(BENCHMARK_DIRECTORY, f"{time.strftime('%Y%m%dT%H%M%S')}-{args.scale}.json")
+    save_record(record, output)
+    print(f"Results written to {output}")
+    failed = [name for name, result in record['results'].items() if result['status'] == 'failed']
+
+    baseline_path = args.baseline or os.path.join(BENCHMARK_DIRECTORY, f"baseline-{args.scale}.json")
+    if args.save_baseline:
+        save_record(record, baseline_path)
+        print(f"Baseline written to {baseline_path}")
+    elif os.path.isfile(baseline_path):
+        regressions = compare(record, load_record(baseline_path), args.tolerance)
+        if regressions:
+            print(f"\nSlower than the baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        print(f"No baseline found at {baseline_path}, record one with --save-baseline")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
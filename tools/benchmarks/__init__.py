@@ -0,0 +1 @@
+# Placeholder to allow other files to access this folder
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""Times the entry points of the foco tools on synthetic cases and compares the results with a stored baseline to catch
+performance regressions. Every benchmark writes its input into a scratch directory, which is not timed, and then runs
+as often as requested. The fastest run is compared, as it is the one least disturbed by the rest of the machine."""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from benchmarks.syntheticCases import write_field, write_sample_dict, write_solver_log, write_stl
+from utilities.dispatcher import TOOL_DIR, run_command
+
+BENCHMARK_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'foco',
+                                   'benchmarks')
+# Sizes of the synthetic inputs
+SCALES = {
+    'small': {'facets': 20000, 'time_steps': 1000, 'correctors': 2, 'sample_times': 2, 'probes': 4,
+              'probe_points': 100, 'cells': 200000},
+    'medium': {'facets': 200000, 'time_steps': 10000, 'correctors': 3, 'sample_times': 5, 'probes': 8,
+               'probe_points': 500, 'cells': 2000000},
+    'large': {'facets': 1000000, 'time_steps': 50000, 'correctors': 3, 'sample_times': 10, 'probes': 16,
+              'probe_points': 2000, 'cells': 10000000},
+}
+PATCHES = ['inlet', 'outlet', 'walls']
+PREPARE_ARGUMENTS = ['-hydraulic_diameter', '0.1', '-free_stream_velocity', '1', '-kinematic_viscosity', '1e-6']
+
+
+class Benchmark:
+    """An entry point to time. The setup writes the input into a scratch directory and returns the function to time.
+    Benchmarks of tools calling an executable that is not installed (e.g. 7z) are skipped"""
+
+    def __init__(self, name: str, setup, description: str, requires: list[str] | None = None):
+        self.name = name
+        self.setup = setup
+        self.description = description
+        self.requires = requires or list()
+
+
+    def missing(self) -> list[str]:
+        return [executable for executable in self.requires if shutil.which(executable) is None]
+
+
+def tool(directory: str, command: str, args: list[str]):
+    """Returns a function running a foco tool in a directory, in-process like the dispatcher does"""
+    def run():
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            status = run_command(command, args)
+        finally:
+            os.chdir(cwd)
+        if status != 0:
+            raise RuntimeError(f"foco {command} failed with exit status {status}")
+    return run
+
+
+def setup_extract_residuals(directory: str, parameters: dict):
+    from plotResiduals import extract_residuals
+    path = write_solver_log(os.path.join(directory, 'log.foamRun'), parameters['time_steps'], parameters['correctors'])
+    return lambda: extract_residuals(path)
+
+
+def setup_analyse_line_probes(directory: str, parameters: dict):
+    write_sample_dict(directory, parameters['sample_times'], parameters['probes'], parameters['probe_points'])
+    return tool(directory, 'analyseLineProbes', ['--density', '1.2'])
+
+
+def setup_find_min_max_coords(directory: str, parameters: dict):
+    path = write_stl(os.path.join(directory, 'surface.stl'), parameters['facets'])
+    return tool(directory, 'findMinMaxCoords', [path])
+
+
+def setup_stl_inverter(directory: str, parameters: dict):
+    path = write_stl(os.path.join(directory, 'surface.stl'), parameters['facets'])
+    return tool(directory, 'stl_inverter', [path])
+
+
+def setup_stl_copier(directory: str, parameters: dict):
+    path = write_stl(os.path.join(directory, 'surface.stl'), parameters['facets'])
+    return tool(directory, 'stl_copier', ['2', '1', '1', '1', '0', '0', path])
+
+
+def setup_prepare(directory: str, parameters: dict):
+    for index, patch in enumerate(PATCHES):
+        write_stl(os.path.join(directory, 'constant', 'triSurface', f'{patch}.stl'),
+                  max(parameters['facets'] // len(PATCHES), 1), name=patch, seed=index)
+    os.makedirs(os.path.join(directory, 'system'), exist_ok=True)
+    return tool(directory, 'prepare', PREPARE_ARGUMENTS)
+
+
+def setup_compress(directory: str, parameters: dict):
+    # The archive is written next to the case, so the case gets a directory of its own
+    case_dir = os.path.join(directory, 'case')
+    write_sample_dict(case_dir, parameters['sample_times'], parameters['probes'], parameters['probe_points'])
+    for index, name in enumerate(['U', 'p']):
+        write_field(os.path.join(case_dir, '1', name), parameters['cells'], name, seed=index)
+    return tool(case_dir, 'compress', [])
+
+
+def setup_read_field(directory: str, parameters: dict, binary: bool):
+    from utilities.classFieldReader import FieldReader
+    path = write_field(os.path.join(directory, '1', 'U'), parameters['cells'], 'U', binary)
+    # Binary fields are memory-mapped, summing them makes sure that the data is actually read
+    return lambda: FieldReader(path).internal_field().sum(axis=0)
+
+
+BENCHMARKS = [
+    Benchmark('extract_residuals', setup_extract_residuals,
+              'plotResiduals.extract_residuals: log of {time_steps} time steps with {correctors} PIMPLE correctors'),
+    Benchmark('analyseLineProbes', setup_analyse_line_probes,
+              'foco analyseLineProbes: {sample_times} times x {probes} probes x {probe_points} points'),
+    Benchmark('findMinMaxCoords', setup_find_min_max_coords, 'foco findMinMaxCoords: ASCII STL of {facets} facets'),
+    Benchmark('stl_inverter', setup_stl_inverter, 'foco stl_inverter: ASCII STL of {facets} facets'),
+    Benchmark('stl_copier', setup_stl_copier, 'foco stl_copier: ASCII STL of {facets} facets copied twice'),
+    Benchmark('prepare', setup_prepare, 'foco prepare: 3 ASCII STLs of {facets} facets in total'),
+    Benchmark('compress', setup_compress, 'foco compress: sampleDict tree and 2 fields of {cells} cells',
+              requires=['7z']),
+    Benchmark('read_field_ascii', lambda directory, parameters: setup_read_field(directory, parameters, False),
+              'FieldReader: ASCII vector field of {cells} cells'),
+    Benchmark('read_field_binary', lambda directory, parameters: setup_read_field(directory, parameters, True),
+              'FieldReader: binary vector field of {cells} cells'),
+]
+
+
+@contextmanager
+def silenced(enabled: bool = True):
+    """Discards the output of the tools, including that of their subprocesses, by redirecting the file descriptor"""
+    if not enabled:
+        yield
+        return
+    sys.stdout.flush()
+    saved = os.dup(1)
+    try:
+        with open(os.devnull, 'w') as devnull:
+            os.dup2(devnull.fileno(), 1)
+            yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def run_benchmarks(benchmarks: list[Benchmark], parameters: dict, repeat: int = 3, verbose: bool = False) -> dict:
+    """Runs the benchmarks and returns their wall times, or why they failed or were skipped"""
+    results = dict()
+    for benchmark in benchmarks:
+        missing = benchmark.missing()
+        if missing:
+            results[benchmark.name] = {'status': 'skipped', 'reason': f"{', '.join(missing)} not found"}
+            print(f"{benchmark.name:<20} skipped, {results[benchmark.name]['reason']}")
+            continue
+        times = list()
+        with tempfile.TemporaryDirectory(prefix=f'foco-benchmark-{benchmark.name}.') as directory:
+            try:
+                function = benchmark.setup(directory, parameters)
+                for _ in range(repeat):
+                    with silenced(not verbose):
+                        start = time.perf_counter()
+                        function()
+                        times.append(time.perf_counter() - start)
+            # A failing tool must not stop the other benchmarks
+            except Exception as e:
+                results[benchmark.name] = {'status': 'failed', 'reason': str(e)}
+                print(f"{benchmark.name:<20} failed: {e}")
+                continue
+        results[benchmark.name] = {'status': 'ok', 'times': [round(value, 6) for value in times],
+                                   'min': round(min(times), 6), 'median': round(statistics.median(times), 6)}
+        print(f"{benchmark.name:<20} {min(times):>9.3f} s  (median {statistics.median(times):.3f} s of {repeat})")
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(['git', '-C', TOOL_DIR, 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def make_record(results: dict, scale: str, parameters: dict) -> dict:
+    return {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'scale': scale, 'parameters': parameters,
+            'host': platform.node(), 'python': platform.python_version(), 'commit': git_commit(), 'results': results}
+
+
+def save_record(record: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(record, file, indent=2)
+
+
+def load_record(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(record: dict, baseline: dict, tolerance: float = 0.25) -> list[str]:
+    """Prints the change of the fastest run of every benchmark against the baseline. Returns the benchmarks that are
+    slower than the baseline by more than the tolerance"""
+    if record['parameters'] != baseline.get('parameters'):
+        print("WARNING: The baseline was recorded with other input sizes, the times are not comparable")
+    if record.get('host') != baseline.get('host'):
+        print(f"WARNING: The baseline was recorded on {baseline.get('host')}, not on this machine")
+    print(f"\n{'Benchmark':<20} {'Baseline':>10} {'Current':>10} {'Change':>8}  "
+          f"(baseline of {baseline.get('created')}, commit {baseline.get('commit') or 'unknown'})")
+    regressions = list()
+    for name, result in record['results'].items():
+        reference = baseline.get('results', dict()).get(name, dict())
+        if result['status'] != 'ok' or reference.get('status') != 'ok':
+            print(f"{name:<20} {'-':>10} {'-':>10} {'-':>8}  {result['status']}, baseline {reference.get('status')}")
+            continue
+        change = result['min'] / reference['min'] - 1 if reference['min'] else 0.0
+        verdict = ''
+        if change > tolerance:
+            verdict = 'REGRESSION'
+            regressions.append(name)
+        elif change < -tolerance:
+            verdict = 'faster'
+        print(f"{name:<20} {reference['min']:>8.3f} s {result['min']:>8.3f} s {change:>+8.1%}  {verdict}")
+    return regressions
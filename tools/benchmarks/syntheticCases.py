@@ -0,0 +1,198 @@
+"""Generators of synthetic OpenFOAM inputs at a selectable scale: STL surfaces (ASCII or binary), solver logs with
+PIMPLE correctors, sampleDict trees of line probes and field files. All data is random but seeded, so the same
+parameters always produce the same files."""
+
+import os
+import numpy as np
+from utilities.classFoamDictEditor import binary_element_sizes
+from utilities.foamLists import format_field_value, list_chunks
+
+FOAM_HEADER = """/*--------------------------------*- C++ -*----------------------------------*\\
+  =========                 |
+  \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox
+   \\\\    /   O peration     | Website:  www.openfoam.org
+    \\\\  /    A nd           | Version:  Synthetic
+     \\\\/     M anipulation  |
+\\*---------------------------------------------------------------------------*/
+FoamFile
+{{
+    format      {format};{arch}
+    class       {field_class};
+    location    "{location}";
+    object      {name};
+}}
+// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //
+
+"""
+BINARY_ARCH = '\n    arch        "LSB;label=32;scalar=64";'
+FIELD_DIMENSIONS = {'U': '[0 1 -1 0 0 0 0]', 'p': '[0 2 -2 0 0 0 0]'}
+# A binary STL record: normal, three vertices and the attribute byte count, 50 bytes without padding
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+STL_FACET = ("  facet normal %.6e %.6e %.6e\n    outer loop\n" + "      vertex %.6e %.6e %.6e\n" * 3
+             + "    endloop\n  endfacet\n")
+STL_CHUNK_FACETS = 10000
+# The PIMPLE loop of an incompressible solver: momentum predictor, pressure correctors, turbulence
+MOMENTUM_FIELDS = ['Ux', 'Uy', 'Uz']
+TURBULENCE_FIELDS = ['epsilon', 'k']
+PRESSURE_CORRECTORS = 2
+LOG_BANNER = """/*---------------------------------------------------------------------------*\\
+  =========                 |
+  \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox
+   \\\\    /   O peration     | Website:  https://openfoam.org
+    \\\\  /    A nd           | Version:  Synthetic
+     \\\\/     M anipulation  |
+\\*---------------------------------------------------------------------------*/
+Build  : synthetic
+Exec   : foamRun -solver incompressibleFluid
+Date   : Jan 01 2026
+Time   : 00:00:00
+nProcs : 1
+
+Create time
+
+Create mesh for time = 0
+
+Selecting solver incompressibleFluid
+
+Starting time loop
+
+"""
+# Cells per face of the inlet of the synthetic fields
+INLET_CELLS = 100
+SAMPLE_COLUMNS = ['distance', 'p', 'total(p)', 'U_x', 'U_y', 'U_z']
+
+
+def stl_facets(facets: int, seed: int = 0, size: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the unit normals (facets, 3) and vertices (facets, 3, 3) of random triangles in a cube"""
+    rng = np.random.default_rng(seed)
+    vertices = rng.uniform(0.0, size, (facets, 3, 3))
+    normals = np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), np.finfo(float).tiny)
+    return normals, vertices
+
+
+def write_stl(path: str, facets: int, binary: bool = False, name: str = 'surface', seed: int = 0) -> str:
+    """Writes an STL surface of random triangles, in the number format of the STL exports the stl tools expect"""
+    normals, vertices = stl_facets(facets, seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if binary:
+        records = np.zeros(facets, dtype=STL_RECORD)
+        records['normal'] = normals
+        records['vertices'] = vertices
+        with open(path, 'wb') as file:
+            # The header of a binary STL must not start with 'solid', which marks ASCII files
+            file.write(f"binary STL {name}".encode().ljust(80, b' '))
+            file.write(np.array(facets, dtype='<u4').tobytes())
+            records.tofile(file)
+        return path
+    rows = np.concatenate([normals, vertices.reshape(facets, 9)], axis=1)
+    with open(path, 'w') as file:
+        file.write(f"solid {name}\n")
+        for start in range(0, facets, STL_CHUNK_FACETS):
+            chunk = rows[start:start + STL_CHUNK_FACETS]
+            file.write((STL_FACET * len(chunk)) % tuple(chunk.ravel()))
+        file.write(f"endsolid {name}\n")
+    return path
+
+
+def solver_line(solver: str, field: str, initial: float, iterations: int) -> str:
+    return (f"{solver}:  Solving for {field}, Initial residual = {initial:.6g}, "
+            f"Final residual = {initial * 1e-3:.6g}, No Iterations {iterations}\n")
+
+
+def write_solver_log(path: str, time_steps: int, correctors: int = 2, delta_t: float = 1e-3, seed: int = 0) -> str:
+    """Writes the log of a transient PIMPLE run: every time step has the given number of outer correctors, each
+    solving the momentum, pressure (with two pressure correctors) and turbulence equations"""
+    rng = np.random.default_rng(seed)
+    fields_per_corrector = len(MOMENTUM_FIELDS) + PRESSURE_CORRECTORS + len(TURBULENCE_FIELDS)
+    # Residuals decaying over the run with some noise, drawn for all equations at once
+    decay = np.logspace(-1, -5, max(time_steps, 1))[:, None, None]
+    residuals = decay * 10 ** rng.uniform(-0.5, 0.5, (time_steps, correctors, fields_per_corrector))
+    iterations = rng.integers(1, 20, (time_steps, correctors, fields_per_corrector))
+    with open(path, 'w') as file:
+        file.write(LOG_BANNER)
+        for step in range(time_steps):
+            courant = rng.uniform(0.1, 0.9)
+            lines = [f"Courant Number mean: {courant / 10:.6g} max: {courant:.6g}\n",
+                     f"deltaT = {delta_t:.10g}\n",
+                     f"Time = {(step + 1) * delta_t:.10g}s\n\n"]
+            for corrector in range(correctors):
+                values, counts = residuals[step, corrector], iterations[step, corrector]
+                lines.append(f"PIMPLE: Iteration {corrector + 1}\n")
+                for index, field in enumerate(MOMENTUM_FIELDS):
+                    lines.append(solver_line('smoothSolver', field, values[index], counts[index]))
+                for index in range(PRESSURE_CORRECTORS):
+                    position = len(MOMENTUM_FIELDS) + index
+                    error = values[position]
+                    lines.append(solver_line('GAMG', 'p', error, counts[position]))
+                    lines.append(f"time step continuity errors : sum local = {error * 1e-4:.6g}, "
+                                 f"global = {error * 1e-6:.6g}, cumulative = {error * 1e-5:.6g}\n")
+                for index, field in enumerate(TURBULENCE_FIELDS):
+                    position = len(MOMENTUM_FIELDS) + PRESSURE_CORRECTORS + index
+                    lines.append(solver_line('smoothSolver', field, values[position], counts[position]))
+            lines.append(f"ExecutionTime = {(step + 1) * 0.05:.2f} s  ClockTime = {(step + 1) // 20} s\n\n")
+            file.write(''.join(lines))
+        file.write("End\n\n")
+    return path
+
+
+def write_sample_dict(case_dir: str, times: int, probes: int, points: int = 100, seed: int = 0) -> str:
+    """Writes the CSV files of foamPostProcess -func sampleDict: a directory per time with a file per line probe.
+    The probes are numbered in flow direction, their velocity profiles are parabolic and their pressure drops"""
+    rng = np.random.default_rng(seed)
+    sample_dir = os.path.join(case_dir, 'postProcessing', 'sampleDict')
+    distance = np.linspace(0.0, 0.1, points)
+    profile = 1.5 * (1 - ((distance - 0.05) / 0.05) ** 2)
+    for step in range(1, times + 1):
+        time_dir = os.path.join(sample_dir, str(step))
+        os.makedirs(time_dir, exist_ok=True)
+        for probe in range(probes):
+            velocity = profile * (1 + 0.05 * rng.standard_normal(points))
+            pressure = 10.0 * (1 - probe / max(probes, 1)) + 0.1 * rng.standard_normal(points)
+            columns = [distance, pressure, pressure + 0.5 * velocity ** 2, velocity,
+                       0.01 * rng.standard_normal(points), 0.01 * rng.standard_normal(points)]
+            np.savetxt(os.path.join(time_dir, f"{probe + 1:02d}_line{probe + 1}.csv"), np.column_stack(columns),
+                       fmt='%.6g', delimiter=',', header=','.join(SAMPLE_COLUMNS), comments='')
+    return sample_dir
+
+
+def write_field(path: str, cells: int, name: str = 'U', binary: bool = False, seed: int = 0) -> str:
+    """Writes a volume field (U: vector, otherwise scalar) with a nonuniform internalField of the given size and an
+    inlet with a nonuniform value (a face per INLET_CELLS cells) before the walls, like the fields of a real case"""
+    rng = np.random.default_rng(seed)
+    element_type = 'vector' if name == 'U' else 'scalar'
+    faces = max(cells // INLET_CELLS, 1)
+    values = rng.standard_normal((cells, 3) if element_type == 'vector' else cells)
+    inlet = rng.standard_normal((faces, 3) if element_type == 'vector' else faces)
+    header = FOAM_HEADER.format(format='binary' if binary else 'ascii', arch=BINARY_ARCH if binary else '',
+                                field_class=f"vol{element_type.capitalize()}Field",
+                                location=os.path.basename(os.path.dirname(os.path.abspath(path))), name=name)
+    element_sizes = binary_element_sizes(header)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(header.encode())
+        file.write(f"dimensions      {FIELD_DIMENSIONS.get(name, '[0 0 0 0 0 0 0]')};\n\n".encode())
+        file.write(f"internalField   nonuniform List<{element_type}> ".encode())
+        for chunk in list_chunks(values, element_type, element_sizes):
+            file.write(chunk)
+        file.write(b";\n\nboundaryField\n{\n    inlet\n    {\n        type            fixedValue;\n"
+                   b"        value           " + format_field_value(inlet, element_type, element_sizes) + b";\n    }\n")
+        file.write(b"    walls\n    {\n        type            zeroGradient;\n    }\n}\n")
+    return path
+
+
+def write_case(case_dir: str, parameters: dict) -> str:
+    """Writes a synthetic case with all of the above: the ASCII surfaces of constant/triSurface (and a binary copy
+    in constant/geometry), the solver log, the sampleDict tree and the fields of time 1 (ASCII) and 2 (binary)"""
+    facets = parameters['facets']
+    for index, patch in enumerate(['inlet', 'outlet', 'walls']):
+        write_stl(os.path.join(case_dir, 'constant', 'triSurface', f'{patch}.stl'), max(facets // 3, 1),
+                  name=patch, seed=index)
+    write_stl(os.path.join(case_dir, 'constant', 'geometry', 'surface.stl'), facets, binary=True)
+    os.makedirs(os.path.join(case_dir, 'system'), exist_ok=True)
+    write_solver_log(os.path.join(case_dir, 'log.foamRun'), parameters['time_steps'], parameters['correctors'])
+    write_sample_dict(case_dir, parameters['sample_times'], parameters['probes'], parameters['probe_points'])
+    for time_name, binary in (('1', False), ('2', True)):
+        for index, name in enumerate(['U', 'p']):
+            write_field(os.path.join(case_dir, time_name, name), parameters['cells'], name, binary, seed=index)
+    return case_dir
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""Estimates the quality of a decomposition before a parallel run: the cells of every rank, the faces shared between
+ranks and the graph of neighbouring ranks, from the processor* meshes or the log of decomposePar. Candidate methods
+and numbers of subdomains are decomposed in scratch copies of the case and compared side by side"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utilities.classFoamDictEditor import ClassFoamDictEditor
+from utilities.classPolyMesh import read_patches
+from utilities.classTimeIndex import TimeIndex
+from utilities.foamLists import read_file_bytes, read_list_file
+
+DECOMPOSE_LOG = 'log.decomposePar'
+DECOMPOSE_PAR_DICT = os.path.join('system', 'decomposeParDict')
+PROCESSOR_PATTERN = re.compile(r'processor(\d+)')
+# The counts OpenFOAM writes into the note of the owner file, e.g. "nPoints:1331 nCells:1000 nFaces:3300"
+CELL_COUNT_PATTERN = re.compile(rb'nCells:\s*(\d+)')
+LOG_PROCESSOR_PATTERN = re.compile(r'^Processor (\d+)\s*$(.*?)(?=^Processor \d+\s*$|\Z)', re.MULTILINE | re.DOTALL)
+LOG_CELLS_PATTERN = re.compile(r'Number of cells = (\d+)')
+LOG_SHARED_PATTERN = re.compile(r'Number of faces shared with processor (\d+) = (\d+)')
+# Rows of the comparison: (metric, label, format)
+METRICS = [
+    ('ranks', 'Ranks', '{:d}'),
+    ('cells', 'Cells', '{:d}'),
+    ('min_cells', 'Min cells per rank', '{:d}'),
+    ('max_cells', 'Max cells per rank', '{:d}'),
+    ('imbalance', 'Cell imbalance (max/mean - 1)', '{:.1%}'),
+    ('processor_faces', 'Processor faces', '{:d}'),
+    ('max_rank_faces', 'Max processor faces per rank', '{:d}'),
+    ('face_imbalance', 'Face imbalance (max/mean - 1)', '{:.1%}'),
+    ('max_surface_ratio', 'Max processor faces per cell', '{:.4f}'),
+    ('mean_neighbours', 'Mean neighbours per rank', '{:.2f}'),
+    ('max_neighbours', 'Max neighbours per rank', '{:d}'),
+    ('efficiency', 'Load balance efficiency (mean/max)', '{:.1%}'),
+]
+
+
+class Decomposition:
+    """Cells of every rank and the faces shared by every pair of ranks"""
+
+    def __init__(self, cells, shared: dict[tuple[int, int], int]):
+        self.cells = np.asarray(cells, dtype=np.int64)
+        self.shared = shared
+
+
+    @classmethod
+    def from_processor_meshes(cls, case_dir: str = '.'):
+        """Reads the meshes of processor*/constant/polyMesh (or of the first time of older versions)"""
+        time_index = TimeIndex(case_dir, use_cache_file=False)
+        processors = [name for name in time_index.processors if PROCESSOR_PATTERN.fullmatch(name)]
+        if not processors:
+            raise FileNotFoundError(f"No processor directories found in {case_dir}")
+        cells, shared = dict(), dict()
+        for processor in processors:
+            rank = int(PROCESSOR_PATTERN.fullmatch(processor).group(1))
+            mesh_dir = os.path.join(case_dir, processor, 'constant', 'polyMesh')
+            if not os.path.isdir(mesh_dir) and time_index.names(processor):
+                mesh_dir = os.path.join(case_dir, processor, time_index.names(processor)[0], 'polyMesh')
+            cells[rank] = count_cells(mesh_dir)
+            for patch in read_patches(os.path.join(mesh_dir, 'boundary')).values():
+                if patch['type'] == 'processor' and 'neighbProcNo' in patch:
+                    pair = (rank, patch['neighbProcNo'])
+                    shared[pair] = shared.get(pair, 0) + patch['nFaces']
+        return cls([cells.get(rank, 0) for rank in range(max(cells) + 1)], shared)
+
+
+    @classmethod
+    def from_log(cls, path: str):
+        """Parses the per processor summary of a decomposePar log"""
+        with open(path, encoding='utf-8', errors='replace') as file:
+            text = file.read()
+        cells, shared = dict(), dict()
+        for match in LOG_PROCESSOR_PATTERN.finditer(text):
+            rank, block = int(match.group(1)), match.group(2)
+            count = LOG_CELLS_PATTERN.search(block)
+            if count is None:
+                continue
+            cells[rank] = int(count.group(1))
+            for neighbour, faces in LOG_SHARED_PATTERN.findall(block):
+                shared[(rank, int(neighbour))] = int(faces)
+        if not cells:
+            raise ValueError(f"No processor summary found in {path}")
+        return cls([cells.get(rank, 0) for rank in range(max(cells) + 1)], shared)
+
+
+    @classmethod
+    def read(cls, source: str):
+        """Reads a decomposition from a case (its processor meshes, else its decomposePar log) or from a log file"""
+        if os.path.isfile(source):
+            return cls.from_log(source)
+        try:
+            return cls.from_processor_meshes(source)
+        except FileNotFoundError:
+            log_path = os.path.join(source, DECOMPOSE_LOG)
+            if os.path.isfile(log_path):
+                return cls.from_log(log_path)
+            raise
+
+
+    def metrics(self) -> dict:
+        ranks = len(self.cells)
+        # Faces shared with every other rank, counted once for each of the two ranks
+        graph = np.zeros((ranks, ranks), dtype=np.int64)
+        for (rank, neighbour), faces in self.shared.items():
+            if neighbour < ranks:
+                graph[rank, neighbour] = max(graph[rank, neighbour], faces)
+        graph = np.maximum(graph, graph.T)
+        rank_faces = graph.sum(axis=1)
+        neighbours = np.count_nonzero(graph, axis=1)
+        mean_cells = self.cells.mean()
+        mean_faces = rank_faces.mean()
+        return {
+            'ranks': ranks,
+            'cells': int(self.cells.sum()),
+            'min_cells': int(self.cells.min()),
+            'max_cells': int(self.cells.max()),
+            'imbalance': self.cells.max() / mean_cells - 1 if mean_cells else 0.0,
+            'processor_faces': int(graph.sum() // 2),
+            'max_rank_faces': int(rank_faces.max()),
+            'face_imbalance': rank_faces.max() / mean_faces - 1 if mean_faces else 0.0,
+            'max_surface_ratio': float(np.max(rank_faces / np.maximum(self.cells, 1))),
+            'mean_neighbours': float(neighbours.mean()),
+            'max_neighbours': int(neighbours.max()),
+            'efficiency': mean_cells / self.cells.max() if self.cells.max() else 1.0,
+        }
+
+
+def count_cells(mesh_dir: str) -> int:
+    """Returns the number of cells of a mesh from the note of its owner file, or from the owner list itself"""
+    path = os.path.join(mesh_dir, 'owner')
+    match = CELL_COUNT_PATTERN.search(read_file_bytes(path)[:4096])
+    if match:
+        return int(match.group(1))
+    owner = read_list_file(path)
+    return int(owner.max()) + 1 if len(owner) else 0
+
+
+def parse_candidate(value: str) -> tuple[str, int]:
+    """Parses a candidate of the form method:subdomains, e.g. scotch:16"""
+    method, _, subdomains = value.partition(':')
+    if not method or not subdomains.isdigit() or int(subdomains) < 1:
+        raise argparse.ArgumentTypeError(f"'{value}' is not of the form method:subdomains, e.g. scotch:16")
+    return method, int(subdomains)
+
+
+def decompose_candidate(case_dir: str, method: str, subdomains: int) -> Decomposition:
+    """Decomposes the mesh of the case in a scratch case, which shares the constant directory and gets a copy of
+    system with the candidate decomposeParDict, and reads the resulting processor meshes"""
+    with tempfile.TemporaryDirectory(prefix='.decomposition.', dir=case_dir) as scratch:
+        shutil.copytree(os.path.join(case_dir, 'system'), os.path.join(scratch, 'system'))
+        os.symlink(os.path.abspath(os.path.join(case_dir, 'constant')), os.path.join(scratch, 'constant'))
+        editor = ClassFoamDictEditor(os.path.join(scratch, DECOMPOSE_PAR_DICT))
+        with editor.batch():
+            editor.set_value('numberOfSubdomains', subdomains)
+            editor.set_value('method', method)
+        with open(os.path.join(scratch, DECOMPOSE_LOG), 'w') as log:
+            result = subprocess.run(['decomposePar', '-case', scratch, '-force'], stdout=log,
+                                    stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            with open(os.path.join(scratch, DECOMPOSE_LOG), errors='replace') as log:
+                tail = ''.join(log.readlines()[-5:])
+            raise RuntimeError(f"decomposePar failed for {method}:{subdomains}\n{tail}")
+        return Decomposition.read(scratch)
+
+
+def print_comparison(results: dict[str, dict]) -> None:
+    """Prints the metrics of the decompositions side by side"""
+    labels = list(results)
+    width = max([12, *map(len, labels)])
+    label_width = max(len(label) for _, label, _ in METRICS)
+    print(f"{'':{label_width}}  " + "  ".join(f"{label:>{width}}" for label in labels))
+    for metric, label, value_format in METRICS:
+        values = [value_format.format(results[source][metric]) for source in labels]
+        print(f"{label:{label_width}}  " + "  ".join(f"{value:>{width}}" for value in values))
+
+
+def check_decomposition(sources: list[str], candidates: list[tuple[str, int]], jobs: int = 1) -> dict[str, dict]:
+    results = dict()
+    for source in sources:
+        try:
+            results[source] = Decomposition.read(source).metrics()
+        except (OSError, ValueError) as e:
+            print(f"Could not read the decomposition of {source}: {e}")
+    if candidates:
+        if shutil.which('decomposePar') is None:
+            print("decomposePar not found, source OpenFOAM to decompose the candidates. Exiting.")
+            sys.exit(1)
+        if not os.path.isfile(DECOMPOSE_PAR_DICT):
+            print(f"{DECOMPOSE_PAR_DICT} not found. Exiting.")
+            sys.exit(1)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {f"{method}:{subdomains}": executor.submit(decompose_candidate, '.', method, subdomains)
+                       for method, subdomains in candidates}
+            for label, future in futures.items():
+                try:
+                    results[label] = future.result().metrics()
+                except (OSError, ValueError, RuntimeError) as e:
+                    print(f"Could not decompose {label}: {e}")
+    if not results:
+        print("No decomposition found. Run decomposePar or specify candidates with --candidates. Exiting.")
+        sys.exit(1)
+    print_comparison(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('sources', nargs='*',
+                        help='Decomposed cases or decomposePar logs (default: this case, unless candidates are given)')
+    parser.add_argument('-c', '--candidates', nargs='+', type=parse_candidate, default=[],
+                        metavar='METHOD:SUBDOMAINS', help='Decompositions to compare, e.g. scotch:16 hierarchical:16')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of candidates decomposed at once (default: 1)')
+    args = parser.parse_args()
+    sources = args.sources or ([] if args.candidates else ['.'])
+    check_decomposition(sources, args.candidates, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import sys
 import os
 from pathlib import Path
 from typing import Dict, Optional
+from utilities.classFieldFile import FieldFile
 
 def read_file(file_path: Path) -> Optional[str]:
     """Read and return file contents, handling potential errors."""
@@ -169,8 +170,12 @@ def main(source_path: str, target_path: str):
     if not source_content:
         sys.exit(1)
     
-    target_content = read_file(target)
-    if not target_content:
+    # Only the boundaryField of the target is read, the internalField payload is streamed and never loaded
+    try:
+        target_field = FieldFile(str(target))
+        target_content = target_field.read_text('boundaryField')
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading file {target}: {str(e)}")
         sys.exit(1)
     
     patch_configs = extract_master_patches(source_content)
@@ -181,8 +186,7 @@ def main(source_path: str, target_path: str):
     new_content = update_p_file_content(target_content, patch_configs)
     
     try:
-        with open(target, 'w') as f:
-            f.write(new_content)
+        target_field.replace_sections({'boundaryField': new_content})
         print(f"Successfully updated {target}")
     except Exception as e:
         print(f"Error writing to {target}: {str(e)}")
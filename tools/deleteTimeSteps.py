@@ -1,30 +1,113 @@
 #!/usr/bin/python
 
+"""Deletes the time step directories (except '0') of the case and of all processor directories"""
+
+import argparse
 import os
-import re
-
-def delete_numeric_folders(directory):
-    number_pattern = re.compile(r'^\d+(\.\d+)?$')
-
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
-
-        # Check if it's a directory and matches the number pattern (except '0')
-        if os.path.isdir(item_path) and number_pattern.fullmatch(item) and item != '0':
-            try:
-                # Recursively remove all files and subdirectories
-                for root, dirs, files in os.walk(item_path, topdown=False):
-                    for file in files:
-                        os.remove(os.path.join(root, file))
-                    for subdir in dirs:
-                        os.rmdir(os.path.join(root, subdir))
-
-                # Remove the now-empty directory
-                os.rmdir(item_path)
-                print(f"Removed: {item_path}")
-            except Exception as e:
-                print(f"Error removing {item_path}: {e}")
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from utilities.classTimeIndex import TimeIndex, parse_time
 
-if __name__ == "__main__":
+
+def find_time_directories(directory) -> dict[Decimal, list[str]]:
+    """Collects the time directories (except '0') of the case and processor directories, grouped by time"""
+    return TimeIndex(directory).all_time_directories(include_zero=False)
+
+
+def time_argument(value: str) -> Decimal:
+    time = parse_time(value)
+    if time is None:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a time")
+    return time
+
+
+def select_times_to_delete(times, keep_latest: int = 0, keep_every: int = 0, keep_times=None) -> list[Decimal]:
+    """Applies the retention policies to the sorted times and returns the times to delete"""
+    times = sorted(times)
+    keep = set()
+    if keep_latest > 0:
+        keep.update(times[-keep_latest:])
+    if keep_every > 0:
+        keep.update(times[keep_every - 1::keep_every])
+    if keep_times:
+        keep.update(Decimal(str(time)) for time in keep_times)
+    return [time for time in times if time not in keep]
+
+
+def directory_size(path: str) -> int:
+    """Returns the total size of all files within a directory"""
+    size = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                size += directory_size(entry.path)
+            else:
+                size += entry.stat(follow_symlinks=False).st_size
+    return size
+
+
+def remove_tree(path: str) -> None:
+    """Recursively removes a directory using os.scandir"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                remove_tree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
+
+def remove_time_directory(item_path: str) -> bool:
+    try:
+        remove_tree(item_path)
+        print(f"Removed: {item_path}")
+        return True
+    except Exception as e:
+        print(f"Error removing {item_path}: {e}")
+        return False
+
+
+def format_size(size: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024 or unit == 'TB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def delete_numeric_folders(directory, keep_latest: int = 0, keep_every: int = 0, keep_times=None,
+                           dry_run: bool = False, jobs: int | None = None):
+    time_dirs = find_time_directories(directory)
+    times_to_delete = select_times_to_delete(time_dirs.keys(), keep_latest, keep_every, keep_times)
+    targets = [path for time in times_to_delete for path in time_dirs[time]]
+    kept = sorted(set(time_dirs) - set(times_to_delete))
+    if kept:
+        print(f"Keeping times: {' '.join(str(time) for time in kept)}")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        if dry_run:
+            sizes = dict(zip(targets, executor.map(directory_size, targets)))
+            for time in times_to_delete:
+                time_size = sum(sizes[path] for path in time_dirs[time])
+                print(f"Would remove time {time} ({len(time_dirs[time])} directories, {format_size(time_size)})")
+            print(f"Would remove {len(targets)} directories ({format_size(sum(sizes.values()))})")
+            return
+        removed = sum(executor.map(remove_time_directory, targets))
+    print(f"Removed {removed} of {len(targets)} directories")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keep-latest', type=int, default=0, metavar='N', help='Keep the latest N times')
+    parser.add_argument('--keep-every', type=int, default=0, metavar='K', help='Keep every K-th time')
+    parser.add_argument('--keep', nargs='+', type=time_argument, default=None, metavar='TIME',
+                        help='Keep the listed times')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be removed and its size')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of directories removed concurrently (default: based on the number of CPUs)')
+    args = parser.parse_args()
     target_directory = os.getcwd()  # Use the directory where the script is run
-    delete_numeric_folders(target_directory)
+    delete_numeric_folders(target_directory, args.keep_latest, args.keep_every, args.keep, args.dry_run, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
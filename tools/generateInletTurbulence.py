@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+"""Writes spatially varying (nonuniform) inlet values of k, epsilon, omega and nut. The FlowMetrics estimates are
+evaluated for every face of the inlet patches, from the velocity of the inlet faces and their distance to the walls"""
+
+import argparse
+import os
+import re
+import sys
+import numpy as np
+from utilities.classFieldFile import FieldFile
+from utilities.classFieldReader import FieldReader
+from utilities.classFlowMetrics import FlowMetricsArray, TURB_LENGTH_SCALE_COEFFICIENT
+from utilities.classFluidProperties import read_kinematic_viscosity
+from utilities.classFoamDictEditor import FoamDictParser
+from utilities.classPolyMesh import PolyMesh, read_patches
+from utilities.foamLists import format_field_value, write_precision
+from utilities.lazyImports import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+MESH_DIRECTORY = os.path.join('constant', 'polyMesh')
+# The fields written and the boundary type of their inlet values
+TURBULENCE_FIELDS = {'k': 'fixedValue', 'epsilon': 'fixedValue', 'omega': 'fixedValue', 'nut': 'calculated'}
+KARMAN_CONSTANT = 0.41
+POWER_LAW_EXPONENT = 7
+# Floors (relative to the maximum) which keep the estimates finite for faces touching a wall
+MIN_VELOCITY_FRACTION = 0.01
+MIN_LENGTH_FRACTION = 0.01
+
+
+def find_patch_entry(boundary: dict, patch_name: str):
+    """Returns the entries of a patch of a boundaryField, matched literally or by a quoted regular expression"""
+    if patch_name in boundary or f'"{patch_name}"' in boundary:
+        return boundary.get(patch_name, boundary.get(f'"{patch_name}"'))
+    for key, entries in reversed(boundary.items()):
+        if key.startswith('"') and re.fullmatch(key.strip('"'), patch_name):
+            return entries
+    return None
+
+
+def inlet_velocity(time_name: str, patch_name: str, n_faces: int) -> np.ndarray | None:
+    """Returns the velocity magnitude of the faces of a patch from the value of the U field (None if it has none)"""
+    try:
+        boundary = FieldReader(os.path.join(time_name, 'U')).boundary_field()
+    except FileNotFoundError:
+        return None
+    entries = find_patch_entry(boundary, patch_name) or dict()
+    value = entries.get('value')
+    if not isinstance(value, np.ndarray):
+        return None
+    magnitude = np.linalg.norm(np.atleast_2d(value), axis=1)
+    return np.broadcast_to(magnitude, (n_faces,)) if magnitude.size == 1 else magnitude
+
+
+def wall_distance(mesh: PolyMesh, patches: dict, face_centres: np.ndarray) -> np.ndarray | None:
+    """Returns the distance of face centres to the nearest wall point (None if the mesh has no walls). The points
+    and face centres of the walls are used, as the points on the edge of an inlet are closer than any face centre"""
+    walls = list()
+    for patch in patches.values():
+        if patch['type'] != 'wall' or not patch['nFaces']:
+            continue
+        start, end = patch['startFace'], patch['startFace'] + patch['nFaces']
+        walls.append(mesh.face_geometry(start, patch['nFaces'])[0])
+        walls.append(mesh.points[np.unique(mesh.face_points[mesh.face_offsets[start]:mesh.face_offsets[end]])])
+    if not walls:
+        return None
+    distances, _ = spatial.cKDTree(np.concatenate(walls)).query(face_centres)
+    return distances
+
+
+def inlet_metrics(mesh, patches, patch_name, time_name, velocity=None, hydraulic_diameter=None,
+                  kinematic_viscosity=None, profile='field') -> FlowMetricsArray:
+    """Evaluates the flow metrics for every face of an inlet patch"""
+    patch = patches[patch_name]
+    centres, areas = mesh.face_geometry(patch['startFace'], patch['nFaces'])
+    distances = wall_distance(mesh, patches, centres)
+    if hydraulic_diameter is None:
+        # Twice the largest wall distance, or the diameter of a circle of the same area if there are no walls
+        area = np.linalg.norm(areas, axis=1).sum()
+        hydraulic_diameter = 2 * distances.max() if distances is not None else np.sqrt(4 * area / np.pi)
+
+    face_velocity = inlet_velocity(time_name, patch_name, patch['nFaces']) if velocity is None else None
+    free_stream_velocity = velocity if velocity is not None else (face_velocity.max() if face_velocity is not None
+                                                                   else None)
+    if free_stream_velocity is None:
+        raise ValueError(f"No velocity found for patch {patch_name} in {time_name}/U, specify it with --velocity")
+    if profile == 'power-law':
+        if distances is None:
+            raise ValueError("The power-law profile needs wall patches to compute the wall distance")
+        # Fully developed turbulent profile, U = U_max * (y / R)^(1/7)
+        face_velocity = free_stream_velocity * np.minimum(distances / distances.max(), 1) ** (1 / POWER_LAW_EXPONENT)
+    elif face_velocity is None:
+        face_velocity = np.full(patch['nFaces'], float(free_stream_velocity))
+    face_velocity = np.maximum(face_velocity, MIN_VELOCITY_FRACTION * free_stream_velocity)
+
+    # The mixing length grows with the distance to the wall up to the estimate of the core flow
+    length_scale = TURB_LENGTH_SCALE_COEFFICIENT * hydraulic_diameter
+    if distances is not None:
+        length_scale = np.clip(KARMAN_CONSTANT * distances, MIN_LENGTH_FRACTION * length_scale, length_scale)
+    return FlowMetricsArray(hydraulic_diameter, face_velocity, kinematic_viscosity, turb_length_scale=length_scale)
+
+
+def patch_block(patch_name: str, boundary_type: str, value: str, indent: str = '    ') -> str:
+    return (f'{indent}{patch_name}\n{indent}{{\n'
+            f'{indent}    type            {boundary_type};\n'
+            f'{indent}    value           {value};\n'
+            f'{indent}}}\n')
+
+
+def write_inlet_values(path: str, boundary_type: str, values: dict[str, np.ndarray], precision: int) -> bool:
+    """Writes nonuniform values of patches into the boundaryField of a field file. A literal entry of a patch is
+    replaced, otherwise an entry is added at the start of the boundaryField, where it takes precedence over patterns"""
+    field_file = FieldFile(path)
+    text = field_file.read_text('boundaryField')
+    boundary = FoamDictParser(text, field_file.element_sizes or {}).parse().children[0]
+    splices = list()
+    for patch_name, patch_values in values.items():
+        value = format_field_value(patch_values, 'scalar', field_file.element_sizes, precision).decode('latin-1')
+        block = patch_block(patch_name, boundary_type, value)
+        literal = [patch for patch in boundary.children if patch.kind == 'dict' and patch.key.strip('"') == patch_name]
+        if literal:
+            line_start = text.rfind('\n', 0, literal[-1].start) + 1
+            line_end = literal[-1].end + 1 if text.startswith('\n', literal[-1].end) else literal[-1].end
+            splices.append((line_start, line_end, block))
+        else:
+            body_start = text.index('\n', boundary.value_start) + 1 if '\n' in text[boundary.value_start:] \
+                else boundary.value_start
+            splices.append((body_start, body_start, block))
+    for start, end, replacement in sorted(splices, reverse=True):
+        text = text[:start] + replacement + text[end:]
+    return field_file.replace_sections({'boundaryField': text})
+
+
+def generate_inlet_turbulence(patch_names=None, time_name='0', velocity=None, hydraulic_diameter=None,
+                              kinematic_viscosity=None, profile='field') -> None:
+    if not os.path.isdir(MESH_DIRECTORY):
+        print(f"Mesh directory {MESH_DIRECTORY} not found. Exiting.")
+        sys.exit(1)
+    patches = read_patches(os.path.join(MESH_DIRECTORY, 'boundary'))
+    if not patch_names:
+        patch_names = [name for name, patch in patches.items()
+                       if 'inlet' in name.lower() and 'inletoutlet' not in name.lower() and patch['type'] == 'patch']
+    missing = [name for name in patch_names if name not in patches]
+    if missing or not patch_names:
+        print(f"Inlet patch(es) {', '.join(missing) or ''} not found in {MESH_DIRECTORY}/boundary. Exiting.")
+        sys.exit(1)
+    kinematic_viscosity = kinematic_viscosity or read_kinematic_viscosity()
+    if kinematic_viscosity is None:
+        print("No kinematic viscosity found in constant/physicalProperties, specify it with --viscosity. Exiting.")
+        sys.exit(1)
+
+    mesh = PolyMesh(MESH_DIRECTORY)
+    metrics = dict()
+    for patch_name in patch_names:
+        try:
+            metrics[patch_name] = inlet_metrics(mesh, patches, patch_name, time_name, velocity, hydraulic_diameter,
+                                                kinematic_viscosity, profile)
+        except ValueError as e:
+            print(f"{e}. Exiting.")
+            sys.exit(1)
+        k = metrics[patch_name].turb_kinetic_energy
+        print(f"{patch_name}: {patches[patch_name]['nFaces']} faces, k {k.min():.3g} to {k.max():.3g}")
+
+    precision = write_precision()
+    attributes = {'k': 'turb_kinetic_energy', 'epsilon': 'turb_dissipation_rate', 'omega': 'specific_dissipation',
+                  'nut': 'turb_viscosity'}
+    for field, boundary_type in TURBULENCE_FIELDS.items():
+        path = os.path.join(time_name, field)
+        if not os.path.isfile(path):
+            continue
+        values = {name: getattr(patch_metrics, attributes[field]) for name, patch_metrics in metrics.items()}
+        changed = write_inlet_values(path, boundary_type, values, precision)
+        print(f"{'Updated' if changed else 'Unchanged'} {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('patches', nargs='*', help='Inlet patches (default: the patches named *inlet*)')
+    parser.add_argument('-t', '--time', default='0', help='Time directory of the fields (default: 0)')
+    parser.add_argument('--profile', choices=['field', 'power-law'], default='field',
+                        help='Velocity of the faces: the inlet value of U (default) or a 1/7 power-law profile '
+                             'from the wall distance')
+    parser.add_argument('--velocity', type=float, default=None,
+                        help='Free stream velocity (default: the largest inlet velocity of U)')
+    parser.add_argument('--hydraulic-diameter', type=float, default=None,
+                        help='Hydraulic diameter (default: twice the largest wall distance of the inlet)')
+    parser.add_argument('--viscosity', type=float, default=None,
+                        help='Kinematic viscosity (default: nu of constant/physicalProperties)')
+    args = parser.parse_args()
+    generate_inlet_turbulence(args.patches, args.time, args.velocity, args.hydraulic_diameter, args.viscosity,
+                              args.profile)
+
+
+if __name__ == "__main__":
+    main()
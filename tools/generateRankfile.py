@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""Generates system/rankfile from the CPU topology of the host(s) and sets the matching numberOfSubdomains in
+system/decomposeParDict. The ranks are balanced over the NUMA nodes and pinned to physical cores"""
+
+import argparse
+import os
+import sys
+from utilities.classCpuTopology import CpuTopology, LSCPU_COLUMNS, distribute
+from utilities.classFoamDictEditor import ClassFoamDictEditor
+
+SYSTEM_DIRECTORY = 'system'
+RANKFILE = os.path.join(SYSTEM_DIRECTORY, 'rankfile')
+MACHINES_FILE = os.path.join(SYSTEM_DIRECTORY, 'machines')
+DECOMPOSE_PAR_DICT = os.path.join(SYSTEM_DIRECTORY, 'decomposeParDict')
+LOCALHOST = 'localhost'
+
+
+def read_machines(path: str, default_cpus: int) -> list[tuple[str, int]]:
+    """Reads the hosts of a machines file ('host cpu=N', or 'host slots=N' as in an Open MPI hostfile)"""
+    machines = list()
+    with open(path) as file:
+        for line in file:
+            words = line.split('#')[0].split()
+            if not words:
+                continue
+            cpus = default_cpus
+            for word in words[1:]:
+                key, _, value = word.partition('=')
+                if key in ('cpu', 'cpus', 'slots') and value.isdigit():
+                    cpus = int(value)
+            machines.append((words[0], cpus))
+    return machines
+
+
+def rankfile_lines(hosts: list[tuple[str, int]], topology: CpuTopology, ranks: int) -> list[str]:
+    """Splits the ranks over the hosts in proportion to their CPUs and places them on the cores of every host"""
+    lines = list()
+    for (host, _), share in zip(hosts, distribute(ranks, [cpus for _, cpus in hosts])):
+        for slot in topology.place(share):
+            lines.append(f"rank {len(lines)} ={host} slot={slot}")
+    return lines
+
+
+def set_number_of_subdomains(path: str, ranks: int) -> None:
+    if not os.path.isfile(path):
+        print(f"{path} not found, numberOfSubdomains not set")
+        return
+    editor = ClassFoamDictEditor(path)
+    if editor.get_value('numberOfSubdomains') != ranks:
+        editor.set_value('numberOfSubdomains', ranks)
+    print(f"Set numberOfSubdomains {ranks} in {path}")
+
+
+def generate_rankfile(ranks: int | None = None, machines: str | None = None, lscpu: str | None = None,
+                      output: str = RANKFILE, decompose: bool = True) -> None:
+    try:
+        if lscpu:
+            with open(lscpu) as file:
+                topology = CpuTopology.from_lscpu(file.read())
+        else:
+            topology = CpuTopology.detect()
+    except (OSError, ValueError) as e:
+        print(f"Could not read the CPU topology: {e}. Exiting.")
+        sys.exit(1)
+    print(f"Topology: {topology.describe()}")
+
+    if machines:
+        if not os.path.isfile(machines):
+            print(f"Machines file {machines} not found. Exiting.")
+            sys.exit(1)
+        # Every host is assumed to have the topology read (of this host, or of the lscpu output)
+        hosts = [(host, min(cpus, topology.physical_cores))
+                 for host, cpus in read_machines(machines, topology.physical_cores)]
+    else:
+        hosts = [(LOCALHOST, topology.physical_cores)]
+    capacity = sum(cpus for _, cpus in hosts)
+    ranks = ranks or capacity
+    if not 0 < ranks <= capacity:
+        print(f"{ranks} ranks do not fit on the {capacity} cores of {len(hosts)} host(s). Exiting.")
+        sys.exit(1)
+
+    try:
+        lines = rankfile_lines(hosts, topology, ranks)
+    except ValueError as e:
+        print(f"{e}. Exiting.")
+        sys.exit(1)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        file.write("\n".join(lines) + "\n")
+    print(f"Wrote {ranks} ranks on {len(hosts)} host(s) to {output}")
+    if decompose:
+        set_number_of_subdomains(DECOMPOSE_PAR_DICT, ranks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('ranks', nargs='?', type=int, default=None,
+                        help='Number of ranks (default: all physical cores of the host(s))')
+    parser.add_argument('--machines', nargs='?', const=MACHINES_FILE, default=None,
+                        help=f'Distribute the ranks over the hosts of a machines file (default: {MACHINES_FILE})')
+    parser.add_argument('--lscpu', default=None,
+                        help=f"Topology from the output of 'lscpu -p={LSCPU_COLUMNS}' (default: this host)")
+    parser.add_argument('-o', '--output', default=RANKFILE, help=f'Path of the rankfile (default: {RANKFILE})')
+    parser.add_argument('--no-decompose', action='store_true',
+                        help='Do not set numberOfSubdomains in system/decomposeParDict')
+    args = parser.parse_args()
+    generate_rankfile(args.ranks, args.machines, args.lscpu, args.output, not args.no_decompose)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,134 @@
 #!/usr/bin/env python3
+import argparse
+import fcntl
 import os
-import re
-import glob
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from utilities.classTimeIndex import TimeIndex
 
-def is_time_dir(dir_name):
-    """Check if directory name is a time value (number or floating point)"""
-    return re.match(r'^[0-9]+(\.[0-9]+)?$', dir_name) is not None
+# Mesh directories copied from the latest time into constant/
+MESH_DIRECTORIES = ["polyMesh", "fvMesh"]
+# Linux ioctl that clones a file by sharing its extents (reflink) on btrfs, XFS, bcachefs, ...
+FICLONE = 0x40049409
+TEMP_SUFFIX = ".foco-tmp"
 
 def get_latest_time(proc_dir='processor0'):
     """Get the latest time directory from a reference processor directory"""
-    # Find all time directories
-    time_dirs = [d for d in os.listdir(proc_dir) if os.path.isdir(os.path.join(proc_dir, d)) and is_time_dir(d)]
-    
-    # Sort time directories numerically
-    time_dirs.sort(key=float)
-    
-    if not time_dirs:
+    latest_time = TimeIndex().latest(proc_dir)
+
+    if latest_time is None:
         print(f"No time directories found in {proc_dir} directory. Aborting override.")
         sys.exit(1)
-    
-    latest_time = time_dirs[-1]
+
     print(f"Latest time in {proc_dir} is {latest_time}")
     return latest_time
 
+def reflink_file(src, dst):
+    """Clones a file without copying its data. Raises OSError if the filesystem does not support it"""
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    shutil.copystat(src, dst)
+
+def transfer_file(src, dst, method):
+    """Replaces dst by a copy, reflink or hard link of src. The new file is created next to dst and renamed over
+    it, so an existing dst (which may be a hard link itself) is never modified in place"""
+    tmp = dst + TEMP_SUFFIX
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    if method == "hardlink":
+        os.link(src, tmp)
+    elif method == "reflink":
+        reflink_file(src, tmp)
+    elif method == "auto":
+        try:
+            reflink_file(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+    else:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+def is_identical(src, dst):
+    """Checks if every file of src exists in dst with the same size and mtime"""
+    for root, _, files in os.walk(src):
+        for name in files:
+            src_stat = os.stat(os.path.join(root, name))
+            try:
+                dst_stat = os.stat(os.path.join(dst, os.path.relpath(root, src), name))
+            except FileNotFoundError:
+                return False
+            if (src_stat.st_size, src_stat.st_mtime_ns) != (dst_stat.st_size, dst_stat.st_mtime_ns):
+                return False
+    return True
+
+def transfer_tree(src, dst, method):
+    """Transfers the files of src into dst, overwriting files of the same name"""
+    for root, _, files in os.walk(src):
+        target_root = os.path.normpath(os.path.join(dst, os.path.relpath(root, src)))
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            if method == "move":
+                # Every file is renamed over its namesake, so an interruption never leaves the processor without
+                # a mesh and files only found in constant (e.g. the *ProcAddressing of reconstructPar) are kept
+                os.replace(os.path.join(root, name), os.path.join(target_root, name))
+            else:
+                transfer_file(os.path.join(root, name), os.path.join(target_root, name), method)
+    if method == "move":
+        # Remove the directories emptied by the move, deepest first
+        for root, _, _ in sorted(os.walk(src), key=lambda walked: -walked[0].count(os.sep)):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+def override_processor(proc_dir, latest_time, method):
+    """Overrides the constant mesh of one processor directory. Returns a status message"""
+    mesh_paths = [os.path.join(proc_dir, latest_time, mesh) for mesh in MESH_DIRECTORIES]
+    if not all(os.path.isdir(mesh_path) for mesh_path in mesh_paths):
+        return f"Missing polyMesh or fvMesh in {proc_dir}/{latest_time}"
+    const_paths = [os.path.join(proc_dir, "constant", mesh) for mesh in MESH_DIRECTORIES]
+    if method != "move" and all(map(is_identical, mesh_paths, const_paths)):
+        return f"Skipping {proc_dir}, constant mesh is up to date"
+    try:
+        for mesh_path, const_path in zip(mesh_paths, const_paths):
+            transfer_tree(mesh_path, const_path, method)
+    except OSError as e:
+        return f"Error overriding {proc_dir}: {e}"
+    return f"Overrode {proc_dir}/constant with the mesh of {latest_time} ({method})"
+
 def main():
+    parser = argparse.ArgumentParser(description="Override the constant mesh of all processor directories with the "
+                                                 "polyMesh and fvMesh of the latest time")
+    parser.add_argument('--method', choices=["auto", "copy", "reflink", "hardlink", "move"], default="auto",
+                        help="auto: reflink where the filesystem supports it, otherwise copy. "
+                             "hardlink: share the files with the time directory (no extra disk use, but later "
+                             "in-place edits affect both). move: rename the mesh out of the time directory")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of processor directories processed concurrently (default: based on the number of CPUs)')
+    args = parser.parse_args()
+
     print("\nOverriding 'constant/' directory in processor folders")
-    
+
     # Make sure processor0 exists
     if not os.path.isdir("processor0"):
         print("Error: processor0 directory not found. Make sure you're in the correct directory.")
         sys.exit(1)
-    
+
     # Get the latest time from processor0
     latest_time = get_latest_time()
-    
-    # Loop through all processor directories
-    for proc_dir in glob.glob("processor*"):
-        # Check if both polyMesh and fvMesh directories exist in the latest time
-        poly_mesh_path = os.path.join(proc_dir, latest_time, "polyMesh")
-        fv_mesh_path = os.path.join(proc_dir, latest_time, "fvMesh")
-        
-        if os.path.isdir(poly_mesh_path) and os.path.isdir(fv_mesh_path):
-            # Create destination directories
-            const_poly_path = os.path.join(proc_dir, "constant", "polyMesh")
-            const_fv_path = os.path.join(proc_dir, "constant", "fvMesh")
-            
-            os.makedirs(const_poly_path, exist_ok=True)
-            os.makedirs(const_fv_path, exist_ok=True)
-            
-            # Copy polyMesh files
-            print(f"Copying {poly_mesh_path} to {const_poly_path}")
-            for item in os.listdir(poly_mesh_path):
-                src = os.path.join(poly_mesh_path, item)
-                dst = os.path.join(const_poly_path, item)
-                if os.path.isdir(src):
-                    if os.path.exists(dst):
-                        shutil.rmtree(dst)
-                    shutil.copytree(src, dst)
-                else:
-                    shutil.copy2(src, dst)
-            
-            # Copy fvMesh files
-            print(f"Copying {fv_mesh_path} to {const_fv_path}")
-            for item in os.listdir(fv_mesh_path):
-                src = os.path.join(fv_mesh_path, item)
-                dst = os.path.join(const_fv_path, item)
-                if os.path.isdir(src):
-                    if os.path.exists(dst):
-                        shutil.rmtree(dst)
-                    shutil.copytree(src, dst)
-                else:
-                    shutil.copy2(src, dst)
-        else:
-            print(f"Missing polyMesh or fvMesh in {proc_dir}/{latest_time}")
-    
+
+    # Process all processor directories concurrently (the work is dominated by file system calls)
+    processors = TimeIndex().processors
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        messages = list(executor.map(override_processor, processors, [latest_time] * len(processors),
+                                     [args.method] * len(processors)))
+    for message in messages:
+        print(message)
+
     print("Completed Override!\n")
+    if any(message.startswith("Error") for message in messages):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -6,13 +6,17 @@ Plots and CSV files are saved in the OpenFOAM standard 'postProcessing' director
 """
 
 import re
-import matplotlib.pyplot as plt
 import os
 import sys
 import argparse
 import csv
 from datetime import datetime
+from utilities.instrumentation import instrumented
+from utilities.lazyImports import lazy_import
 
+plt = lazy_import('matplotlib.pyplot')
+
+@instrumented
 def extract_residuals(log_file):
     """Extract residual data from OpenFOAM log file."""
     residuals = {}
@@ -47,6 +51,7 @@ def extract_residuals(log_file):
     
     return iterations, residuals
 
+@instrumented
 def save_residuals_to_csv(iterations, residuals, output_path):
     """Save residual data to a CSV file."""
     with open(output_path, 'w', newline='') as csvfile:
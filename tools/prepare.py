@@ -3,6 +3,7 @@
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from estimateInternalFields import estimate_internal_fields
 from utilities.parseArgs import detect_and_parse_arguments
 
@@ -375,19 +376,28 @@ def replace_dynamic_sliding_mesh(patch_names):
     return [(replacement_pattern, replace)], 'dynamicMeshDictSlidingMulti'
 
 
-def replace_zero_boundaries(patch_names, boundary_types, boundary_values, internal_field):
+def classify_patches(patch_names) -> dict:
+    """Derive the patch and boundary type of every patch once, so they can be shared by all fields"""
+    return {patch_name: {'patch_type': get_patch_type_from_patch_name(patch_name),
+                         'boundary_type': get_boundary_type_from_patch_name(patch_name)}
+            for patch_name in patch_names}
+
+
+def replace_zero_boundaries(patch_names, boundary_types, boundary_values, internal_field, patch_classes=None):
     """Function to find the replacement pattern and text for a specific template"""
+    if patch_classes is None:
+        patch_classes = classify_patches(patch_names)
 
     # Group patches by type
     patch_groups = {}
     for patch_name in patch_names:
-        patch_type = get_patch_type_from_patch_name(patch_name)
+        patch_type = patch_classes[patch_name]['patch_type']
         # Override patch type for special patches (fan, porous screen, etc.)
         if patch_name in boundary_types and 'type' in boundary_types[patch_name]:
             patch_type = boundary_types[patch_name]
         # If the patch type is not specified, get the type
         if patch_type not in boundary_types:
-            boundary_types[patch_type] = get_boundary_type_from_patch_name(patch_name)
+            boundary_types[patch_type] = patch_classes[patch_name]['boundary_type']
         # If this is the first patch of its type, start a group
         if patch_type not in patch_groups:
             patch_groups[patch_type] = []
@@ -419,16 +429,30 @@ def replace_zero_boundaries(patch_names, boundary_types, boundary_values, intern
     return patterns_and_replacements
 
 
-def perform_regex_replacements(patterns_and_replacements: list, template_path: str, output_path: str):
-    # Read the template file
+def render_template(patterns_and_replacements: list, template_path: str) -> str:
+    """Read a template and return its content with all the replacements applied"""
     with open(template_path, 'r') as template_file:
         content = template_file.read()
-    # Perform the replacements
     for pattern, replacement in patterns_and_replacements:
         content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
-    # Write the updated content
+    return content
+
+
+def write_if_changed(content: str, output_path: str) -> bool:
+    """Write the content only if it differs from the existing file, so unchanged files keep their mtime"""
+    if os.path.isfile(output_path):
+        with open(output_path, 'r') as existing_file:
+            if existing_file.read() == content:
+                return False
     with open(output_path, 'w') as output_file:
         output_file.write(content)
+    return True
+
+
+def perform_regex_replacements(patterns_and_replacements: list, template_path: str, output_path: str) -> bool:
+    """Render a template and write it to the output path. Returns True if the output file was rewritten"""
+    content = render_template(patterns_and_replacements, template_path)
+    return write_if_changed(content, output_path)
 
 
 def generate_dict(patch_names, template_name, template_dir, output_name, output_dir, replace_function):
@@ -459,8 +483,10 @@ def generate_dynamic_mesh_dict(patch_names, template_dir, output_name, output_di
         print(f"Could not generate suitable inputs for {output_name}")
 
 
-def generate_zero_file(patch_names: list, field: str, boundary_dict: dict):
-    """Creates a file in the zero directory with grouped patch settings."""
+def generate_zero_file(patch_names: list, field: str, boundary_dict: dict, patch_classes: dict | None = None):
+    """Creates a file in the zero directory with grouped patch settings. Returns True if the file was rewritten"""
+    if patch_classes is None:
+        patch_classes = classify_patches(patch_names)
     template_path = os.path.join(TEMPLATE_BOUNDARY_DIR, f"{field}")
     output_path = os.path.join(ZERO_DIR, field)
     boundary_types = boundary_dict['types']
@@ -480,7 +506,7 @@ def generate_zero_file(patch_names: list, field: str, boundary_dict: dict):
 
     # Create a fan condition for internal fan faces for the pressure field
     for j in (i for i in patch_names if "fan" in i.lower() and field == "p"
-                                        and get_boundary_type_from_patch_name(i) == "cyclic"):
+                                        and patch_classes[i]['boundary_type'] == "cyclic"):
         boundary_types[j] = (f'{" " * 8}type            fanPressureJump;  // Units are pressure(Pa) / density (rho)\n'
                              f'{" " * 8}patchType       cyclic;\n'
                              f'{" " * 8}value           uniform 0;\n'
@@ -490,7 +516,7 @@ def generate_zero_file(patch_names: list, field: str, boundary_dict: dict):
 
     # Create a porous condition for internal porous faces for the pressure field
     for j in (i for i in patch_names if "porous" in i.lower() and field == "p"
-                                        and get_boundary_type_from_patch_name(i) == "cyclic"):
+                                        and patch_classes[i]['boundary_type'] == "cyclic"):
         boundary_types[j] = (f'{" " * 8}type            porousBafflePressure;\n'
                              f'{" " * 8}patchType       cyclic;\n'
                              f'{" " * 8}value           uniform 0;\n'
@@ -501,7 +527,7 @@ def generate_zero_file(patch_names: list, field: str, boundary_dict: dict):
                              f'{" " * 8}length          0.002;    // Scaling of pressure drop\n')
 
     # Create a velocity condition for rotating surfaces in the velocity field
-    for j in (i for i in patch_names if field == "U" and get_boundary_type_from_patch_name(i) == "rotating"):
+    for j in (i for i in patch_names if field == "U" and patch_classes[i]['boundary_type'] == "rotating"):
         boundary_types[j] = (f'{" " * 8}#include "../system/fvSchemes"\n'
                              f'{" " * 8}#ifeq $ddtSchemes/default steadyState\n'
                              f'{" " * 12}type        MRFnoSlip;\n'
@@ -514,9 +540,9 @@ def generate_zero_file(patch_names: list, field: str, boundary_dict: dict):
     excluded = ('zone', 'region', 'honeycomb')
     filtered_names = [i for i in patch_names if 'ncc' in i.lower() or not any(word in i.lower() for word in excluded)]
 
-    patterns_and_replacements = replace_zero_boundaries(filtered_names, boundary_types, boundary_vals, internal_field)
-    perform_regex_replacements(patterns_and_replacements, template_path, output_path)
-    print(f"Field {field} created at: {output_path}")
+    patterns_and_replacements = replace_zero_boundaries(filtered_names, boundary_types, boundary_vals,
+                                                        internal_field, patch_classes)
+    return perform_regex_replacements(patterns_and_replacements, template_path, output_path)
 
 
 def generate_all_zero_files(patch_names, fm):
@@ -582,8 +608,17 @@ def generate_all_zero_files(patch_names, fm):
     }
 
     print('\nGenerating fields in 0/')
-    for field_name, field_dict in field_dicts.items():
-        generate_zero_file(patch_names, field_name, field_dict)
+    # Classify the patches once and render the fields concurrently (each field owns its own boundary dict)
+    patch_classes = classify_patches(patch_names)
+    with ThreadPoolExecutor() as executor:
+        results = executor.map(lambda item: generate_zero_file(patch_names, item[0], item[1], patch_classes),
+                                field_dicts.items())
+        for field_name, changed in zip(field_dicts, results):
+            output_path = os.path.join(ZERO_DIR, field_name)
+            if changed:
+                print(f"Field {field_name} created at: {output_path}")
+            else:
+                print(f"Field {field_name} unchanged at: {output_path}")
 
 
 if __name__ == "__main__":
@@ -1,91 +1,190 @@
 #!/usr/bin/env python3
 
-import sys
-import subprocess
-
-
-def get_numeric_input(prompt):
-    """Get a numeric input from the user and exit if invalid."""
-    value = input(f"{prompt}: ")
-    try:
-        return float(value) if "." in value else int(value)
-    except ValueError:
-        print("Invalid input. Exiting.")
-        sys.exit(1)
+"""Reconstructs the decomposed time steps by running several reconstructPar jobs concurrently"""
 
+import argparse
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from utilities.classTimeIndex import TimeIndex
 
-def get_timestep_inputs():
-    """Get CFD timestep metrics from the user."""
-    start_time = get_numeric_input("Enter start time")
-    step_size = get_numeric_input("Enter step size")
-    steps = get_numeric_input("Enter number of steps")
-    return start_time, step_size, steps
+REFERENCE_PROCESSOR = "processor0"
+# Rough ratio of the memory of a reconstructPar job to the size of the decomposed data of the times it holds
+MEMORY_FACTOR = 4
+LOG_PREFIX = "log.reconstructPar"
 
 
-def get_field_inputs():
-    """Get CFD field names from the user until they press enter with no input."""
-    fields = []
-    print("Enter CFD field names one by one (press enter without input to finish):")
-    while True:
-        field = input("Field: ").strip()
-        if field == "":
-            break
-        fields.append(field)
-    return fields
+def parse_number(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a number")
 
 
-def reconstruct_par(start_time, step_size, steps, fields):
-    """Run reconstructPar commands based on user inputs."""
+def split_selection(parser, selection):
+    """Splits the positionals into the optional leading time range and the fields"""
+    try:
+        Decimal(selection[0])
+    except (IndexError, InvalidOperation):
+        return None, None, None, selection
+    if len(selection) < 3:
+        parser.error("start_time requires step_size and steps (omit all three to reconstruct every time)")
+    try:
+        start_time, step_size, steps = parse_number(selection[0]), parse_number(selection[1]), int(selection[2])
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(f"Invalid time range {' '.join(selection[:3])}: {e}")
+    return start_time, step_size, steps, selection[3:]
+
+
+def requested_times(time_index, start_time=None, step_size=None, steps=None, latest=True):
+    """Selects the decomposed time names to reconstruct: start, start + step, ... (steps times) or all times"""
+    available = {time: name for time, name in zip(time_index.times(REFERENCE_PROCESSOR),
+                                                  time_index.names(REFERENCE_PROCESSOR))}
+    if start_time is None:
+        selected = [name for time, name in available.items() if time != 0]
+    else:
+        selected = list()
+        for i in range(steps):
+            time = start_time + i * step_size
+            if time in available:
+                selected.append(available[time])
+            else:
+                print(f"WARNING: Time {time} not found in {REFERENCE_PROCESSOR}, skipping it")
+    latest_name = time_index.latest(REFERENCE_PROCESSOR)
+    if latest and latest_name is not None and latest_name not in selected:
+        selected.append(latest_name)
+    return selected
+
+
+def is_reconstructed(time_index, name, fields=None):
+    """Checks if a time exists in the case and contains the requested fields (by default all decomposed files)"""
+    if name not in time_index.names():
+        return False
+    expected = set(fields) if fields else {entry.name for entry in
+                                           os.scandir(time_index.path(REFERENCE_PROCESSOR, name)) if entry.is_file()}
+    return expected <= set(os.listdir(time_index.path('.', name)))
+
+
+def decomposed_size(time_index, name):
+    """Returns the size of the files of a time summed over all processor directories"""
+    size = 0
+    for processor in time_index.processors:
+        path = time_index.path(processor, name)
+        if os.path.isdir(path):
+            size += sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return size
+
+
+def available_memory():
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError):
+        return None
+
+
+def number_of_jobs(time_index, names, jobs=None):
+    """Sizes the number of concurrent jobs to the available cores and memory"""
+    if jobs is not None:
+        return max(1, min(jobs, len(names)))
+    jobs = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None and names:
+        # The largest time of the selection is used as the worst case for every job
+        per_job = MEMORY_FACTOR * max(decomposed_size(time_index, name) for name in names)
+        if per_job > 0:
+            jobs = min(jobs, max(1, memory // per_job))
+    return max(1, min(jobs, len(names)))
+
+
+def split_into_batches(names, number_of_batches):
+    """Splits the times into contiguous batches of (almost) equal length"""
+    batch_size, remainder = divmod(len(names), number_of_batches)
+    batches, start = list(), 0
+    for i in range(number_of_batches):
+        end = start + batch_size + (1 if i < remainder else 0)
+        batches.append(names[start:end])
+        start = end
+    return [batch for batch in batches if batch]
+
+
+def run_batch(index, batch, fields=None, verbose=False, print_lock=None):
+    """Runs reconstructPar for a batch of times, streaming its output into a log file. Returns the exit code"""
+    command = ["reconstructPar", "-time", ",".join(batch)]
     if fields:
-        field_str = " ".join(fields)
-        cmd = f"reconstructPar -fields '({field_str})'"
-        print(f"Executing: {cmd}")
-        subprocess.run(cmd, shell=True)
-
-    for i in range(steps):
-        time = start_time + i * step_size
-        cmd = f"reconstructPar -time {time}"
-        print(f"Executing: {cmd}")
-        subprocess.run(cmd, shell=True)
+        command += ["-fields", f"({' '.join(fields)})"]
+    log_path = f"{LOG_PREFIX}.{index}"
+    print(f"[{index}] Executing: {' '.join(command)} > {log_path}")
+    try:
+        with open(log_path, "w") as log, subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                          text=True, bufsize=1) as process:
+            for line in process.stdout:
+                log.write(line)
+                if verbose:
+                    with print_lock:
+                        print(f"[{index}] {line}", end="")
+    except OSError as e:
+        print(f"[{index}] Error running reconstructPar: {e}")
+        return 1
+    print(f"[{index}] {'Finished' if process.returncode == 0 else f'Failed (exit code {process.returncode})'}: "
+          f"{batch[0]} to {batch[-1]}")
+    return process.returncode
+
+
+def reconstruct_par(start_time=None, step_size=None, steps=None, fields=None, latest=True, force=False,
+                    jobs=None, verbose=False, dry_run=False):
+    """Reconstructs the selected times in concurrent batches, skipping the times that are already reconstructed."""
+    time_index = TimeIndex()
+    if not time_index.processors:
+        print("No processor directories found. Exiting.")
+        sys.exit(1)
 
-    cmd = "reconstructPar -latestTime"
-    print(f"Executing: {cmd}")
-    subprocess.run(cmd, shell=True)
+    names = requested_times(time_index, start_time, step_size, steps, latest)
+    skipped = [] if force else [name for name in names if is_reconstructed(time_index, name, fields)]
+    names = [name for name in names if name not in skipped]
+    if skipped:
+        print(f"Skipping {len(skipped)} reconstructed times: {' '.join(skipped)}")
+    if not names:
+        print("Nothing to reconstruct")
+        return
+
+    batches = split_into_batches(names, number_of_jobs(time_index, names, jobs))
+    print(f"Reconstructing {len(names)} times in {len(batches)} concurrent jobs")
+    if dry_run:
+        for index, batch in enumerate(batches):
+            print(f"[{index}] {' '.join(batch)}")
+        return
+
+    print_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        codes = list(executor.map(lambda item: run_batch(*item, fields, verbose, print_lock), enumerate(batches)))
+    failed = [index for index, code in enumerate(codes) if code != 0]
+    if failed:
+        print(f"{len(failed)} of {len(batches)} jobs failed, see {', '.join(f'{LOG_PREFIX}.{i}' for i in failed)}")
+        sys.exit(1)
 
 
 def main():
-    """Process command-line arguments and handle missing inputs accordingly."""
-    args = sys.argv[1:]
-
-    # Check input length
-    if len(args) < 3:
-        # Query numbers
-        print("Insufficient arguments. Please enter required timestep metrics.")
-        start_time, step_size, steps = get_timestep_inputs()
-
-        # Process fields if any exist in input
-        fields = [arg for arg in args if not arg.replace('.', '', 1).isdigit()]
-        if not fields:
-            fields = get_field_inputs()
-
-    else:
-        # Check if first three inputs are numbers
-        try:
-            start_time = float(args[0]) if "." in args[0] else int(args[0])
-            step_size = float(args[1]) if "." in args[1] else int(args[1])
-            steps = int(args[2])
-            fields = args[3:]  # Remaining arguments are fields
-        except ValueError:
-            print("Invalid numeric input. Please enter required timestep metrics.")
-            start_time, step_size, steps = get_timestep_inputs()
-            fields = args  # Process remaining input as fields
-
-        # If there are no fields in input, query fields
-        if not fields:
-            print("No fields specified for reconstruction")
-            fields = get_field_inputs()
-
-    reconstruct_par(start_time, step_size, steps, fields)
+    """Process command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('selection', nargs='*', metavar='[start_time step_size steps] [fields]',
+                        help='Reconstruct <steps> times from <start_time> every <step_size> (default: all times), '
+                             'only the given fields (default: all). Without the numbers, e.g. "U p", the fields '
+                             'are reconstructed at all times')
+    parser.add_argument('--no-latest', dest='latest', action='store_false',
+                        help='Do not add the latest time to the selection')
+    parser.add_argument('--force', action='store_true', help='Also reconstruct the times that already exist')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of concurrent reconstructPar jobs (default: based on the cores and memory)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Also print the output of the jobs')
+    parser.add_argument('--dry-run', action='store_true', help='Print the batches without running them')
+    args = parser.parse_args()
+
+    start_time, step_size, steps, fields = split_selection(parser, args.selection)
+    reconstruct_par(start_time, step_size, steps, fields, args.latest, args.force, args.jobs, args.verbose,
+                    args.dry_run)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+"""Reconstructs fields of a decomposed case without OpenFOAM, using the processor addressing of the mesh"""
+
+import argparse
+import os
+import re
+import sys
+import numpy as np
+from utilities.classFieldFile import FieldFile
+from utilities.classFoamDictEditor import FoamDictParser
+from utilities.classPolyMesh import read_patches
+from utilities.classTimeIndex import TimeIndex
+from utilities.foamLists import (COMPONENTS, format_field_value, list_chunks, list_length, read_field_value,
+                                 read_list_file, write_precision)
+from utilities.instrumentation import instrumented
+
+PROCESSOR_PATCH_TYPES = {'processor', 'processorCyclic'}
+NONUNIFORM_PATTERN = re.compile(r'\s*nonuniform\b')
+INTERNAL_FIELD_KEYWORD = re.compile(rb'internalField\s*')
+FIELD_CLASS_PATTERN = re.compile(rb'class\s+(?:vol|surface|point)(\w+)Field\s*;')
+
+
+def mesh_file(processor_dir, time_name, name):
+    """Returns the path of a polyMesh file, preferring the time directory (moving meshes) over constant"""
+    time_path = os.path.join(processor_dir, time_name, "polyMesh", name)
+    return time_path if os.path.isfile(time_path) else os.path.join(processor_dir, "constant", "polyMesh", name)
+
+
+class ProcessorField:
+    """The field file of one processor along with its parsed boundaryField"""
+
+    def __init__(self, processor_dir, time_name, field):
+        self.processor_dir = processor_dir
+        self.time_name = time_name
+        self.file = FieldFile(os.path.join(processor_dir, time_name, field))
+        self.element_sizes = self.file.element_sizes
+        self.boundary_text = self.file.read_text('boundaryField')
+        self.boundary = FoamDictParser(self.boundary_text, self.element_sizes or {}).parse().children[0]
+        self.patches = {patch.key: patch for patch in self.boundary.children if patch.kind == 'dict'}
+
+    def internal_value_span(self) -> tuple[int, int]:
+        """Returns the span of the value of the internalField (after the keyword, including the ';')"""
+        start, end = self.file.span('internalField')
+        with open(self.file.path, 'rb') as file:
+            file.seek(start)
+            keyword = INTERNAL_FIELD_KEYWORD.match(file.read(64))
+        return start + keyword.end(), end
+
+    def internal_value(self) -> bytes:
+        start, end = self.internal_value_span()
+        with open(self.file.path, 'rb') as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    def internal_field_type(self) -> tuple[str | None, bool]:
+        """Returns the element type of the internalField (None if uniform) and if it is uniform"""
+        start, _ = self.internal_value_span()
+        with open(self.file.path, 'rb') as file:
+            file.seek(start)
+            window = file.read(64)
+        element_type = re.search(rb'List<(\w+)>', window)
+        return (element_type.group(1).decode() if element_type else None), window.startswith(b'uniform')
+
+    def class_element_type(self) -> str | None:
+        """Returns the element type of the field class of the header, e.g. vector for volVectorField"""
+        field_class = FIELD_CLASS_PATTERN.search(self.file.read_section('header'))
+        if field_class is None:
+            return None
+        name = field_class.group(1).decode()
+        return name[0].lower() + name[1:]
+
+    def entry_text(self, patch_name, key) -> str | None:
+        patch = self.patches.get(patch_name)
+        entry = patch.find_child(key) if patch is not None else None
+        return self.boundary_text[entry.value_start:entry.value_end] if entry is not None else None
+
+    def entry_value(self, patch_name, key):
+        text = self.entry_text(patch_name, key)
+        return read_field_value(text.encode('latin-1'), 0, None, self.element_sizes) if text is not None else None
+
+
+def boundary_faces(processor, time_name, patches) -> dict[str, np.ndarray]:
+    """Returns the global face indices of the faces of the (non-processor) patches of a processor"""
+    face_addressing = read_list_file(mesh_file(processor, time_name, "faceProcAddressing"))
+    # Face addressing is 1-based and signed (the sign marks flipped faces)
+    return {name: np.abs(face_addressing[patch['startFace']:patch['startFace'] + patch['nFaces']]) - 1
+            for name, patch in patches.items() if patch['type'] not in PROCESSOR_PATCH_TYPES}
+
+
+def reconstruct_internal_field(processors, time_name, fields: list[ProcessorField]):
+    """Scatters the internalField of every processor into the global field using cellProcAddressing.
+    Returns the global values and the element type, or None and None if all processors hold the same uniform value"""
+    types = [field.internal_field_type() for field in fields]
+    if all(uniform for _, uniform in types):
+        if len({field.internal_value().strip() for field in fields}) == 1:
+            return None, None
+        # Different uniform values (e.g. after setFields) are expanded to nonuniform lists of the field class
+        element_type = fields[0].class_element_type()
+        if element_type not in COMPONENTS:
+            raise ValueError(f"The processors hold different uniform values of an unknown type {element_type}")
+    else:
+        element_type = next(element_type for element_type, _ in types if element_type is not None)
+    n_cells = sum(list_length(mesh_file(processor, time_name, "cellProcAddressing")) for processor in processors)
+    components = COMPONENTS.get(element_type, 1)
+    values = np.empty((n_cells, components) if components > 1 else n_cells)
+    for processor, field in zip(processors, fields):
+        local, _, _ = read_field_value(field.internal_value(), 0, element_type, field.element_sizes)
+        addressing = read_list_file(mesh_file(processor, time_name, "cellProcAddressing"))
+        values[addressing] = local  # A uniform value is broadcast to all cells of the processor
+    return values, element_type
+
+
+def reconstruct_patch_value(patch_name, key, fields, patches, faces, precision):
+    """Reconstructs a nonuniform patch entry (e.g. value) from the patch faces of every processor"""
+    parts, element_type = list(), None
+    for field, processor_patches, processor_faces in zip(fields, patches, faces):
+        if processor_patches.get(patch_name, {}).get('nFaces', 0) == 0:
+            continue
+        result = field.entry_value(patch_name, key)
+        if result is None:
+            continue
+        local, local_type, _ = result
+        element_type = local_type or element_type
+        parts.append((processor_faces[patch_name], local))
+    if element_type is None:
+        return None
+    components = COMPONENTS.get(element_type, 1)
+    face_indices = np.concatenate([part[0] for part in parts])
+    values = np.empty((len(face_indices), components) if components > 1 else len(face_indices))
+    # The faces of a patch are numbered consecutively in the reconstructed mesh
+    offset = face_indices.min()
+    for part_faces, local in parts:
+        values[part_faces - offset] = local
+    return format_field_value(values, element_type, fields[0].element_sizes, precision)
+
+
+def reconstruct_boundary_field(processors, time_name, fields: list[ProcessorField], precision) -> bytes:
+    """Rebuilds the boundaryField of the first processor: processor patches are removed and nonuniform entries
+    are replaced by the values gathered from all processors"""
+    reference = fields[0]
+    patches = [read_patches(mesh_file(processor, time_name, "boundary")) for processor in processors]
+    faces = None
+    splices = list()
+    for patch_name, patch in reference.patches.items():
+        if patches[0].get(patch_name, {}).get('type') in PROCESSOR_PATCH_TYPES:
+            line_start = reference.boundary_text.rfind('\n', 0, patch.start) + 1
+            line_end = patch.end + 1 if reference.boundary_text.startswith('\n', patch.end) else patch.end
+            splices.append((line_start, line_end, ''))
+            continue
+        for entry in patch.children:
+            texts = [field.entry_text(patch_name, entry.key) for field in fields] if entry.kind == 'value' else []
+            if not any(text is not None and NONUNIFORM_PATTERN.match(text) for text in texts):
+                continue
+            if faces is None:
+                faces = [boundary_faces(processor, time_name, processor_patches)
+                         for processor, processor_patches in zip(processors, patches)]
+            value = reconstruct_patch_value(patch_name, entry.key, fields, patches, faces, precision)
+            if value is not None:
+                splices.append((entry.value_start, entry.value_end, value.decode('latin-1')))
+    text = reference.boundary_text[:reference.boundary.end]
+    for start, end, replacement in sorted(splices, reverse=True):
+        text = text[:start] + replacement + text[end:]
+    return text.encode('latin-1')
+
+
+@instrumented
+def reconstruct_field(time_index, time_name, field, precision, force=False) -> bool:
+    """Reconstructs one field of one time and writes it into the time directory of the case"""
+    output_path = time_index.path('.', os.path.join(time_name, field))
+    if os.path.exists(output_path) and not force:
+        print(f"Field {field} already exists at {time_name}, skipping it (use --force to overwrite)")
+        return False
+    processors = [time_index.path(processor, '') for processor in time_index.processors]
+    missing = [processor for processor in processors if not os.path.isfile(os.path.join(processor, time_name, field))]
+    if missing:
+        print(f"Field {field} missing at {time_name} in {len(missing)} processor directories, skipping it")
+        return False
+
+    fields = [ProcessorField(processor, time_name, field) for processor in processors]
+    values, element_type = reconstruct_internal_field(processors, time_name, fields)
+    boundary = reconstruct_boundary_field(processors, time_name, fields, precision)
+
+    reference = fields[0].file
+    internal_start, internal_end = fields[0].internal_value_span()
+    boundary_start, boundary_end = reference.span('boundaryField')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    with open(reference.path, 'rb') as source, open(temp_path, 'wb') as target:
+        target.write(source.read(internal_start))
+        if element_type is None:
+            target.write(source.read(internal_end - internal_start))
+        else:
+            target.write(f"nonuniform List<{element_type}> ".encode())
+            for chunk in list_chunks(values, element_type, reference.element_sizes, precision):
+                target.write(chunk)
+            target.write(b";")
+        source.seek(internal_end)
+        target.write(source.read(boundary_start - internal_end))
+        target.write(boundary)
+        source.seek(boundary_end)
+        target.write(source.read())
+    os.replace(temp_path, output_path)
+    print(f"Reconstructed {field} at {time_name} from {len(processors)} processors")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('fields', nargs='+', help='Fields to reconstruct')
+    parser.add_argument('-t', '--time', nargs='+', default=None, metavar='TIME',
+                        help='Times to reconstruct (default: the latest time)')
+    parser.add_argument('--force', action='store_true', help='Overwrite fields that already exist in the case')
+    args = parser.parse_args()
+
+    time_index = TimeIndex()
+    if not time_index.processors:
+        print("No processor directories found. Exiting.")
+        sys.exit(1)
+    reference = time_index.processors[0]
+    if args.time is None:
+        times = [time_index.latest(reference)]
+    else:
+        times = [time_index.nearest(time, reference) for time in args.time]
+    if None in times:
+        print(f"No time directories found in {reference}. Exiting.")
+        sys.exit(1)
+
+    precision = write_precision()
+    # Fields are reconstructed one after another, so that only a single field is held in memory
+    for time_name in times:
+        for field in args.fields:
+            try:
+                reconstruct_field(time_index, time_name, field, precision, args.force)
+            except (OSError, ValueError) as e:
+                print(f"Error reconstructing {field} at {time_name}: {e}")
+
+
+if __name__ == "__main__":
+    main()
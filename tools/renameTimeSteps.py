@@ -1,24 +1,36 @@
 #!/usr/bin/python
 
+"""Renames the time step directories of the case and of all processor directories to a uniform format"""
+
+import argparse
 import os
-import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from utilities.classTimeIndex import TimeIndex, parse_time
+
+# Suffix of the temporary names used while renaming
+TEMP_SUFFIX = '.foco-rename'
+
 
+class RenameError(Exception):
+    pass
 
-def detect_digit_counts(directory):
+
+def detect_digit_counts(names):
     """Detects the max number of leading and trailing digits in folder names."""
-    number_pattern = re.compile(r'^\d+(\.\d+)?$')
     leading_digits = 0
     trailing_digits = 0
 
-    for item in os.listdir(directory):
-        if number_pattern.fullmatch(item) and item != "0":
-            if '.' in item:
-                before_decimal, after_decimal = item.split('.')
-            else:
-                before_decimal, after_decimal = item, ""
+    for item in names:
+        item = f"{parse_time(item):f}"  # Scientific notation is counted in its fixed point form
+        if '.' in item:
+            before_decimal, after_decimal = item.split('.')
+        else:
+            before_decimal, after_decimal = item, ""
 
-            leading_digits = max(leading_digits, len(before_decimal))
-            trailing_digits = max(trailing_digits, len(after_decimal))
+        leading_digits = max(leading_digits, len(before_decimal))
+        trailing_digits = max(trailing_digits, len(after_decimal))
 
     return leading_digits, trailing_digits
 
@@ -28,34 +40,128 @@ def format_number(name, leading_digits, trailing_digits):
     if name == "0":
         return name  # Do not change the "0" folder
 
-    num = float(name)  # Convert to float for normalization
-    formatted_name = f"{num:0{leading_digits}.{trailing_digits}f}"
+    num = parse_time(name).quantize(Decimal(1).scaleb(-trailing_digits))  # Exact, unlike float formatting
+    integer_part, _, fraction_part = f"{num:f}".partition('.')
+    formatted_name = integer_part.zfill(leading_digits)
+    if trailing_digits > 0:
+        formatted_name += f".{fraction_part}"
 
     return formatted_name
 
 
-def rename_numeric_folders(directory):
+def plan_renames(names, leading_digits, trailing_digits) -> dict[str, str]:
+    """Computes the complete rename map of one directory. Raises a RenameError if two directories would end up
+    with the same name. Chains and cycles (a -> b while b -> c) are allowed, since renames go through temp names"""
+    plan = {name: format_number(name, leading_digits, trailing_digits) for name in names}
+    targets = dict()
+    for name, new_name in plan.items():
+        if new_name in targets:
+            raise RenameError(f"Both {targets[new_name]} and {name} would be renamed to {new_name}")
+        targets[new_name] = name
+    return {name: new_name for name, new_name in plan.items() if new_name != name}
+
+
+def find_cycles(plan: dict[str, str]) -> list[list[str]]:
+    """Returns the renames that form cycles (e.g. a -> b -> a), which cannot be applied one by one"""
+    cycles = list()
+    visited = set()
+    for start in plan:
+        chain = list()
+        name = start
+        while name in plan and name not in visited:
+            visited.add(name)
+            chain.append(name)
+            name = plan[name]
+        if name in chain:
+            cycles.append(chain[chain.index(name):])
+    return cycles
+
+
+def apply_renames(directory: str, plan: dict[str, str]) -> tuple[list[tuple[str, str]], Exception | None]:
+    """Renames in two phases: all directories to temp names first, then to their new names. Returns the journal
+    of the completed renames (for a rollback) and the error that stopped the renaming, if any"""
+    journal = list()
+    try:
+        for name in plan:
+            if os.path.lexists(os.path.join(directory, name + TEMP_SUFFIX)):
+                raise RenameError(f"Temporary name {name + TEMP_SUFFIX} already exists in {directory}")
+        for name in plan:
+            os.rename(os.path.join(directory, name), os.path.join(directory, name + TEMP_SUFFIX))
+            journal.append((name, name + TEMP_SUFFIX))
+        for name, new_name in plan.items():
+            if os.path.lexists(os.path.join(directory, new_name)):
+                raise RenameError(f"{new_name} already exists in {directory}")
+            os.rename(os.path.join(directory, name + TEMP_SUFFIX), os.path.join(directory, new_name))
+            journal.append((name + TEMP_SUFFIX, new_name))
+    except (OSError, RenameError) as e:
+        return journal, e
+    return journal, None
+
+
+def roll_back(directory: str, journal: list[tuple[str, str]]) -> bool:
+    """Undoes the completed renames of a directory in reverse order"""
+    success = True
+    for old_name, new_name in reversed(journal):
+        try:
+            os.rename(os.path.join(directory, new_name), os.path.join(directory, old_name))
+        except OSError as e:
+            print(f"Error rolling back {new_name} -> {old_name} in {directory}: {e}")
+            success = False
+    return success
+
+
+def rename_numeric_folders(directory, dry_run: bool = False, jobs: int | None = None):
     """Renames numeric folders to a uniform format based on detected digit counts."""
-    number_pattern = re.compile(r'^\d+(\.\d+)?$')
-
-    # Automatically detect digit counts
-    leading_digits, trailing_digits = detect_digit_counts(directory)
-
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
-
-        if os.path.isdir(item_path) and number_pattern.fullmatch(item) and item != "0":
-            new_name = format_number(item, leading_digits, trailing_digits)
-            new_path = os.path.join(directory, new_name)
-
-            if new_name != item:
-                try:
-                    os.rename(item_path, new_path)
-                    print(f"Renamed timestep: {item} -> {new_name}")
-                except Exception as e:
-                    print(f"Error renaming {item}: {e}")
+    time_index = TimeIndex(directory)
+    locations = list(time_index.locations)
+    names = {location: time_index.names(location, include_zero=False) for location in locations}
+
+    # The digit counts are detected over all locations, so that the case and processors stay in sync
+    leading_digits, trailing_digits = detect_digit_counts([name for location in locations for name in names[location]])
+
+    plans = dict()
+    for location in locations:
+        try:
+            plan = plan_renames(names[location], leading_digits, trailing_digits)
+        except RenameError as e:
+            print(f"Error planning renames in {time_index.path(location, '')}: {e}. Nothing was renamed.")
+            sys.exit(1)
+        if plan:
+            plans[time_index.path(location, '')] = plan
+
+    for location_dir, plan in plans.items():
+        for cycle in find_cycles(plan):
+            print(f"Renaming cycle in {location_dir}: {' -> '.join(cycle + cycle[:1])}")
+        for name, new_name in plan.items():
+            print(f"{'Would rename' if dry_run else 'Renaming'} timestep: "
+                  f"{os.path.relpath(os.path.join(location_dir, name), directory)} -> {new_name}")
+    if dry_run or not plans:
+        print(f"{'Would rename' if dry_run else 'Renamed'} {sum(map(len, plans.values()))} directories")
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = dict(zip(plans, executor.map(apply_renames, plans, plans.values())))
+
+    errors = {location_dir: error for location_dir, (_, error) in results.items() if error is not None}
+    if errors:
+        for location_dir, error in errors.items():
+            print(f"Error renaming in {location_dir}: {error}")
+        # Every location is rolled back, so that the case and processors do not end up out of sync
+        rolled_back = all([roll_back(location_dir, journal) for location_dir, (journal, _) in results.items()])
+        print("All renames were rolled back" if rolled_back else "Rollback incomplete, check the directories above")
+        sys.exit(1)
+    print(f"Renamed {sum(map(len, plans.values()))} directories in {len(plans)} locations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dry-run', action='store_true', help='Print the renames without applying them')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of directories renamed in parallel (default: based on the number of CPUs)')
+    args = parser.parse_args()
+    target_directory = os.getcwd()  # Use the directory where the script is run
+    rename_numeric_folders(target_directory, args.dry_run, args.jobs)
 
 
 if __name__ == "__main__":
-    target_directory = os.getcwd()  # Use the directory where the script is run
-    rename_numeric_folders(target_directory)
+    main()
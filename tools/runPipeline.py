@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""Runs the meshing or the parallel run of a case as a pipeline of resumable stages. Every stage declares its inputs
+and outputs, so stages whose inputs did not change since their last successful run are skipped: after a failure of
+snappyHexMesh, only the stages from the decomposition on run again. Independent stages (e.g. blockMesh and
+surfaceFeatures) run concurrently. The wall time and peak memory of every stage are recorded in .foco/pipeline"""
+
+import argparse
+import os
+import sys
+from utilities.classFoamDictEditor import ClassFoamDictEditor
+from utilities.classPipeline import Pipeline, Stage
+
+DISPATCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utilities', 'dispatcher.py')
+RANKFILE = os.path.join('system', 'rankfile')
+GEOMETRY = [os.path.join('constant', 'geometry'), os.path.join('constant', 'triSurface')]
+
+# The stages of the mesh and runParallel scripts
+WORKFLOWS = {
+    'mesh': [
+        Stage('blockMesh', ['blockMesh'], inputs=['system/blockMeshDict'], outputs=['constant/polyMesh/boundary']),
+        Stage('surfaceFeatures', ['surfaceFeatures'], inputs=['system/surfaceFeaturesDict', *GEOMETRY]),
+        Stage('decomposePar', ['decomposePar', '-force', '-copyZero'], inputs=['system/decomposeParDict', '0'],
+              outputs=['processor0/constant/polyMesh'], after=['blockMesh']),
+        Stage('snappyHexMesh', ['{mpirun}', 'snappyHexMesh', '-parallel', '-overwrite'],
+              inputs=['system/snappyHexMeshDict', 'system/meshQualityDict', *GEOMETRY],
+              after=['decomposePar', 'surfaceFeatures'], invalidates=['decomposePar']),
+        Stage('reconstructPar', ['reconstructPar', '-constant'], outputs=['constant/polyMesh/boundary'],
+              after=['snappyHexMesh']),
+        Stage('checkMesh', ['checkMesh'], after=['reconstructPar']),
+    ],
+    'run': [
+        Stage('decomposePar', ['decomposePar', '-force', '-copyZero'],
+              inputs=['system/decomposeParDict', 'constant/polyMesh', '0'], outputs=['processor0']),
+        Stage('renumberMesh', ['{mpirun}', 'renumberMesh', '-overwrite', '-parallel', '-noZero'],
+              after=['decomposePar'], invalidates=['decomposePar']),
+        Stage('overrideProcessorConstant', ['{foco}', 'overrideProcessorConstant'], inputs=['constant'],
+              after=['renumberMesh']),
+        Stage('solver', ['{mpirun}', '{app}', '-solver', '{solver}', '-parallel'],
+              inputs=['system/controlDict', 'system/fvSchemes', 'system/fvSolution'],
+              after=['overrideProcessorConstant'], log='log.{app}'),
+        Stage('reconstructPar', ['reconstructPar', '-latestTime'], after=['solver']),
+        Stage('addDimensions', ['{foco}', 'addDimensions'], after=['reconstructPar']),
+        Stage('plotResiduals', ['{foco}', 'plotResiduals'], after=['reconstructPar']),
+    ],
+}
+
+
+def read_entry(path: str, key: str, default=None):
+    try:
+        editor = ClassFoamDictEditor(path)
+    except FileNotFoundError:
+        return default
+    return editor.get_value(key) if editor.has_entry(key) else default
+
+
+def case_context() -> dict:
+    """Values filled into the commands: the MPI launcher, the application and solver and the foco dispatcher"""
+    processors = int(read_entry(os.path.join('system', 'decomposeParDict'), 'numberOfSubdomains', 1))
+    mpirun = ['mpirun', '-np', str(processors)] + (['--rankfile', RANKFILE] if os.path.isfile(RANKFILE) else [])
+    control_dict = os.path.join('system', 'controlDict')
+    return {'mpirun': mpirun, 'processors': processors, 'app': read_entry(control_dict, 'application', 'foamRun'),
+            'solver': read_entry(control_dict, 'solver', ''), 'foco': [sys.executable, DISPATCHER]}
+
+
+def print_status(pipeline: Pipeline, stages: list[str] | None = None) -> None:
+    print(f"{'Stage':<28}{'Status':<14}{'Last run':<36}{'Wall time':>12}{'Peak memory':>14}")
+    for name, status, recorded in pipeline.status(stages):
+        last_run = f"{recorded['finished']} ({recorded['status']})" if recorded else '-'
+        wall_time = f"{recorded['wall_time']:.1f} s" if recorded else '-'
+        memory = f"{recorded['peak_rss_kib'] / 1024:.0f} MiB" if recorded else '-'
+        print(f"{name:<28}{status:<14}{last_run:<36}{wall_time:>12}{memory:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('workflow', choices=list(WORKFLOWS), help='Pipeline to run')
+    parser.add_argument('stages', nargs='*',
+                        help='Stages to run, with the stages they depend on (default: all stages)')
+    parser.add_argument('-f', '--force', nargs='+', default=[], metavar='STAGE',
+                        help='Run these stages (and the stages after them) even if they are up to date')
+    parser.add_argument('-j', '--jobs', type=int, default=2, help='Number of stages run at once (default: 2)')
+    parser.add_argument('--status', action='store_true', help='Show the state of the stages without running them')
+    args = parser.parse_args()
+
+    if not os.path.isdir('constant') or not os.path.isdir('system'):
+        print("ERROR: 'constant' or 'system' directory is missing.")
+        sys.exit(1)
+    try:
+        pipeline = Pipeline(args.workflow, WORKFLOWS[args.workflow], case_context())
+        if args.status:
+            print_status(pipeline, args.stages)
+            return
+        unknown = [name for name in args.force if name not in pipeline.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage {', '.join(unknown)}, choose from: {', '.join(pipeline.stages)}")
+        success = pipeline.run(args.stages, args.force, args.jobs)
+    except ValueError as e:
+        print(f"{e}. Exiting.")
+        sys.exit(1)
+    print_status(pipeline, args.stages)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,104 @@
 #!/usr/bin/env python3
 
+import argparse
+import difflib
 import os
-import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from utilities.classFieldFile import FieldFile
+from utilities.classFoamDictEditor import FoamDictParser
+from utilities.classTimeIndex import TimeIndex
 
+# Boundary type applied to the rotating patches
+ROTATING_BOUNDARY_TYPE = "movingWallVelocity"
 
-def find_latest_timestep(directory):
-    """Finds the largest numerical directory name inside a given directory."""
-    timesteps = [d for d in os.listdir(directory) if d.replace('.', '', 1).isdigit() and float(d) > 0]
-    return max(timesteps, key=float) if timesteps else None
 
+def switch_boundaries_in_file(field_path: str, boundary_names: list[str], dry_run: bool = False):
+    """Applies all boundary changes to one field file. Only the boundaryField is read and parsed, once, and the
+    file is written once. Returns the field path, a unified diff of the boundaryField and a list of missing patches"""
+    field_file = FieldFile(field_path)
+    before_text = field_file.read_text('boundaryField')
+    boundary = FoamDictParser(before_text, field_file.element_sizes or {}).parse().children[0]
+    missing, splices = list(), list()
+    for boundary_name in boundary_names:
+        patch = boundary.find_child(boundary_name)
+        entry = patch.find_child('type') if patch is not None and patch.kind == 'dict' else None
+        if entry is None or entry.kind != 'value':
+            missing.append(boundary_name)
+        elif before_text[entry.value_start:entry.value_end] != ROTATING_BOUNDARY_TYPE:
+            splices.append((entry.value_start, entry.value_end, ROTATING_BOUNDARY_TYPE))
+    after_text = before_text
+    for start, end, replacement in sorted(set(splices), reverse=True):
+        after_text = after_text[:start] + replacement + after_text[end:]
+    if not dry_run and after_text != before_text:
+        field_file.replace_sections({'boundaryField': after_text})
+    label = os.path.relpath(field_path)
+    diff = "".join(difflib.unified_diff(before_text.splitlines(keepends=True), after_text.splitlines(keepends=True),
+                                        fromfile=f"a/{label}", tofile=f"b/{label}"))
+    return field_path, diff, missing
 
-def switch_to_ncc():
+
+def switch_to_ncc(dry_run: bool = False, jobs: int | None = None):
   # Check if constant/triSurface exists
   if not os.path.isdir("constant/triSurface"):
       print("Directory 'constant/triSurface' not found. Exiting.")
       sys.exit(1)
-  
+
   # Get list of STL files containing 'rotating'
   stl_files = [f for f in os.listdir("constant/triSurface") if f.endswith(".stl") and "rotating" in f]
   if not stl_files:
       print("No STL files containing 'rotating' found. Exiting.")
       sys.exit(1)
-  
+  boundary_names = [os.path.splitext(stl_file)[0] for stl_file in stl_files]  # Remove .stl extension
+
   # Find latest timestep directory in the current folder
-  main_timestep = find_latest_timestep(".")
-  
+  time_index = TimeIndex()
+  main_timestep = time_index.latest(include_zero=False)
+
   # Find latest timestep directories in processor* folders
-  processor_dirs = [d for d in os.listdir(".") if d.startswith("processor") and os.path.isdir(d)]
-  processor_timesteps = {p: find_latest_timestep(p) for p in processor_dirs}
-  
+  processor_timesteps = {p: time_index.latest(p, include_zero=False) for p in time_index.processors}
+
   # Filter out processors without timesteps
   processor_timesteps = {p: t for p, t in processor_timesteps.items() if t is not None}
-  
+
   # Create the full list of directories to process
   time_step_dirs = [main_timestep] if main_timestep else []
   time_step_dirs += [os.path.join(p, t) for p, t in processor_timesteps.items()]
-  
+
   # Exit if no valid timestep directories found
   if not time_step_dirs:
       print("No valid numerical timestep directories found. Exiting.")
       sys.exit(1)
-  
-  # Run the bash commands for each timestep and STL file
-  print('Switching boundary types from "MRFnoSlip" to "movingWallVelocity" with a value of "uniform (0 0 0)"')
-  for time_step in time_step_dirs:
-      for stl_file in stl_files:
-          boundary_name = os.path.splitext(stl_file)[0]  # Remove .stl extension
-          print(f"Processing timestep {time_step} for the {boundary_name} boundary patch")
-          subprocess.run(["foamDictionary", f"{time_step}/U", "-entry", f"boundaryField/{boundary_name}/type", "-set", "movingWallVelocity"])
-          # subprocess.run(["foamDictionary", f"{time_step}/U", "-entry", f"boundaryField/{boundary_name}/value", "-remove"])
-          # subprocess.run(["foamDictionary", f"{time_step}/U", "-entry", f"boundaryField/{boundary_name}/value", "-set", "uniform (0 0 0)"])
+
+  # Edit the U file of every timestep directory in parallel (one parse and one write per file)
+  field_paths = [os.path.join(time_step, "U") for time_step in time_step_dirs]
+  field_paths = [field_path for field_path in field_paths if os.path.isfile(field_path)]
+  print(f'Switching boundary types from "MRFnoSlip" to "{ROTATING_BOUNDARY_TYPE}" for the '
+        f'{", ".join(boundary_names)} boundary patch(es) in {len(field_paths)} files')
+  changed_files = 0
+  with ProcessPoolExecutor(max_workers=jobs) as executor:
+      futures = [executor.submit(switch_boundaries_in_file, field_path, boundary_names, dry_run)
+                 for field_path in field_paths]
+      for future in futures:
+          field_path, diff, missing = future.result()
+          if missing:
+              print(f"WARNING: {field_path} has no boundary patch named {', '.join(missing)}")
+          if diff:
+              changed_files += 1
+              if dry_run:
+                  print(diff if diff.endswith("\n") else f"{diff}\n", end="")
+  print(f"{'Would update' if dry_run else 'Updated'} {changed_files} of {len(field_paths)} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Switch rotating boundary patches in the latest U files to moving wall velocity')
+    parser.add_argument('--dry-run', action='store_true', help='Print a diff of the changes without writing')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of files processed in parallel (default: number of CPUs)')
+    args = parser.parse_args()
+    switch_to_ncc(args.dry_run, args.jobs)
 
 
 if __name__ == "__main__":
-  switch_to_ncc()
+  main()
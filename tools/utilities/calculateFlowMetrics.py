@@ -1,6 +1,33 @@
 #!/usr/bin/python
 
-def calc_kinematic_viscosity_air(temp_c: float, press_pa: float | None=None, press_atmos: float | None=None) -> float:
+import numpy as np
+
+# Celsius to Kelvin conversion
+C_TO_K = 273.15
+ATMOSPHERE_PA = 101325.0
+# Specific gas constant for dry air - J/(kg·K)
+R_AIR = 287.058
+# Sutherland constants for air
+SUTHERLAND_MU_0 = 1.716e-5  # reference dynamic viscosity at SUTHERLAND_TEMP_0 (Pa·s)
+SUTHERLAND_TEMP_0 = C_TO_K  # reference temperature (K)
+SUTHERLAND_C = 111.0  # Sutherland constant (K)
+# Temperatures (C) within which the water correlations are valid
+WATER_TEMPERATURE_RANGE = (0, 100)
+
+
+def calc_dynamic_viscosity_air(temp_c):
+    """Compute dynamic viscosity of air (μ) from temperature (C) with Sutherland's law"""
+    temp_k = np.asarray(temp_c) + C_TO_K
+    return (SUTHERLAND_MU_0 * ((temp_k / SUTHERLAND_TEMP_0) ** 1.5) * (SUTHERLAND_TEMP_0 + SUTHERLAND_C)
+            / (temp_k + SUTHERLAND_C))
+
+
+def calc_density_air(temp_c, press_pa):
+    """Compute density of air (ρ) from temperature (C) and pressure (Pa) with the ideal gas equation"""
+    return np.asarray(press_pa) / (R_AIR * (np.asarray(temp_c) + C_TO_K))
+
+
+def calc_kinematic_viscosity_air(temp_c, press_pa=None, press_atmos=None):
     """Compute kinematic viscosity of air (ν) from temperature (C) and pressure (Pa or atmospheres)"""
 
     # Validate pressure inputs
@@ -11,46 +38,31 @@ def calc_kinematic_viscosity_air(temp_c: float, press_pa: float | None=None, pre
 
     # Convert pressure if needed
     if press_atmos is not None:
-        press_pa = press_atmos * 101325.0
-
-    # Celsius to Kelvin conversion
-    c_to_k = 273.15
-    temp_k = temp_c + c_to_k
+        press_pa = np.asarray(press_atmos) * ATMOSPHERE_PA
 
-    # Specific gas constant for dry air - J/(kg·K)
-    r_air = 287.058
+    return calc_dynamic_viscosity_air(temp_c) / calc_density_air(temp_c, press_pa)
 
-    # Use Sutherland's law for dynamic viscosity and ideal gas relation for density.
-    # Sutherland constants for air
-    mu_0 = 1.716e-5  # reference dynamic viscosity at temp_0 (Pa·s)
-    temp_0 = c_to_k  # reference temperature (K)
-    c_sutherland = 111.0  # Sutherland constant (K)
-
-    # Dynamic viscosity via Sutherland's law
-    mu = mu_0 * ((temp_k / temp_0) ** 1.5) * (temp_0 + c_sutherland) / (temp_k + c_sutherland)
-
-    # Density from ideal gas equation
-    rho = press_pa / (r_air * temp_k)
-
-    # Kinematic viscosity
-    return mu / rho
-
-
-def calc_kinematic_viscosity_water(temp_c: float) -> float:
-    """Compute kinematic viscosity of liquid water (ν) from temperature (C)"""
 
+def check_water_temperature(temp_c):
     # Check that the temperature is between 0 and 100 Celsius
-    if not 0 < temp_c < 100:
+    low, high = WATER_TEMPERATURE_RANGE
+    if np.any(np.asarray(temp_c) <= low) or np.any(np.asarray(temp_c) >= high):
         raise ValueError('Temperature must be between 0 and 100')
 
-    # Dynamic viscosity approximation for water (Pa·s)
-    mu = 2.414e-5 * 10 ** (247.8 / (temp_c + 133.15))
 
-    # Density approximation for water (kg/m^3)
-    rho = 1000 * (1 - (temp_c + 288.9414) / (508929.2 * (temp_c + 68.12963)) * (temp_c - 3.9863) ** 2)
+def calc_dynamic_viscosity_water(temp_c):
+    """Compute dynamic viscosity of liquid water (μ) from temperature (C), in Pa·s"""
+    check_water_temperature(temp_c)
+    return 2.414e-5 * 10 ** (247.8 / (np.asarray(temp_c) + 133.15))
 
-    # Kinematic viscosity
-    return mu / rho
 
+def calc_density_water(temp_c):
+    """Compute density of liquid water (ρ) from temperature (C), in kg/m^3"""
+    check_water_temperature(temp_c)
+    temp_c = np.asarray(temp_c)
+    return 1000 * (1 - (temp_c + 288.9414) / (508929.2 * (temp_c + 68.12963)) * (temp_c - 3.9863) ** 2)
 
-print(calc_kinematic_viscosity_air(20, 100))
\ No newline at end of file
+
+def calc_kinematic_viscosity_water(temp_c):
+    """Compute kinematic viscosity of liquid water (ν) from temperature (C)"""
+    return calc_dynamic_viscosity_water(temp_c) / calc_density_water(temp_c)
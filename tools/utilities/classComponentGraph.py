@@ -0,0 +1,77 @@
+import re
+import numpy as np
+
+# Line probes are named after the stage of a component they sample, optionally preceded by their number,
+# e.g. 03_Vanes_US, 04_Vanes_MID, 05_Vanes_DS or Pump_MID2
+STAGE_PATTERN = re.compile(r'^(?:_?\d+_)?(.+)_(US|MID\d*|DS)$', re.IGNORECASE)
+# Position of the stages along a component, intermediate stages are ordered by their number
+STAGE_ORDER = {'US': 0, 'MID': 1, 'DS': 2}
+
+
+def stage_key(stage: str) -> tuple[int, int]:
+    stage = stage.upper()
+    base = stage.rstrip('0123456789')
+    return STAGE_ORDER[base], int(stage[len(base):] or 0)
+
+
+class ComponentGraph:
+    """Indexes line probes by the stem of their component and links the stages of every component into a chain
+    (US -> MID1 -> MID2 -> ... -> DS). Every link of a chain, and the whole component if it has several stages, is an
+    edge between two probe indices, so that the changes across all components are computed as single array operations
+    on arrays indexed by probe."""
+
+    def __init__(self, locations: list[str]):
+        self.locations = list(locations)
+        self.index = {location: i for i, location in enumerate(self.locations)}
+        stages = dict()
+        for location in self.locations:
+            match = STAGE_PATTERN.match(location)
+            if match:
+                stages.setdefault(match.group(1), list()).append((stage_key(match.group(2)), match.group(2), location))
+        self.chains = {stem: [(stage, location) for _, stage, location in sorted(chain)]
+                       for stem, chain in sorted(stages.items()) if len(chain) > 1}
+
+        names, upstream, downstream = list(), list(), list()
+        for stem, chain in self.chains.items():
+            if len(chain) > 2:
+                for (us_stage, us_location), (ds_stage, ds_location) in zip(chain[:-1], chain[1:]):
+                    names.append(f'{stem}_{us_stage}-{ds_stage}')
+                    upstream.append(self.index[us_location])
+                    downstream.append(self.index[ds_location])
+            names.append(stem)
+            upstream.append(self.index[chain[0][1]])
+            downstream.append(self.index[chain[-1][1]])
+        self.components = names
+        self.upstream = np.array(upstream, dtype=int)
+        self.downstream = np.array(downstream, dtype=int)
+
+
+    def __len__(self) -> int:
+        return len(self.components)
+
+
+    def values(self, location_values: dict[str, dict], field: str) -> np.ndarray:
+        """Gathers a field of {location: {field: value}} into an array indexed by probe (NaN where it is missing)"""
+        return np.array([location_values.get(location, {}).get(field, np.nan) for location in self.locations],
+                        dtype=float)
+
+
+    def delta(self, values: np.ndarray) -> np.ndarray:
+        """Returns the change (upstream - downstream) across every component"""
+        return values[self.upstream] - values[self.downstream]
+
+
+    def upstream_values(self, values: np.ndarray) -> np.ndarray:
+        return values[self.upstream]
+
+
+    def loss_factor(self, delta_p_kt: np.ndarray, u_upstream: np.ndarray) -> np.ndarray:
+        """Returns the loss factor K = delta p / (0.5 * rho * U^2), which in kinematic pressures does not need rho"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs(delta_p_kt / (0.5 * u_upstream ** 2))
+
+
+    def to_dict(self, fields: dict[str, np.ndarray]) -> dict[str, dict[str, float]]:
+        """Converts arrays indexed by component into {component: {field: value}}, leaving out missing values"""
+        return {component: {field: float(values[i]) for field, values in fields.items() if not np.isnan(values[i])}
+                for i, component in enumerate(self.components)}
@@ -0,0 +1,155 @@
+import os
+import re
+import subprocess
+from typing import NamedTuple
+
+SYSFS_CPU_DIRECTORY = '/sys/devices/system/cpu'
+SYSFS_NODE_DIRECTORY = '/sys/devices/system/node'
+LSCPU_COLUMNS = 'CPU,CORE,SOCKET,NODE'
+
+
+class LogicalCpu(NamedTuple):
+    cpu: int     # Processor number of the operating system
+    core: int    # Core id (unique within a socket, not necessarily contiguous)
+    socket: int
+    node: int    # NUMA node
+
+
+def parse_cpu_list(text: str) -> list[int]:
+    """Parses a kernel CPU list such as '0-3,8,10-11'"""
+    cpus = list()
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def read_text(path: str) -> str | None:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+class CpuTopology:
+    """Logical CPUs of a host grouped into sockets, NUMA nodes, cores and SMT siblings (hardware threads). Ranks are
+    placed on cores in the numbering of an Open MPI rankfile: slot=<socket>:<core>, both counted from 0 in order"""
+
+    def __init__(self, cpus: list[LogicalCpu]):
+        if not cpus:
+            raise ValueError("No CPUs found")
+        self.cpus = sorted(cpus)
+        self.sockets = sorted({cpu.socket for cpu in self.cpus})
+        self.nodes = sorted({cpu.node for cpu in self.cpus})
+        # Hardware threads of every physical core, keyed by (socket, core id)
+        self.threads: dict[tuple[int, int], list[int]] = dict()
+        for cpu in self.cpus:
+            self.threads.setdefault((cpu.socket, cpu.core), list()).append(cpu.cpu)
+        self.core_nodes = {(cpu.socket, cpu.core): cpu.node for cpu in self.cpus}
+        # Logical index of every core within its socket, as used by the slot=<socket>:<core> notation
+        self.slots = dict()
+        for socket_index, socket in enumerate(self.sockets):
+            core_ids = sorted(core for core_socket, core in self.threads if core_socket == socket)
+            self.slots.update({(socket, core): (socket_index, index) for index, core in enumerate(core_ids)})
+
+
+    @classmethod
+    def from_sysfs(cls, directory: str = SYSFS_CPU_DIRECTORY, node_directory: str = SYSFS_NODE_DIRECTORY):
+        """Reads the topology of the online CPUs of this host from sysfs"""
+        online = read_text(os.path.join(directory, 'online'))
+        if online is None:
+            raise FileNotFoundError(f"{directory}/online not found")
+        cpu_nodes = dict()
+        if os.path.isdir(node_directory):
+            for name in os.listdir(node_directory):
+                match = re.fullmatch(r'node(\d+)', name)
+                cpu_list = read_text(os.path.join(node_directory, name, 'cpulist')) if match else None
+                if cpu_list:
+                    cpu_nodes.update({cpu: int(match.group(1)) for cpu in parse_cpu_list(cpu_list)})
+        cpus = list()
+        for cpu in parse_cpu_list(online):
+            topology = os.path.join(directory, f'cpu{cpu}', 'topology')
+            core = read_text(os.path.join(topology, 'core_id'))
+            socket = read_text(os.path.join(topology, 'physical_package_id'))
+            # Some virtual machines report no topology, every CPU is then a core of socket 0
+            cpus.append(LogicalCpu(cpu, int(core) if core is not None else cpu,
+                                   max(int(socket), 0) if socket is not None else 0, cpu_nodes.get(cpu, 0)))
+        return cls(cpus)
+
+
+    @classmethod
+    def from_lscpu(cls, text: str):
+        """Parses the output of 'lscpu -p=CPU,CORE,SOCKET,NODE', e.g. captured on a compute node"""
+        cpus = list()
+        for line in text.splitlines():
+            if not line.strip() or line.startswith('#'):
+                continue
+            values = [int(value) if value.strip() else 0 for value in line.split(',')]
+            if len(values) < 4:
+                raise ValueError(f"Expected the columns {LSCPU_COLUMNS}, got: {line}")
+            cpus.append(LogicalCpu(*values[:4]))
+        return cls(cpus)
+
+
+    @classmethod
+    def detect(cls):
+        """Reads the topology of this host from sysfs, or from lscpu where sysfs is not available"""
+        try:
+            return cls.from_sysfs()
+        except (FileNotFoundError, ValueError):
+            output = subprocess.run(['lscpu', f'-p={LSCPU_COLUMNS}'], capture_output=True, text=True, check=True)
+            return cls.from_lscpu(output.stdout)
+
+
+    @property
+    def physical_cores(self) -> int:
+        return len(self.threads)
+
+
+    @property
+    def smt(self) -> int:
+        """Hardware threads per core"""
+        return max(len(threads) for threads in self.threads.values())
+
+
+    def node_cores(self, node: int) -> list[tuple[int, int]]:
+        return sorted(core for core, core_node in self.core_nodes.items() if core_node == node)
+
+
+    def describe(self) -> str:
+        return (f"{len(self.sockets)} socket(s), {len(self.nodes)} NUMA node(s), {self.physical_cores} cores, "
+                f"{self.smt} thread(s) per core")
+
+
+    def place(self, ranks: int) -> list[str]:
+        """Returns the slot of every rank. The ranks are split over the NUMA nodes in proportion to their cores, in
+        contiguous blocks so neighbouring ranks share a memory controller, and spread evenly over the cores of a node
+        so they share as few caches as possible. Ranks are only placed on physical cores: a slot=<socket>:<core> binds
+        a rank to all hardware threads of its core"""
+        if ranks > self.physical_cores:
+            raise ValueError(f"{ranks} ranks do not fit on {self.physical_cores} cores")
+        node_cores = {node: self.node_cores(node) for node in self.nodes}
+        shares = distribute(ranks, [len(cores) for cores in node_cores.values()])
+        slots = list()
+        for cores, share in zip(node_cores.values(), shares):
+            for index in spread(share, len(cores)):
+                slots.append('{}:{}'.format(*self.slots[cores[index]]))
+        return slots
+
+
+def distribute(total: int, capacities: list[int]) -> list[int]:
+    """Splits a total in proportion to capacities (largest remainders), without exceeding any of them"""
+    weights = sum(capacities)
+    shares = [total * capacity // weights for capacity in capacities]
+    remainders = sorted(range(len(capacities)), key=lambda i: (-(total * capacities[i] % weights), i))
+    for i in remainders[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+def spread(count: int, size: int) -> list[int]:
+    """Returns count indices spread evenly over range(size)"""
+    return [index * size // count for index in range(count)]
@@ -0,0 +1,176 @@
+import mmap
+import os
+import re
+import shutil
+from pathlib import Path
+from utilities.classFoamDictEditor import FoamDictParser, binary_element_sizes
+
+# Only the start of a field file is searched for the header, dimensions and the start of the internalField
+HEADER_WINDOW = 64 * 1024
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+FOAM_FILE_PATTERN = re.compile(rb'FoamFile\s*\{[^}]*\}')
+DIMENSIONS_PATTERN = re.compile(rb'(?m)^[ \t]*dimensions\b[^;]*;')
+INTERNAL_FIELD_PATTERN = re.compile(rb'(?m)^[ \t]*internalField\b\s*')
+BOUNDARY_FIELD_PATTERN = re.compile(rb'(?m)^[ \t]*boundaryField\b')
+NONUNIFORM_PATTERN = re.compile(rb'nonuniform\s+List<(\w+)>\s*(\d+)')
+# OpenFOAM writes the count and the opening parenthesis of a list on lines of their own: List<vector> \nN\n(
+LIST_OPEN_PATTERN = re.compile(rb'\s*\(')
+ASCII_LIST_END_PATTERN = re.compile(rb'[)}]\s*;')
+
+
+class FieldFile:
+    """Indexes the byte ranges of the sections of an OpenFOAM field file (header, dimensions, internalField and
+    boundaryField) without reading the internalField payload into memory. Sections are edited by splicing the
+    memory-mapped file in place (same length) or by a streamed copy (different length)."""
+
+    def __init__(self, path: str, header_window: int = HEADER_WINDOW):
+        self.path = Path(path)
+        self.header_window = header_window
+        if not self.path.is_file():
+            raise FileNotFoundError(f"File {self.path} does not exist")
+        self.size = self.path.stat().st_size
+        self.sections: dict[str, tuple[int, int]] = dict()
+        self.element_sizes = None
+        self.index_header()
+
+
+    def index_header(self) -> None:
+        """Locates the header, dimensions and start of the internalField within the first few KB of the file"""
+        with open(self.path, 'rb') as file:
+            window = file.read(self.header_window)
+        foam_file = FOAM_FILE_PATTERN.search(window)
+        if foam_file is None:
+            raise ValueError(f"No FoamFile header found in {self.path}")
+        self.sections['header'] = (0, foam_file.end())
+        self.element_sizes = binary_element_sizes(window[:foam_file.end()].decode('latin-1'))
+        dimensions = DIMENSIONS_PATTERN.search(window, foam_file.end())
+        if dimensions is not None:
+            self.sections['dimensions'] = (dimensions.start() + len(dimensions.group(0)) -
+                                           len(dimensions.group(0).lstrip()), dimensions.end())
+
+
+    def index_fields(self) -> None:
+        """Locates the internalField (skipping its payload) and the boundaryField"""
+        if 'internalField' in self.sections or self.size == 0:
+            return
+        with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            search_from = self.sections.get('dimensions', self.sections['header'])[1]
+            internal_field = INTERNAL_FIELD_PATTERN.search(data, search_from, search_from + self.header_window)
+            if internal_field is not None:
+                start = internal_field.start() + len(internal_field.group(0)) - len(internal_field.group(0).lstrip())
+                end = self.find_value_end(data, internal_field.end())
+                self.sections['internalField'] = (start, end)
+                search_from = end
+            boundary_field = BOUNDARY_FIELD_PATTERN.search(data, search_from)
+            if boundary_field is None:
+                return
+            start = boundary_field.start() + len(boundary_field.group(0)) - len(boundary_field.group(0).lstrip())
+            # The boundaryField is small compared to the internalField, so it is parsed as a dictionary
+            tail = data[start:].decode('latin-1')
+        root = FoamDictParser(tail, self.element_sizes or {}).parse()
+        if root.children and root.children[0].kind == 'dict':
+            self.sections['boundaryField'] = (start, start + root.children[0].end)
+
+
+    def find_value_end(self, data, position: int) -> int:
+        """Returns the position after the ';' terminating the value starting at a position"""
+        nonuniform = NONUNIFORM_PATTERN.match(data, position)
+        if nonuniform is not None:
+            element_type, count = nonuniform.group(1).decode(), int(nonuniform.group(2))
+            position = nonuniform.end()
+            list_open = LIST_OPEN_PATTERN.match(data, position)
+            if self.element_sizes and element_type in self.element_sizes and list_open is not None:
+                # Binary payload: skip it by its size rather than scanning it
+                position = list_open.end() + count * self.element_sizes[element_type]
+                return data.find(b';', position) + 1
+            list_end = ASCII_LIST_END_PATTERN.search(data, position)
+            return list_end.end() if list_end else self.size
+        end = data.find(b';', position)
+        return self.size if end == -1 else end + 1
+
+
+    def span(self, name: str) -> tuple[int, int]:
+        if name not in self.sections:
+            self.index_fields()
+        if name not in self.sections:
+            raise KeyError(f"Section '{name}' not found in {self.path}")
+        return self.sections[name]
+
+
+    def has_section(self, name: str) -> bool:
+        try:
+            self.span(name)
+            return True
+        except KeyError:
+            return False
+
+
+    def read_section(self, name: str) -> bytes:
+        start, end = self.span(name)
+        with open(self.path, 'rb') as file:
+            file.seek(start)
+            return file.read(end - start)
+
+
+    def read_text(self, name: str) -> str:
+        return self.read_section(name).decode('latin-1')
+
+
+    def replace_sections(self, replacements: dict) -> bool:
+        """Replaces several sections in one pass. Values may be bytes or str. Returns True if the file changed"""
+        splices = list()
+        for name, replacement in replacements.items():
+            replacement = replacement.encode('latin-1') if isinstance(replacement, str) else replacement
+            start, end = self.span(name)
+            if self.read_section(name) != replacement:
+                splices.append((start, end, replacement))
+        if not splices:
+            return False
+        splices.sort()
+        if all(end - start == len(replacement) for start, end, replacement in splices):
+            self.splice_in_place(splices)
+        else:
+            self.splice_by_streamed_copy(splices)
+        # Offsets may have moved, so the file has to be indexed again
+        self.size = self.path.stat().st_size
+        self.sections.clear()
+        self.index_header()
+        return True
+
+
+    def splice_in_place(self, splices: list) -> None:
+        with open(self.path, 'r+b') as file, mmap.mmap(file.fileno(), 0) as data:
+            for start, end, replacement in splices:
+                data[start:end] = replacement
+            data.flush()
+
+
+    def splice_by_streamed_copy(self, splices: list) -> None:
+        """Writes a copy of the file with the spliced sections next to it and atomically replaces the original"""
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        try:
+            with open(self.path, 'rb') as source, open(temp_path, 'wb') as target:
+                position = 0
+                for start, end, replacement in splices:
+                    self.copy_range(source, target, position, start)
+                    target.write(replacement)
+                    position = end
+                self.copy_range(source, target, position, self.size)
+            shutil.copymode(self.path, temp_path)
+            os.replace(temp_path, self.path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+
+    @staticmethod
+    def copy_range(source, target, start: int, end: int) -> None:
+        source.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            target.write(chunk)
+            remaining -= len(chunk)
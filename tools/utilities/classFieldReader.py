@@ -0,0 +1,127 @@
+import gzip
+import mmap
+import re
+import numpy as np
+from pathlib import Path
+from utilities.classFieldFile import (BOUNDARY_FIELD_PATTERN, DIMENSIONS_PATTERN, FOAM_FILE_PATTERN, HEADER_WINDOW,
+                                      INTERNAL_FIELD_PATTERN)
+from utilities.classFoamDictEditor import FoamDictParser, binary_element_sizes, tokenize
+from utilities.foamLists import NONUNIFORM_PATTERN, UNIFORM_PATTERN, read_field_value, read_list
+
+CLASS_PATTERN = re.compile(rb'\bclass\s+(\w+)\s*;')
+FIELD_VALUE_PATTERN = re.compile(r'\s*(?:uniform|nonuniform)\b')
+# Element type of the field classes, used for uniform values (which do not state their type)
+FIELD_CLASS_TYPES = {'Scalar': 'scalar', 'Vector': 'vector', 'SymmTensor': 'symmTensor', 'Tensor': 'tensor',
+                     'SphericalTensor': 'sphericalTensor'}
+
+
+class FieldReader:
+    """Reads the data of an OpenFOAM field file (ASCII, binary or gzip compressed) as NumPy arrays. Binary lists
+    are returned as read-only views into the memory-mapped file (or the decompressed data), so nothing is copied
+    and the pages are only read when accessed. ASCII lists have to be parsed into new arrays."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if not self.path.is_file() and self.path.with_name(f"{self.path.name}.gz").is_file():
+            self.path = self.path.with_name(f"{self.path.name}.gz")
+        if not self.path.is_file():
+            raise FileNotFoundError(f"File {self.path} does not exist")
+        self.compressed = self.path.suffix == '.gz'
+        self.data = self.load()
+        header = FOAM_FILE_PATTERN.search(self.data, 0, HEADER_WINDOW)
+        if header is None:
+            raise ValueError(f"No FoamFile header found in {self.path}")
+        self.header_end = header.end()
+        self.element_sizes = binary_element_sizes(bytes(self.data[:header.end()]).decode('latin-1'))
+        field_class = CLASS_PATTERN.search(self.data, 0, header.end())
+        self.field_class = field_class.group(1).decode() if field_class else None
+        self.element_type = next((element_type for name, element_type in FIELD_CLASS_TYPES.items()
+                                  if self.field_class and self.field_class.endswith(f"{name}Field")), None)
+        self._internal_field = None
+        self._internal_field_end = None
+
+
+    def load(self):
+        """Memory-maps the file, or decompresses it into memory if it is compressed"""
+        if self.compressed:
+            with gzip.open(self.path, 'rb') as file:
+                return file.read()
+        with open(self.path, 'rb') as file:
+            # The mapping stays valid after the file is closed and lives as long as any array viewing it
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    @property
+    def dimensions(self) -> list[float] | None:
+        match = DIMENSIONS_PATTERN.search(self.data, self.header_end, self.header_end + HEADER_WINDOW)
+        if match is None:
+            return None
+        values = re.search(rb'\[([^\]]*)\]', match.group(0))
+        return [float(value) for value in values.group(1).split()] if values else None
+
+
+    def internal_field(self, n_cells: int | None = None) -> np.ndarray:
+        """Returns the internalField with one row per cell (scalars are one-dimensional). A uniform value is
+        returned as such, or as a read-only broadcast view over n_cells if the number of cells is given"""
+        if self._internal_field is None:
+            match = INTERNAL_FIELD_PATTERN.search(self.data, self.header_end)
+            if match is None:
+                raise KeyError(f"No internalField found in {self.path}")
+            values, uniform, self._internal_field_end = self.read_value(match.end())
+            self._internal_field = (values, uniform)
+        values, uniform = self._internal_field
+        if uniform and n_cells is not None:
+            return np.broadcast_to(values[0], (n_cells,)) if values.size == 1 else \
+                np.broadcast_to(values, (n_cells, values.size))
+        return values
+
+
+    def is_uniform(self) -> bool:
+        self.internal_field()
+        return self._internal_field[1]
+
+
+    def read_value(self, position: int) -> tuple[np.ndarray, bool, int]:
+        """Reads a uniform or nonuniform value at a position of the file.
+        Returns the values, if it is uniform and the position after the value"""
+        nonuniform = NONUNIFORM_PATTERN.match(self.data, position)
+        if nonuniform is not None:
+            values, _, end = read_list(self.data, nonuniform.end(), self.element_type, self.element_sizes)
+            return values, False, end
+        uniform = UNIFORM_PATTERN.match(self.data, position)
+        if uniform is None:
+            raise ValueError(f"Value at position {position} of {self.path} is neither uniform nor nonuniform")
+        values, _, _ = read_field_value(self.data, position, self.element_type, self.element_sizes)
+        return values, True, uniform.end()
+
+
+    def boundary_field(self) -> dict[str, dict]:
+        """Returns the entries of every patch. Uniform and nonuniform values are returned as arrays (uniform values
+        as the single value), any other entry as its text"""
+        self.internal_field()
+        match = BOUNDARY_FIELD_PATTERN.search(self.data, self._internal_field_end)
+        if match is None:
+            return dict()
+        start = match.start()
+        # The boundaryField is small compared to the internalField. It is decoded as latin-1, which maps every byte to
+        # one character, so that positions in the text are also positions in the file
+        text = bytes(self.data[start:]).decode('latin-1')
+        root = FoamDictParser(text, self.element_sizes or {}).parse()
+        if not root.children or root.children[0].kind != 'dict':
+            return dict()
+        patches = dict()
+        for patch in root.children[0].children:
+            if patch.kind != 'dict':
+                continue
+            entries = dict()
+            for entry in patch.children:
+                if entry.kind != 'value':
+                    continue
+                value_text = text[entry.value_start:entry.value_end]
+                if FIELD_VALUE_PATTERN.match(value_text):
+                    entries[entry.key] = self.read_value(start + entry.value_start)[0]
+                else:
+                    tokens = [token.text for token in tokenize(value_text, {}) if token.kind != 'comment']
+                    entries[entry.key] = re.sub(r'\s+', ' ', ''.join(tokens)).strip()
+            patches[patch.key] = entries
+        return patches
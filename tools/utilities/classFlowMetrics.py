@@ -1,5 +1,44 @@
 #!/usr/bin/python
 
+import numpy as np
+from utilities.calculateFlowMetrics import ATMOSPHERE_PA
+from utilities.classFluidProperties import DEFAULT_TEMPERATURE, FluidProperties
+
+# Coefficients of the turbulence estimates
+TURB_INTENSITY_COEFFICIENT = 0.16
+TURB_LENGTH_SCALE_COEFFICIENT = 0.07  # For pipe flow
+C_MU = 0.09
+
+
+# ------------------- Formulas (work on scalars and NumPy arrays alike) -------------------
+
+def reynolds_number(length, velocity, kinematic_viscosity):
+    return length * velocity / kinematic_viscosity
+
+
+def turb_intensity(reynolds_number):
+    return TURB_INTENSITY_COEFFICIENT * reynolds_number ** (-1 / 8)
+
+
+def turb_kinetic_energy(velocity, turb_intensity):
+    return (3 / 2) * (velocity * turb_intensity) ** 2
+
+
+def turb_length_scale(hydraulic_diameter):
+    return hydraulic_diameter * TURB_LENGTH_SCALE_COEFFICIENT
+
+
+def turb_dissipation_rate(turb_kinetic_energy, turb_length_scale):
+    return C_MU ** (3 / 4) * turb_kinetic_energy ** (3 / 2) / turb_length_scale
+
+
+def specific_dissipation(turb_kinetic_energy, turb_length_scale):
+    return turb_kinetic_energy ** 0.5 / (C_MU ** (1 / 4) * turb_length_scale)
+
+
+def turb_viscosity(turb_kinetic_energy, turb_dissipation_rate):
+    return C_MU * turb_kinetic_energy ** 2 / turb_dissipation_rate
+
 
 class FlowMetric:
     """A class to define the attributes of a flow metric"""
@@ -25,6 +64,8 @@ class FlowMetrics:
         self.specific_dissipation = FlowMetric("Specific Dissipation Rate", "omega", args.specific_dissipation)
         self.turb_viscosity = FlowMetric("Turbulent Viscosity", "nu_t", args.turb_viscosity)
 
+        self.kinematic_viscosity_from_fluid(getattr(args, 'fluid', None), getattr(args, 'temperature', None),
+                                            getattr(args, 'pressure', None))
         self.collect_inputs()
         self.perform_boundary_calculations()
 
@@ -41,6 +82,16 @@ class FlowMetrics:
             self.kinematic_viscosity.value = self.get_metric("Enter the kinematic viscosity (m²/s): ")
 
 
+    def kinematic_viscosity_from_fluid(self, fluid: str | None, temperature: float | None, pressure: float | None):
+        """Look up the kinematic viscosity of a fluid in the fluid property tables, unless it is given"""
+        if fluid is None or self.kinematic_viscosity.value is not None:
+            return
+        temperature = DEFAULT_TEMPERATURE if temperature is None else temperature
+        pressure = ATMOSPHERE_PA if pressure is None else pressure
+        self.kinematic_viscosity.value = float(FluidProperties(fluid).kinematic_viscosity(temperature, pressure))
+        print(f"Kinematic viscosity of {fluid} at {temperature:g}°C: {self.kinematic_viscosity.value:.4g} m²/s")
+
+
     def perform_boundary_calculations(self):
         """Perform calculations only if the value is missing."""
         calculations = [(self.reynolds_number, self.calc_reynolds_number),
@@ -74,28 +125,26 @@ class FlowMetrics:
         length = self.hydraulic_diameter.value if length is None else length
         velocity = self.free_stream_velocity.value if velocity is None else velocity
         kinematic_viscosity = self.kinematic_viscosity.value if kinematic_viscosity is None else kinematic_viscosity
-        return length * velocity / kinematic_viscosity
+        return reynolds_number(length, velocity, kinematic_viscosity)
 
 
     def calc_turb_intensity(self, reynolds_number:float | None=None) -> float:
         """Calculates the turbulent intensity from the Reynold's number"""
-        turb_coefficient = 0.16
         reynolds_number = self.reynolds_number.value if reynolds_number is None else reynolds_number
-        return turb_coefficient * reynolds_number ** (-1 / 8)
+        return turb_intensity(reynolds_number)
 
 
     def calc_turb_kinetic_energy(self, velocity:float | None=None, turb_intensity:float | None=None) -> float:
         """Calculates the turbulent kinetic energy from velocity and turbulent intensity"""
         velocity = self.free_stream_velocity.value if velocity is None else velocity
         turb_intensity = self.turb_intensity.value if turb_intensity is None else turb_intensity
-        return (3 / 2) * (velocity * turb_intensity) ** 2
+        return turb_kinetic_energy(velocity, turb_intensity)
 
 
     def calc_turb_length_scale(self, hydraulic_diameter: float | None=None) -> float:
         """Calculates the turbulent length scale from the hydraulic diameter"""
-        coefficient_for_pipe_flow = 0.07
         hydraulic_diameter = self.hydraulic_diameter.value if hydraulic_diameter is None else hydraulic_diameter
-        return hydraulic_diameter * coefficient_for_pipe_flow
+        return turb_length_scale(hydraulic_diameter)
 
 
     def calc_turb_dissipation_rate(
@@ -103,10 +152,9 @@ class FlowMetrics:
             turb_kinetic_energy: float | None=None,
             turb_length_scale: float | None=None) -> float:
         """Calculates turbulent dissipation rate from turbulent kinetic energy and turbulent length scale"""
-        model_function = 0.09
         turb_kinetic_energy = self.turb_kinetic_energy.value if turb_kinetic_energy is None else turb_kinetic_energy
         turb_length_scale = self.turb_length_scale.value if turb_length_scale is None else turb_length_scale
-        return model_function ** (3 / 4) * turb_kinetic_energy ** (3 / 2) / turb_length_scale
+        return turb_dissipation_rate(turb_kinetic_energy, turb_length_scale)
 
 
     def calc_specific_turb_dissipation_rate(
@@ -114,10 +162,9 @@ class FlowMetrics:
             turb_kinetic_energy: float | None=None,
             turb_length_scale: float | None=None) -> float:
         """Calculates specific turbulent dissipation rate from turbulent kinetic energy and turbulent length scale"""
-        model_function = 0.09
         turb_kinetic_energy = self.turb_kinetic_energy.value if turb_kinetic_energy is None else turb_kinetic_energy
         turb_length_scale = self.turb_length_scale.value if turb_length_scale is None else turb_length_scale
-        return turb_kinetic_energy ** 0.5 / (model_function ** (1 / 4) * turb_length_scale)
+        return specific_dissipation(turb_kinetic_energy, turb_length_scale)
 
 
     def calc_turb_viscosity_epsilon(
@@ -125,10 +172,9 @@ class FlowMetrics:
             turb_kinetic_energy: float | None=None,
             turb_dis_rate: float | None=None) -> float:
         """Calculates turbulent viscosity from turbulent kinetic energy and turbulent dissipation rate"""
-        model_function = 0.09
         turb_kinetic_energy = self.turb_kinetic_energy.value if turb_kinetic_energy is None else turb_kinetic_energy
         turb_dis_rate = self.turb_dissipation_rate.value if turb_dis_rate is None else turb_dis_rate
-        return model_function * turb_kinetic_energy ** 2 / turb_dis_rate
+        return turb_viscosity(turb_kinetic_energy, turb_dis_rate)
 
 
     @staticmethod
@@ -140,4 +186,60 @@ class FlowMetrics:
                     raise ValueError("Value must be positive")
                 return metric
             except ValueError as e:
-                print(f"Invalid input: {e}")
\ No newline at end of file
+                print(f"Invalid input: {e}")
+
+
+class FlowMetricsArray:
+    """Array version of FlowMetrics, evaluating many operating points in one vectorised call. Every metric is a NumPy
+    array (the inputs are broadcast to a common shape). Like FlowMetrics, only missing metrics are computed from the
+    others, in the order of their dependencies. A metric is missing if it is not given, or where it is NaN."""
+
+    INPUTS = ['hydraulic_diameter', 'free_stream_velocity', 'kinematic_viscosity']
+    # The metrics computed from the inputs and the metrics they depend on, in the order of their dependencies
+    CALCULATIONS = [
+        ('reynolds_number', reynolds_number, ['hydraulic_diameter', 'free_stream_velocity', 'kinematic_viscosity']),
+        ('turb_intensity', turb_intensity, ['reynolds_number']),
+        ('turb_kinetic_energy', turb_kinetic_energy, ['free_stream_velocity', 'turb_intensity']),
+        ('turb_length_scale', turb_length_scale, ['hydraulic_diameter']),
+        ('turb_dissipation_rate', turb_dissipation_rate, ['turb_kinetic_energy', 'turb_length_scale']),
+        ('specific_dissipation', specific_dissipation, ['turb_kinetic_energy', 'turb_length_scale']),
+        ('turb_viscosity', turb_viscosity, ['turb_kinetic_energy', 'turb_dissipation_rate']),
+    ]
+
+    def __init__(self, hydraulic_diameter, free_stream_velocity, kinematic_viscosity, **metrics):
+        unknown = set(metrics) - {name for name, _, _ in self.CALCULATIONS}
+        if unknown:
+            raise TypeError(f"Unknown flow metrics: {', '.join(sorted(unknown))}")
+        given = dict(hydraulic_diameter=hydraulic_diameter, free_stream_velocity=free_stream_velocity,
+                     kinematic_viscosity=kinematic_viscosity, **metrics)
+        given = {name: value for name, value in given.items() if value is not None}
+        missing_inputs = [name for name in self.INPUTS if name not in given]
+        if missing_inputs:
+            raise ValueError(f"Missing inputs: {', '.join(missing_inputs)}")
+        arrays = np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in given.values()])
+        self.shape = arrays[0].shape
+        for name, values in zip(given, arrays):
+            setattr(self, name, values.copy())
+        self.perform_boundary_calculations()
+
+
+    @classmethod
+    def for_fluid(cls, fluid: str, temperature, hydraulic_diameter, free_stream_velocity, pressure=ATMOSPHERE_PA,
+                  **metrics):
+        """Creates the metrics of operating points of a fluid, taking the kinematic viscosity at arrays of
+        temperatures (C) and pressures (Pa) from the fluid property tables"""
+        kinematic_viscosity = FluidProperties(fluid).kinematic_viscosity(temperature, pressure)
+        return cls(hydraulic_diameter, free_stream_velocity, kinematic_viscosity, **metrics)
+
+
+    def perform_boundary_calculations(self):
+        """Computes the missing metrics, or their missing (NaN) operating points"""
+        for name, function, dependencies in self.CALCULATIONS:
+            computed = function(*[getattr(self, dependency) for dependency in dependencies])
+            given = getattr(self, name, None)
+            setattr(self, name, computed if given is None else np.where(np.isnan(given), computed, given))
+
+
+    def metrics(self) -> dict[str, np.ndarray]:
+        """Returns all metrics, e.g. to build a table of the operating points"""
+        return {name: getattr(self, name) for name in self.INPUTS + [name for name, _, _ in self.CALCULATIONS]}
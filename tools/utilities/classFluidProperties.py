@@ -0,0 +1,120 @@
+import os
+import numpy as np
+from utilities.calculateFlowMetrics import (ATMOSPHERE_PA, WATER_TEMPERATURE_RANGE, calc_density_air,
+                                            calc_density_water, calc_dynamic_viscosity_air,
+                                            calc_dynamic_viscosity_water)
+from utilities.classFoamDictEditor import ClassFoamDictEditor
+
+PHYSICAL_PROPERTIES = [os.path.join('constant', 'physicalProperties'), os.path.join('constant', 'transportProperties')]
+# Temperature (C) and pressure (Pa) ranges and steps of the tables. Water is treated as incompressible
+FLUID_TABLE_RANGES = {
+    'air': {'temperature': (-50.0, 300.0, 0.25), 'pressure': (1e4, 1e6, 1e4)},
+    'water': {'temperature': (WATER_TEMPERATURE_RANGE[0] + 0.05, WATER_TEMPERATURE_RANGE[1] - 0.05, 0.05),
+              'pressure': (ATMOSPHERE_PA, ATMOSPHERE_PA, 1.0)},
+}
+DEFAULT_TEMPERATURE = 20.0
+# Temperatures (C) at which a fluid is identified from the viscosity of a case. Outside of them the viscosity is more
+# likely a rounded placeholder (e.g. 1e-05) than a fluid at an extreme temperature (air at -40 C)
+CASE_TEMPERATURE_RANGE = (0.0, 50.0)
+_TABLES = dict()
+
+
+def fluid_property_laws(fluid: str, temperature: np.ndarray, pressure: np.ndarray) -> dict[str, np.ndarray]:
+    """Evaluates the dynamic viscosity and the density of a fluid (the correlations of calculateFlowMetrics)"""
+    if fluid == 'air':
+        return {'mu': calc_dynamic_viscosity_air(temperature), 'rho': calc_density_air(temperature, pressure)}
+    if fluid == 'water':
+        return {'mu': calc_dynamic_viscosity_water(temperature), 'rho': calc_density_water(temperature)}
+    raise ValueError(f"Unknown fluid '{fluid}', choose from: {', '.join(FLUID_TABLE_RANGES)}")
+
+
+class FluidProperties:
+    """Dense tables of the dynamic viscosity (mu) and density (rho) of a fluid over temperature (C) and pressure (Pa).
+    The tables of a fluid are computed once per process, after which properties are looked up for whole arrays of
+    temperatures and pressures by bilinear interpolation. The kinematic viscosity is derived from both, as it is not
+    linear in pressure (unlike the density of an ideal gas)"""
+
+    def __init__(self, fluid: str):
+        if fluid not in FLUID_TABLE_RANGES:
+            raise ValueError(f"Unknown fluid '{fluid}', choose from: {', '.join(FLUID_TABLE_RANGES)}")
+        self.fluid = fluid
+        ranges = FLUID_TABLE_RANGES[fluid]
+        self.temperatures = self.axis(*ranges['temperature'])
+        self.pressures = self.axis(*ranges['pressure'])
+        if fluid not in _TABLES:
+            temperature, pressure = np.meshgrid(self.temperatures, self.pressures, indexing='ij')
+            _TABLES[fluid] = fluid_property_laws(fluid, temperature, pressure)
+        self.tables = _TABLES[fluid]
+
+
+    @staticmethod
+    def axis(start: float, stop: float, step: float) -> np.ndarray:
+        return np.linspace(start, stop, int(round((stop - start) / step)) + 1)
+
+
+    @staticmethod
+    def locate(axis: np.ndarray, values: np.ndarray, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the index of the lower grid point and the interpolation weight of the upper one"""
+        if len(axis) == 1:
+            return np.zeros(values.shape, dtype=int), np.zeros(values.shape)
+        if np.any(values < axis[0]) or np.any(values > axis[-1]):
+            raise ValueError(f"{name} must be between {axis[0]:g} and {axis[-1]:g}")
+        position = (values - axis[0]) / (axis[1] - axis[0])
+        index = np.minimum(position.astype(int), len(axis) - 2)
+        return index, position - index
+
+
+    def lookup(self, name: str, temperature, pressure=ATMOSPHERE_PA) -> np.ndarray:
+        """Interpolates a property (mu or rho) at arrays of temperatures (C) and pressures (Pa)"""
+        temperature, pressure = np.broadcast_arrays(np.asarray(temperature, dtype=float),
+                                                    np.asarray(pressure, dtype=float))
+        i, ft = self.locate(self.temperatures, temperature, 'Temperature')
+        j, fp = self.locate(self.pressures, pressure, 'Pressure')
+        table = self.tables[name]
+        j_upper = np.minimum(j + 1, len(self.pressures) - 1)
+        return ((1 - ft) * ((1 - fp) * table[i, j] + fp * table[i, j_upper]) +
+                ft * ((1 - fp) * table[i + 1, j] + fp * table[i + 1, j_upper]))
+
+
+    def dynamic_viscosity(self, temperature, pressure=ATMOSPHERE_PA) -> np.ndarray:
+        return self.lookup('mu', temperature, pressure)
+
+
+    def density(self, temperature, pressure=ATMOSPHERE_PA) -> np.ndarray:
+        return self.lookup('rho', temperature, pressure)
+
+
+    def kinematic_viscosity(self, temperature, pressure=ATMOSPHERE_PA) -> np.ndarray:
+        return self.lookup('mu', temperature, pressure) / self.lookup('rho', temperature, pressure)
+
+
+    def temperature_from_kinematic_viscosity(self, nu, pressure=ATMOSPHERE_PA) -> float | None:
+        """Inverts the (monotonic) kinematic viscosity at a pressure. Returns None if nu is outside the table"""
+        column = self.kinematic_viscosity(self.temperatures, pressure)
+        order = np.argsort(column)
+        if not column[order[0]] <= nu <= column[order[-1]]:
+            return None
+        return float(np.interp(nu, column[order], self.temperatures[order]))
+
+
+def identify_fluid(nu: float, pressure: float = ATMOSPHERE_PA,
+                   temperature_range: tuple[float, float] = CASE_TEMPERATURE_RANGE) -> tuple[str, float] | None:
+    """Identifies the fluid and its temperature from a kinematic viscosity, e.g. that of the case. Returns None if no
+    fluid has that viscosity within the temperature range"""
+    for fluid in FLUID_TABLE_RANGES:
+        temperature = FluidProperties(fluid).temperature_from_kinematic_viscosity(nu, pressure)
+        if temperature is not None and temperature_range[0] <= temperature <= temperature_range[1]:
+            return fluid, temperature
+    return None
+
+
+def read_kinematic_viscosity() -> float | None:
+    """Reads the kinematic viscosity nu from constant/physicalProperties (or transportProperties)"""
+    for path in PHYSICAL_PROPERTIES:
+        if not os.path.isfile(path):
+            continue
+        editor = ClassFoamDictEditor(path)
+        if editor.has_entry('nu'):
+            # The value may be preceded by its dimensions, e.g. nu [0 2 -1 0 0 0 0] 1e-06;
+            return float(str(editor.get_value('nu')).split(']')[-1].split()[-1])
+    return None
@@ -1,5 +1,235 @@
+import os
 import re
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NamedTuple
+
+# Punctuation that structures an OpenFOAM dictionary
+PUNCTUATION = set('{}()[];')
+OPENING, CLOSING = set('([{'), set(')]}')
+
+# Number of arguments consumed by directives that stand on their own (i.e. are not used as values)
+DIRECTIVE_ARGUMENTS = {'#include': 1, '#includeIfPresent': 1, '#includeEtc': 1, '#includeFunc': 1,
+                       '#includeModel': 1, '#remove': 1, '#inputMode': 1, '#if': 1, '#ifeq': 2,
+                       '#else': 0, '#endif': 0}
+INCLUDE_DIRECTIVES = {'#include', '#includeIfPresent', '#includeEtc'}
+
+# Matches a $variable or ${variable} reference inside a value
+VARIABLE_PATTERN = re.compile(r'\$\{([^}]+)\}|\$([A-Za-z0-9_.:/]+)')
+
+# Number of components of the element types of binary lists (e.g. nonuniform List<vector> 1000(...))
+BINARY_COMPONENTS = {'scalar': 1, 'vector': 3, 'symmTensor': 6, 'tensor': 9, 'sphericalTensor': 1}
+LIST_TYPE_PATTERN = re.compile(r'List<(\w+)>')
+BINARY_LIST_START = re.compile(r'(\d+)\s*\(')
+
+
+class FoamToken(NamedTuple):
+    """A token of an OpenFOAM dictionary along with its character span in the source text"""
+    kind: str  # One of: space, comment, string, word, variable, directive, verbatim, punct
+    text: str
+    start: int
+    end: int
+
+
+class FoamEntry:
+    """A node of the dictionary tree. Spans are character offsets into the text of the owning editor"""
+
+    def __init__(self, key: str, kind: str, start: int, end: int, value_start: int, value_end: int,
+                 parent=None):
+        self.key = key
+        self.kind = kind  # One of: dict, value, directive
+        self.start = start  # Start of the key
+        self.end = end  # End of the terminating ';' or '}'
+        self.value_start = value_start  # Value span, or the body span (inside the braces) of a dict
+        self.value_end = value_end
+        self.parent = parent
+        self.children: list[FoamEntry] = list()
+        self.args: list[str] = list()  # Directive arguments
+
+    def __repr__(self):
+        return f"FoamEntry({self.key!r}, {self.kind}, {self.start}:{self.end})"
+
+    def matches(self, key: str) -> bool:
+        """Checks if the entry key matches a key, either literally or as a quoted regular expression"""
+        if self.kind == 'directive':
+            return False
+        if self.key == key or self.key.strip('"') == key:
+            return True
+        if self.key.startswith('"'):
+            try:
+                return re.fullmatch(self.key.strip('"'), key) is not None
+            except re.error:
+                return False
+        return False
+
+    def find_child(self, key: str):
+        """Finds a direct child by key. Literal matches take precedence, the last match wins like in OpenFOAM"""
+        literal = [child for child in self.children if child.kind != 'directive' and
+                   (child.key == key or child.key.strip('"') == key)]
+        if literal:
+            return literal[-1]
+        patterns = [child for child in self.children if child.matches(key)]
+        return patterns[-1] if patterns else None
+
+
+def binary_element_sizes(text: str) -> dict | None:
+    """Returns the byte size of binary list elements if the header declares a binary format, otherwise None"""
+    header = text[:4096]
+    if not re.search(r'\bformat\s+binary\s*;', header):
+        return None
+    label_bits = re.search(r'label\s*=\s*(\d+)', header)
+    scalar_bits = re.search(r'scalar\s*=\s*(\d+)', header)
+    label_size = int(label_bits.group(1)) // 8 if label_bits else 4
+    scalar_size = int(scalar_bits.group(1)) // 8 if scalar_bits else 8
+    sizes = {name: components * scalar_size for name, components in BINARY_COMPONENTS.items()}
+    sizes.update({'label': label_size, 'bool': 1})
+    return sizes
+
+
+def tokenize(text: str, element_sizes: dict | None = None) -> list[FoamToken]:
+    """Splits an OpenFOAM dictionary into tokens. Concatenating the tokens reproduces the text exactly.
+    The raw payload of binary lists (binary format files) is kept as a single opaque token. The element sizes
+    are detected from the header, or can be given for text that does not start with the header"""
+    tokens = list()
+    i, length = 0, len(text)
+    element_sizes = binary_element_sizes(text) if element_sizes is None else element_sizes
+    list_type = None
+    while i < length:
+        char = text[i]
+        start = i
+        binary_list = BINARY_LIST_START.match(text, i) if element_sizes and list_type in element_sizes else None
+        if binary_list:
+            i = min(binary_list.end() + int(binary_list.group(1)) * element_sizes[list_type] + 1, length)
+            list_type = None
+            kind = 'binary'
+        elif char.isspace():
+            while i < length and text[i].isspace():
+                i += 1
+            kind = 'space'
+        elif text.startswith('//', i):
+            i = text.find('\n', i)
+            i = length if i == -1 else i
+            kind = 'comment'
+        elif text.startswith('/*', i):
+            i = text.find('*/', i + 2)
+            i = length if i == -1 else i + 2
+            kind = 'comment'
+        elif text.startswith('#{', i):
+            i = text.find('#}', i + 2)
+            i = length if i == -1 else i + 2
+            kind = 'verbatim'
+        elif char == '"':
+            i += 1
+            while i < length and text[i] != '"':
+                i += 2 if text[i] == '\\' else 1
+            i = min(i + 1, length)
+            kind = 'string'
+        elif char in PUNCTUATION:
+            i += 1
+            kind = 'punct'
+        elif char == '$' and text.startswith('${', i):
+            i = text.find('}', i)
+            i = length if i == -1 else i + 1
+            kind = 'variable'
+        else:
+            # Words may contain balanced parentheses, e.g. div(phi,U)
+            depth = 0
+            while i < length:
+                current = text[i]
+                if current == '(' and i > start:
+                    depth += 1
+                elif current == ')' and depth > 0:
+                    depth -= 1
+                elif depth == 0 and (current.isspace() or current in PUNCTUATION or current == '"'
+                                     or text.startswith('//', i) or text.startswith('/*', i)):
+                    break
+                i += 1
+            i = max(i, start + 1)
+            kind = 'directive' if char == '#' else 'variable' if char == '$' else 'word'
+            list_match = LIST_TYPE_PATTERN.fullmatch(text, start, i)
+            list_type = list_match.group(1) if list_match else list_type
+        tokens.append(FoamToken(kind, text[start:i], start, i))
+    return tokens
+
+
+class FoamDictParser:
+    """Builds a tree of FoamEntry nodes from the tokens of an OpenFOAM dictionary"""
+
+    def __init__(self, text: str, element_sizes: dict | None = None):
+        self.text = text
+        self.tokens = [token for token in tokenize(text, element_sizes) if token.kind not in ('space', 'comment')]
+        self.position = 0
+
+    def parse(self) -> FoamEntry:
+        root = FoamEntry('', 'dict', 0, len(self.text), 0, len(self.text))
+        self.parse_entries(root)
+        return root
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def parse_entries(self, parent: FoamEntry) -> None:
+        """Parses entries until the closing brace of the parent dictionary (or the end of the file)"""
+        while (token := self.peek()) is not None:
+            if token.kind == 'punct' and token.text == '}':
+                return
+            self.position += 1
+            if token.kind == 'punct' and token.text == ';':
+                continue
+            if token.kind == 'directive' and token.text in DIRECTIVE_ARGUMENTS:
+                self.parse_directive(token, parent)
+                continue
+            following = self.peek()
+            if following is not None and following.kind == 'punct' and following.text == '{':
+                self.parse_sub_dict(token, parent)
+            else:
+                self.parse_value(token, parent)
+
+    def parse_directive(self, token: FoamToken, parent: FoamEntry) -> None:
+        entry = FoamEntry(token.text, 'directive', token.start, token.end, token.end, token.end, parent)
+        for _ in range(DIRECTIVE_ARGUMENTS[token.text]):
+            argument = self.peek()
+            if argument is None or argument.kind == 'punct':
+                break
+            self.position += 1
+            entry.args.append(argument.text)
+            entry.end = entry.value_end = argument.end
+        parent.children.append(entry)
+
+    def parse_sub_dict(self, key: FoamToken, parent: FoamEntry) -> None:
+        opening = self.tokens[self.position]
+        self.position += 1
+        entry = FoamEntry(key.text, 'dict', key.start, opening.end, opening.end, opening.end, parent)
+        self.parse_entries(entry)
+        closing = self.peek()
+        if closing is None:  # Unterminated dictionary, treat the remainder of the file as its body
+            entry.value_end = entry.end = len(self.text)
+        else:
+            self.position += 1
+            entry.value_end, entry.end = closing.start, closing.end
+        parent.children.append(entry)
+
+    def parse_value(self, key: FoamToken, parent: FoamEntry) -> None:
+        """Parses the value tokens of a key up to the terminating semicolon (at bracket depth 0)"""
+        entry = FoamEntry(key.text, 'value', key.start, key.end, key.end, key.end, parent)
+        depth, first = 0, None
+        while (token := self.peek()) is not None:
+            if token.kind == 'punct':
+                if token.text == ';' and depth == 0:
+                    self.position += 1
+                    entry.end = token.end
+                    break
+                if token.text == '}' and depth == 0:
+                    break  # Missing semicolon before the end of the dictionary
+                depth += 1 if token.text in OPENING else -1 if token.text in CLOSING else 0
+            self.position += 1
+            first = token if first is None else first
+            entry.value_end = entry.end = token.end
+        if first is not None:
+            entry.value_start = first.start
+        else:
+            entry.value_start = entry.value_end = key.end
+        parent.children.append(entry)
 
 
 class ClassFoamDictEditor:
@@ -10,6 +240,28 @@ class ClassFoamDictEditor:
         # Ensure file exists
         if not self.foam_dict.exists():
             raise FileNotFoundError(f"File {self.foam_dict} does not exist")
+        # Binary field files are read as latin-1, which maps every byte to a character and round-trips exactly
+        data = self.foam_dict.read_bytes()
+        try:
+            self.encoding = 'utf-8'
+            self.text = data.decode(self.encoding)
+        except UnicodeDecodeError:
+            self.encoding = 'latin-1'
+            self.text = data.decode(self.encoding)
+        self._root = FoamDictParser(self.text).parse()
+        self._stale = False
+        self._batch_depth = 0
+        self._modified = False
+        self._included_editors: dict[Path, 'ClassFoamDictEditor'] = {}
+
+
+    @property
+    def root(self) -> FoamEntry:
+        """The tree of the text, re-parsed only after an edit that could not be applied to it in place"""
+        if self._stale:
+            self._root = FoamDictParser(self.text).parse()
+            self._stale = False
+        return self._root
 
 
     @staticmethod
@@ -30,69 +282,329 @@ class ClassFoamDictEditor:
         return value
 
 
+    @staticmethod
+    def split_key_path(key_path: str) -> list[str]:
+        """Splits a scoped key path such as 'boundaryField/inlet/type' into its keys"""
+        return [key for key in key_path.strip('/').split('/') if key]
+
+
+    # ------------------- Reading -------------------
+
     def load_dict_entries(self):
-        # Get the text from the OpenFOAM dictionary
-        text = self.foam_dict.read_text()
-        # Remove /* block */ comments (multi-line safe)
-        text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+        """Returns all entries as (nested) python dictionaries with parsed values"""
         self.entries.clear()
-        for line in text.splitlines():
-            # Remove comments (any text following a '//')
-            line = re.sub(r"//.*", "", line).strip()
-            # Skip blank lines
-            if not line:
-                continue
-            # Entry format: "<whitespaces> key <whitespaces> value <whitespaces>;". Value may be multiple tokens.
-            match = re.match(r"([A-Za-z0-9_]+)\s+(.*?)\s*;", line)
-            if match:
-                key, value = match.groups()
-                value = value.strip()
-                value = self.parse_values(value)
-                self.entries[key] = value
+        self.entries.update(self.entry_to_dict(self.root))
         return self.entries
 
 
+    def entry_to_dict(self, entry: FoamEntry) -> dict:
+        result = dict()
+        for child in entry.children:
+            if child.kind == 'dict':
+                result[child.key] = self.entry_to_dict(child)
+            elif child.kind == 'value':
+                result[child.key] = self.parse_values(self.value_text(child))
+        return result
+
+
+    def value_text(self, entry: FoamEntry) -> str:
+        """Returns the raw value (or dictionary body) text of an entry with comments removed"""
+        raw = self.text[entry.value_start:entry.value_end]
+        tokens = [token.text for token in tokenize(raw) if token.kind != 'comment']
+        return re.sub(r'\s+', ' ', ''.join(tokens)).strip()
+
+
+    def find_entry(self, key_path: str, scope: FoamEntry | None = None, follow_includes: bool = True):
+        """Finds an entry by its scoped key path. Keys missing from this file are searched in #include files"""
+        entry = self.root if scope is None else scope
+        for key in self.split_key_path(key_path):
+            if key == '..':
+                entry = entry.parent if entry.parent is not None else entry
+                continue
+            child = entry.find_child(key) if entry.kind == 'dict' else None
+            if child is None and follow_includes:
+                child = self.find_in_includes(entry, key)
+            if child is None:
+                return None
+            entry = child
+        return entry
+
+
+    def has_entry(self, key_path: str) -> bool:
+        return self.find_entry(key_path) is not None
+
+
+    def get_value(self, key_path: str, expand: bool = True):
+        """Returns the parsed value of an entry, expanding any $variables it references"""
+        entry = self.find_entry(key_path)
+        if entry is None:
+            raise KeyError(f"Key '{key_path}' not found in dictionary")
+        if entry.kind == 'dict':
+            return self.entry_to_dict(entry)
+        editor = self.owning_editor(entry)
+        value = editor.value_text(entry)
+        if expand:
+            value = editor.expand_variables(value, entry.parent)
+        return self.parse_values(value)
+
+
+    def expand_variables(self, value: str, scope: FoamEntry | None = None, depth: int = 0) -> str:
+        """Replaces $var, $scoped/var, $/absolute/var and ${var} references by the values they point to"""
+        scope = self.root if scope is None else scope
+        if depth > 16:
+            raise RecursionError(f"Too many nested variable expansions in '{value}'")
+
+        def substitute(match: re.Match) -> str:
+            reference = match.group(1) or match.group(2)
+            entry = self.resolve_variable(reference, scope)
+            if entry is None or entry.kind != 'value':
+                return match.group(0)  # Leave unresolved variables (e.g. from #includeEtc) untouched
+            editor = self.owning_editor(entry)
+            return editor.expand_variables(editor.value_text(entry), entry.parent, depth + 1)
+
+        return VARIABLE_PATTERN.sub(substitute, value)
+
+
+    def resolve_variable(self, reference: str, scope: FoamEntry):
+        """Looks up a variable reference, searching the enclosing scopes from the inside out"""
+        reference = reference.replace(':', '/').replace('.', '/') if '/' not in reference else reference
+        if reference.startswith('/'):
+            return self.find_entry(reference)
+        while scope is not None:
+            entry = self.find_entry(reference, scope)
+            if entry is not None:
+                return entry
+            scope = scope.parent
+        return None
+
+
+    # ------------------- Includes -------------------
+
+    def includes(self, scope: FoamEntry | None = None) -> list[Path]:
+        """Lists the files included (#include, #includeIfPresent, #includeEtc) in a scope that can be located"""
+        scope = self.root if scope is None else scope
+        paths = list()
+        for child in scope.children:
+            if child.kind != 'directive' or child.key not in INCLUDE_DIRECTIVES or not child.args:
+                continue
+            name = os.path.expandvars(child.args[0].strip('"'))
+            if child.key == '#includeEtc':
+                etc_dir = os.environ.get('FOAM_ETC')
+                if etc_dir is None:
+                    continue
+                path = Path(etc_dir) / name
+            else:
+                path = Path(name) if os.path.isabs(name) else self.foam_dict.parent / name
+            if path.is_file():
+                paths.append(path)
+        return paths
+
+
+    def included_editor(self, path: Path):
+        path = path.resolve()
+        if path not in self._included_editors:
+            self._included_editors[path] = ClassFoamDictEditor(str(path))
+        return self._included_editors[path]
+
+
+    def find_in_includes(self, scope: FoamEntry, key: str):
+        """Searches the included files of a scope for a key. Later includes take precedence"""
+        for path in reversed(self.includes(scope)):
+            if path.resolve() == self.foam_dict.resolve():
+                continue
+            entry = self.included_editor(path).find_entry(key)
+            if entry is not None:
+                return entry
+        return None
+
+
+    def owning_editor(self, entry: FoamEntry):
+        """Returns the editor (this one, or that of an included file) whose text contains the entry"""
+        root = entry
+        while root.parent is not None:
+            root = root.parent
+        if root is self.root:
+            return self
+        for editor in self._included_editors.values():
+            owner = editor.owning_editor(entry)
+            if owner is not None:
+                return owner
+        return None
+
+
+    # ------------------- Editing -------------------
+
+    @contextmanager
+    def batch(self, write: bool = True):
+        """Collects all edits made within the context and writes the file once at the end (unless write=False)"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._modified and write:
+                self.write()
+
+
+    def write(self) -> None:
+        self.foam_dict.write_bytes(self.text.encode(self.encoding))
+        self._modified = False
+
+
+    def splice(self, start: int, end: int, replacement: str, container: FoamEntry | None = None,
+               structural: bool = False) -> None:
+        """Replaces a span of the text and writes the file unless a batch is active. The spans of the tree behind
+        the edit are shifted by the change in length, so the file is not parsed again. Inserted text belongs to the
+        container (and its parents). Structural edits the caller does not apply to the tree mark it for re-parsing"""
+        self.text = self.text[:start] + replacement + self.text[end:]
+        if structural:
+            self._stale = True
+        elif not self._stale:
+            self.shift_spans(start, end, len(replacement) - (end - start), container)
+        self._modified = True
+        if self._batch_depth == 0:
+            self.write()
+
+
+    def shift_spans(self, start: int, end: int, delta: int, container: FoamEntry | None = None) -> None:
+        if delta == 0:
+            return
+        enclosing = set()
+        while container is not None:
+            enclosing.add(id(container))
+            container = container.parent
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children)
+            for attribute in ('start', 'end', 'value_start', 'value_end'):
+                offset = getattr(node, attribute)
+                # An insertion at the end of an entry extends it only if the entry contains the inserted text
+                if offset > end or offset == end and (start != end or attribute in ('end', 'value_end')
+                                                      and id(node) in enclosing):
+                    setattr(node, attribute, offset + delta)
+
+
+    def graft(self, parent: FoamEntry, text: str, position: int) -> None:
+        """Adds the entries of a text inserted at a position to the children of a parsed parent"""
+        fragment = FoamDictParser(text, binary_element_sizes(self.text)).parse()
+        stack = list(fragment.children)
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children)
+            node.start, node.end = node.start + position, node.end + position
+            node.value_start, node.value_end = node.value_start + position, node.value_end + position
+        for child in fragment.children:
+            child.parent = parent
+            parent.children.append(child)
+
+
+    def format_value(self, value, indent: str) -> str:
+        """Formats a python value as an OpenFOAM value. Dictionaries become sub-dictionaries"""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, dict):
+            inner = indent + ' ' * 4
+            lines = [f"{inner}{self.format_entry(key, sub_value, inner)}" for key, sub_value in value.items()]
+            return '\n'.join([f"\n{indent}{{", *lines, f"{indent}}}"])
+        return str(value)
+
+
+    def format_entry(self, key: str, value, indent: str) -> str:
+        if isinstance(value, dict):
+            return f"{key}{self.format_value(value, indent)}"
+        return f"{key}    {self.format_value(value, indent)};"
+
+
+    def line_indent(self, offset: int) -> str:
+        line_start = self.text.rfind('\n', 0, offset) + 1
+        return re.match(r'[ \t]*', self.text[line_start:offset]).group(0)
+
+
     def set_value(self, key: str, new_value) -> None:
-        """Replace the value of an existing key in the file."""
+        """Replace the value of an existing key in the file (or add it, if it does not exist)."""
+        entry = self.find_entry(key, follow_includes=False)
+        if entry is None:
+            self.add_entry(key, new_value)
+            return
+        if entry.kind != 'value':
+            raise ValueError(f"Key '{key}' is a {entry.kind} and cannot be set to a value")
         self.entries[key] = new_value
-        new_value_str = f"{new_value};"
-        text = self.foam_dict.read_text()
-        # Match: key <anything until semicolon>
-        pattern = re.compile(rf"({key}\s+).*?;", re.MULTILINE)
-        # Substitute only the value portion
-        updated = pattern.sub(rf"\1{new_value_str}", text)
-        self.foam_dict.write_text(updated)
+        replacement = self.format_value(new_value, self.line_indent(entry.start))
+        if entry.value_start == entry.value_end:  # Empty value, keep a space between key and value
+            replacement = f" {replacement}"
+        # Dictionaries and empty values (whose span the parser puts at the end of the key) need a re-parse
+        structural = isinstance(new_value, dict) or not replacement.strip() or entry.value_start == entry.value_end
+        self.splice(entry.value_start, entry.value_end, replacement, container=entry, structural=structural)
 
 
     def add_entry(self, key: str, value, comment:str | None = None) -> None:
-        """Append a new key-value pair to the end of the dictionary file. Always writes in the form: key   value;"""
+        """Add a new key-value pair at the end of its (sub-)dictionary, creating missing sub-dictionaries.
+        Always writes in the form: key   value;"""
         if comment is None:
             comment = ""
         else:
             comment = comment if comment.startswith("//") else f"//{comment}"
-            comment = comment if comment.endswith("\n") else f"{comment}\n"
-        value_str = f"{key}    {value};\n"
-        text = self.foam_dict.read_text().rstrip()
-        self.foam_dict.write_text(text + "\n" + comment + value_str)
+        keys = self.split_key_path(key)
+        parent = self.root
+        for depth, parent_key in enumerate(keys[:-1]):
+            child = parent.find_child(parent_key)
+            if child is None:
+                # Create the remaining sub-dictionaries as part of the new entry
+                nested = value
+                for nested_key in reversed(keys[depth + 1:]):
+                    nested = {nested_key: nested}
+                keys, value = keys[:depth + 1], nested
+                break
+            if child.kind != 'dict':
+                raise ValueError(f"Key '{parent_key}' is not a dictionary")
+            parent = child
+        self.entries[key] = value
+        siblings = [child for child in parent.children]
+        if siblings:
+            indent = self.line_indent(siblings[-1].start)
+            insert_at = siblings[-1].end
+            # Insert behind a trailing comment of the last entry, unless more follows on its line
+            line_end = self.text.find('\n', insert_at)
+            line_end = len(self.text) if line_end == -1 else line_end
+            if not re.sub(r'//.*', '', self.text[insert_at:line_end]).strip():
+                insert_at = line_end
+        elif parent is self.root:
+            indent, insert_at = '', len(self.text.rstrip())
+        else:
+            indent = self.line_indent(parent.start) + ' ' * 4
+            insert_at = parent.value_start
+        new_text = f"\n{indent}{comment}" if comment else ""
+        new_text += f"\n{indent}{self.format_entry(keys[-1], value, indent)}"
+        if parent is self.root and not siblings:
+            new_text += "\n"
+        # Text following an entry without a terminating ';' would be parsed as part of its value
+        last = siblings[-1] if siblings else None
+        terminated = last is None or self.text[last.end - 1] == (';' if last.kind != 'dict' else '}')
+        self.splice(insert_at, insert_at, new_text, container=parent, structural=not terminated)
+        if terminated:
+            self.graft(parent, new_text, insert_at)
 
 
     def delete_entry(self, key: str) -> None:
         """Delete a dictionary entry by key and remove consecutive blank/comment lines above it."""
-        lines = self.foam_dict.read_text().splitlines()
-        new_lines = list()
-        entry_deleted = False
-        for i, line in enumerate(lines):
-            # Strip inline // comments for detection
-            stripped = re.sub(r"//.*", "", line).strip()
-            # Detect target entry:  key  value ;
-            if re.match(rf"{key}\s+.*?;", stripped):
-                entry_deleted = True
-                # Remove blank/comment lines above (in new_lines)
-                while new_lines and re.sub(r"//.*", "", new_lines[-1]).strip() == "":
-                    new_lines.pop()
-                continue  # Do not copy the target line
-            new_lines.append(line)
-        if not entry_deleted:
+        entry = self.find_entry(key, follow_includes=False)
+        if entry is None:
             raise KeyError(f"Key '{key}' not found in dictionary")
-        # Write output file back
-        self.foam_dict.write_text("\n".join(new_lines) + "\n")
+        start, end = entry.start, entry.end
+        # Remove the whole line if the entry is the only thing on it (a trailing comment belongs to the entry)
+        line_start = self.text.rfind('\n', 0, start) + 1
+        line_end = self.text.find('\n', end)
+        line_end = len(self.text) if line_end == -1 else line_end
+        if not self.text[line_start:start].strip() and not re.sub(r'//.*', '', self.text[end:line_end]).strip():
+            start, end = line_start, min(line_end + 1, len(self.text))
+            # Remove blank/comment lines above (but never the '// * * *' header separator)
+            while start > 0:
+                previous_start = self.text.rfind('\n', 0, start - 1) + 1
+                previous_line = self.text[previous_start:start]
+                if re.sub(r"//.*", "", previous_line).strip() != "" or '* * *' in previous_line:
+                    break
+                start = previous_start
+        self.entries.pop(key, None)
+        entry.parent.children.remove(entry)
+        self.splice(start, end, "")
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utilities.classFieldReader import FieldReader
+from utilities.classFoamDictEditor import ClassFoamDictEditor, FoamDictParser
+from utilities.classPolyMesh import PolyMesh
+from utilities.lazyImports import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+SAMPLE_DICT = os.path.join('system', 'sampleDict')
+MESH_DIRECTORY = os.path.join('constant', 'polyMesh')
+# Points further from the nearest cell centre than this multiple of the largest centre to face centre distance of
+# the cell are outside the mesh (the corners of a cube are sqrt(3) times further away than its face centres)
+OUTSIDE_TOLERANCE = 1.75
+DEFAULT_POINTS = 100
+COMPONENT_NAMES = {3: ['x', 'y', 'z'], 6: ['xx', 'xy', 'xz', 'yy', 'yz', 'zz'],
+                   9: ['xx', 'xy', 'xz', 'yx', 'yy', 'yz', 'zx', 'zy', 'zz']}
+
+
+def parse_vector(text: str) -> np.ndarray:
+    return np.array(text.strip().strip('()').split(), dtype=float)
+
+
+def read_line_sets(sample_dict: str = SAMPLE_DICT) -> tuple[list[dict], list[str]]:
+    """Reads the line sets (name, start, end, nPoints, axis) and the fields of a sampleDict, expanding its variables"""
+    editor = ClassFoamDictEditor(sample_dict)
+    sets_entry = editor.find_entry('sets')
+    if sets_entry is None:
+        raise KeyError(f"No sets defined in {sample_dict}")
+    # The sets are either a list of named dictionaries, e.g. sets ( name {...} ... );, or a dictionary of them
+    text = editor.expand_variables(editor.text[sets_entry.value_start:sets_entry.value_end])
+    if sets_entry.kind != 'dict':
+        text = text.strip()[1:-1]
+    root = FoamDictParser(text).parse()
+
+    lines = list()
+    for entry in root.children:
+        if entry.kind != 'dict':
+            continue
+        values = {child.key: text[child.value_start:child.value_end] for child in entry.children}
+        if 'start' not in values or 'end' not in values:
+            print(f"WARNING: Set {entry.key} is not a line, skipping it")
+            continue
+        if values.get('type', '').strip() != 'lineUniform':
+            print(f"WARNING: Set {entry.key} of type {values.get('type')} is sampled as lineUniform")
+        lines.append({'name': entry.key, 'start': parse_vector(values['start']), 'end': parse_vector(values['end']),
+                      'n_points': int(values.get('nPoints', DEFAULT_POINTS)),
+                      'axis': values.get('axis', 'distance').strip()})
+    fields = editor.get_value('fields') if editor.has_entry('fields') else ''
+    return lines, str(fields).strip('()').split()
+
+
+class LineSampler:
+    """Samples cell-centre fields along the line sets of a sampleDict, replacing 'foamPostProcess -func sampleDict'.
+    The cell nearest to every line point is looked up once in a KD-tree of the cell centres, so sampling a time step
+    only has to index its fields. This corresponds to the 'cell' interpolation scheme of OpenFOAM."""
+
+    def __init__(self, sample_dict: str = SAMPLE_DICT, mesh_dir: str = MESH_DIRECTORY):
+        self.lines, self.fields = read_line_sets(sample_dict)
+        mesh = PolyMesh(mesh_dir)
+        self.n_cells = mesh.n_cells
+        tree = spatial.cKDTree(mesh.cell_centres())
+        radii = mesh.cell_radii()
+        for line in self.lines:
+            points = np.linspace(line['start'], line['end'], line['n_points'])
+            distances, cells = tree.query(points)
+            # Like OpenFOAM, points outside the mesh are left out
+            inside = distances <= OUTSIDE_TOLERANCE * radii[cells]
+            line['points'], line['cells'] = points[inside], cells[inside]
+
+
+    def coordinates(self, line: dict) -> dict[str, np.ndarray]:
+        if line['axis'] in ('x', 'y', 'z'):
+            return {line['axis']: line['points'][:, 'xyz'.index(line['axis'])]}
+        if line['axis'] == 'xyz':
+            return {axis: line['points'][:, i] for i, axis in enumerate('xyz')}
+        return {'distance': np.linalg.norm(line['points'] - line['start'], axis=1)}
+
+
+    def sample(self, time_dir: str, fields: list[str] | None = None) -> dict[str, dict[str, np.ndarray]]:
+        """Samples the fields of a time directory. Returns the columns of every line, named like the columns of
+        the CSV files written by OpenFOAM (e.g. distance, U_x, U_y, U_z, p)"""
+        samples = {line['name']: self.coordinates(line) for line in self.lines}
+        for field in fields or self.fields:
+            try:
+                values = FieldReader(os.path.join(time_dir, field)).internal_field(self.n_cells)
+            except FileNotFoundError:
+                print(f"WARNING: Field {field} not found in {time_dir}")
+                continue
+            for line in self.lines:
+                line_values = np.asarray(values[line['cells']])
+                if line_values.ndim == 1:
+                    samples[line['name']][field] = line_values
+                else:
+                    names = COMPONENT_NAMES.get(line_values.shape[1], range(line_values.shape[1]))
+                    for i, name in enumerate(names):
+                        samples[line['name']][f"{field}_{name}"] = line_values[:, i]
+        return samples
+
+
+    def sample_times(self, time_dirs: list[str], fields: list[str] | None = None, jobs: int | None = None):
+        """Samples several time directories in parallel processes, yielding (time directory, samples) in order.
+        Only a bounded number of time steps are in flight at a time, so the memory does not grow with their number"""
+        jobs = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for time_dir in time_dirs:
+                pending.append((time_dir, executor.submit(self.sample, time_dir, fields)))
+                if len(pending) >= 2 * jobs:
+                    time_dir, future = pending.popleft()
+                    yield time_dir, future.result()
+            while pending:
+                time_dir, future = pending.popleft()
+                yield time_dir, future.result()
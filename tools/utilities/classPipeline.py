@@ -0,0 +1,254 @@
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utilities.instrumentation import run_child
+
+PIPELINE_DIRECTORY = os.path.join('.foco', 'pipeline')
+# Larger inputs (e.g. the mesh) are identified by their size and modification time instead of their content
+HASH_SIZE_LIMIT = 16 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class Stage:
+    """A step of a pipeline: a command with the files it reads (inputs) and writes (outputs) and the stages it
+    depends on. Inputs and outputs are glob patterns relative to the case, directories are included recursively.
+    The words of the command and the log may contain {placeholders}, which are filled in from the context of the
+    pipeline when the stage starts. If the stage fails, the stages listed in 'invalidates' have to run again, e.g.
+    decomposePar after snappyHexMesh has partly overwritten the decomposed mesh"""
+
+    def __init__(self, name: str, command: list[str], inputs: list[str] | None = None,
+                 outputs: list[str] | None = None, after: list[str] | None = None,
+                 invalidates: list[str] | None = None, log: str | None = None):
+        self.name = name
+        self.command = command
+        self.inputs = inputs or list()
+        self.outputs = outputs or list()
+        self.after = after or list()
+        self.invalidates = invalidates or list()
+        self.log = log or f'log.{name}'
+
+
+    def expand(self, context: dict) -> list[str]:
+        """Fills in the placeholders of the command. A word that is a placeholder of a list is replaced by its items"""
+        words = list()
+        for word in self.command:
+            value = context.get(word[1:-1]) if word.startswith('{') and word.endswith('}') else None
+            if isinstance(value, (list, tuple)):
+                words.extend(str(item) for item in value)
+            else:
+                words.append(word.format(**context))
+        return words
+
+
+def matching_files(patterns: list[str]) -> list[str]:
+    """Returns the files matching glob patterns, walking matched directories"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.update(os.path.join(root, name) for name in names)
+            else:
+                files.add(path)
+    return sorted(files)
+
+
+def file_digest(path: str) -> str:
+    stat = os.stat(path)
+    if stat.st_size > HASH_SIZE_LIMIT:
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_process(name: str, command: list[str], log_path: str) -> tuple[int, float, int]:
+    """Runs a command with its output written to a log, recorded as a phase of the profile. Returns the exit status,
+    the wall time (s) and the peak resident set size (KiB) of the largest process of the command"""
+    with open(log_path, 'w') as log:
+        returncode, wall_time, usage = run_child(name, command, stdout=log, stderr=subprocess.STDOUT)
+    if usage is None:
+        with open(log_path, 'a') as log:
+            log.write(f"Command not found: {command[0]}\n")
+    return returncode, wall_time, usage.ru_maxrss if usage is not None else 0
+
+
+def files_digest(patterns: list[str]) -> str:
+    digest = hashlib.sha256()
+    for path in matching_files(patterns):
+        digest.update(f"{path}\0{file_digest(path)}\0".encode())
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Runs the stages of a workflow in the order of their dependencies, independent stages concurrently. A stage is
+    skipped if its signature (the hash of its command, its inputs and the signatures of the stages it depends on) is
+    the one of its last successful run and its outputs exist. A stage that runs also reruns the stages it depends on
+    whose outputs changed since their last run, e.g. blockMesh once reconstructPar has overwritten the mesh. The
+    state, wall time and peak memory of every stage are kept in .foco/pipeline/<workflow>.json"""
+
+    def __init__(self, workflow: str, stages: list[Stage], context: dict | None = None):
+        self.workflow = workflow
+        self.stages = {stage.name: stage for stage in stages}
+        self.context = context or dict()
+        for stage in stages:
+            unknown = [name for name in stage.after + stage.invalidates if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} refers to unknown stage(s): {', '.join(unknown)}")
+        self.state_path = os.path.join(PIPELINE_DIRECTORY, f'{workflow}.json')
+        self.state = self.load_state()
+        self.signatures: dict[str, str] = dict()
+
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return dict()
+
+
+    def save_state(self) -> None:
+        os.makedirs(PIPELINE_DIRECTORY, exist_ok=True)
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(temp_path, self.state_path)
+
+
+    def signature(self, name: str) -> str:
+        """Hashes the command and inputs of a stage with the signatures of the stages it depends on"""
+        if name not in self.signatures:
+            stage = self.stages[name]
+            digest = hashlib.sha256(json.dumps(stage.expand(self.context)).encode())
+            digest.update(files_digest(stage.inputs).encode())
+            for dependency in sorted(stage.after):
+                digest.update(self.signature(dependency).encode())
+            self.signatures[name] = digest.hexdigest()
+        return self.signatures[name]
+
+
+    def is_up_to_date(self, name: str) -> bool:
+        recorded = self.state.get(name, dict())
+        outputs_exist = all(glob.glob(pattern) for pattern in self.stages[name].outputs)
+        return recorded.get('status') == 'done' and recorded.get('signature') == self.signature(name) and outputs_exist
+
+
+    def outputs_changed(self, name: str) -> bool:
+        """Checks if the outputs of a stage differ from those of its last successful run, i.e. a later stage (or the
+        user) has overwritten them"""
+        outputs = self.stages[name].outputs
+        return bool(outputs) and self.state.get(name, dict()).get('outputs') != files_digest(outputs)
+
+
+    def order(self, selected: list[str] | None = None) -> list[str]:
+        """Returns the selected stages (default: all) and the stages they depend on, dependencies first"""
+        ordered, visiting = list(), set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage {name} depends on itself")
+            visiting.add(name)
+            for dependency in self.stages[name].after:
+                visit(dependency)
+            ordered.append(name)
+
+        for name in selected or self.stages:
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}, choose from: {', '.join(self.stages)}")
+            visit(name)
+        return ordered
+
+
+    def status(self, selected: list[str] | None = None) -> list[tuple[str, str, dict]]:
+        """Returns (stage, 'up to date' or 'pending', recorded state) of the stages"""
+        return [(name, 'up to date' if self.is_up_to_date(name) else 'pending', self.state.get(name, dict()))
+                for name in self.order(selected)]
+
+
+    def run_stage(self, name: str) -> tuple[int, float, int]:
+        stage = self.stages[name]
+        command = stage.expand(self.context)
+        print(f"Running {name}: {' '.join(command)}")
+        return run_process(name, command, stage.log.format(**self.context))
+
+
+    def run(self, selected: list[str] | None = None, force: list[str] | None = None, jobs: int = 2) -> bool:
+        """Runs the out of date stages. Stages in force run regardless, and so do the stages depending on them.
+        Returns whether all stages succeeded"""
+        names = self.order(selected)
+        # The inputs are hashed before any stage runs, as a stage may change the inputs of the following ones
+        for name in names:
+            self.signature(name)
+        force = set(force or list())
+        pending = list()
+        for name in names:
+            if name in force or any(dependency in pending for dependency in self.stages[name].after) \
+                    or not self.is_up_to_date(name):
+                pending.append(name)
+        # A stage running on the outputs of a dependency needs them as the dependency wrote them, so dependencies
+        # with changed outputs run again, and so do the stages after them
+        changed = True
+        while changed:
+            changed = False
+            for name in names:
+                if name in pending:
+                    continue
+                needed = any(name in self.stages[other].after for other in pending) and self.outputs_changed(name)
+                if needed or any(dependency in pending for dependency in self.stages[name].after):
+                    pending.append(name)
+                    changed = True
+        pending.sort(key=names.index)
+        for name in names:
+            if name not in pending:
+                print(f"Skipping {name}, it is up to date")
+        done = set(names) - set(pending)
+        failed = list()
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            running = dict()
+            while pending or running:
+                ready = [name for name in pending if all(dependency in done for dependency in self.stages[name].after)]
+                for name in ready if not failed else []:
+                    pending.remove(name)
+                    running[executor.submit(self.run_stage, name)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        returncode, wall_time, peak_rss = future.result()
+                    except OSError as e:
+                        print(f"{name} could not be run: {e}")
+                        returncode, wall_time, peak_rss = 1, 0.0, 0
+                    self.record(name, returncode, wall_time, peak_rss)
+                    if returncode == 0:
+                        done.add(name)
+                        print(f"Finished {name} in {wall_time:.1f} s (peak memory {peak_rss / 1024:.0f} MiB)")
+                    else:
+                        failed.append(name)
+                        print(f"{name} failed with exit status {returncode}, see "
+                              f"{self.stages[name].log.format(**self.context)}")
+        if failed or pending:
+            print(f"Stopped after the failure of {', '.join(failed)}. Not run: {', '.join(pending) or 'none'}")
+        return not failed and not pending
+
+
+    def record(self, name: str, returncode: int, wall_time: float, peak_rss: int) -> None:
+        self.state[name] = {'status': 'done' if returncode == 0 else 'failed', 'signature': self.signature(name),
+                            'returncode': returncode, 'wall_time': round(wall_time, 3), 'peak_rss_kib': peak_rss,
+                            'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if returncode == 0 and self.stages[name].outputs:
+            self.state[name]['outputs'] = files_digest(self.stages[name].outputs)
+        if returncode != 0:
+            for invalidated in self.stages[name].invalidates:
+                self.state.get(invalidated, dict())['status'] = 'invalidated'
+        self.save_state()
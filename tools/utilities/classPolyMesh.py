@@ -0,0 +1,127 @@
+import os
+import re
+import numpy as np
+from utilities.foamLists import parse_ascii_values, read_list, read_list_file, read_list_header, SKIP_PATTERN
+
+FACE_COMPACT_PATTERN = re.compile(rb'class\s+faceCompactList\s*;')
+PATCH_PATTERN = re.compile(r'([^\s{}()]+)\s*\{([^}]*)\}')
+
+
+def read_patches(path) -> dict[str, dict]:
+    """Reads the type, nFaces and startFace (and the neighbProcNo of processor patches) of the patches of a
+    polyMesh/boundary file"""
+    with open(path, encoding='latin-1') as file:
+        text = re.sub(r'FoamFile\s*\{[^}]*\}', '', file.read(), count=1)
+    patches = dict()
+    for name, body in PATCH_PATTERN.findall(text):
+        entries = dict(re.findall(r'(\w+)\s+([^;]+);', body))
+        patches[name] = {'type': entries.get('type', 'patch'), 'nFaces': int(entries.get('nFaces', 0)),
+                         'startFace': int(entries.get('startFace', 0))}
+        if 'neighbProcNo' in entries:
+            patches[name]['neighbProcNo'] = int(entries['neighbProcNo'])
+    return patches
+
+
+class PolyMesh:
+    """Reads the points, faces, owner and neighbour of an OpenFOAM polyMesh (ASCII, binary or compressed) into
+    NumPy arrays and derives the face and cell centres from them"""
+
+    def __init__(self, mesh_dir: str = os.path.join('constant', 'polyMesh')):
+        self.mesh_dir = mesh_dir
+        if not os.path.isdir(mesh_dir):
+            raise FileNotFoundError(f"Mesh directory {mesh_dir} does not exist")
+        self.points = read_list_file(os.path.join(mesh_dir, 'points'))
+        self.face_offsets, self.face_points = self.read_faces(os.path.join(mesh_dir, 'faces'))
+        self.owner = read_list_file(os.path.join(mesh_dir, 'owner'))
+        self.neighbour = read_list_file(os.path.join(mesh_dir, 'neighbour'))
+        self.n_cells = int(self.owner.max()) + 1 if len(self.owner) else 0
+        self._cell_centres = None
+        self._cell_radii = None
+
+
+    @staticmethod
+    def read_faces(path) -> tuple[np.ndarray, np.ndarray]:
+        """Reads the faces in compact form: the point labels of all faces and the offset of every face into them"""
+        data, position, element_sizes = read_list_header(path)
+        if FACE_COMPACT_PATTERN.search(data, 0, position):
+            # faceCompactList: a list of offsets followed by a list of the point labels
+            offsets, _, end = read_list(data, position, 'label', element_sizes)
+            labels, _, _ = read_list(data, SKIP_PATTERN.match(data, end).end(), 'label', element_sizes)
+            return offsets.astype(np.int64), labels.astype(np.int64)
+        # faceList, e.g. 2(4(0 1 2 3) 3(1 2 4)): the numbers are the size of a face followed by its labels
+        start = data.index(b'(', position) + 1
+        end = data.rindex(b')')
+        numbers = parse_ascii_values(data[start:end], np.int64)
+        size = int(numbers[0]) if len(numbers) else 0
+        if size > 0 and len(numbers) % (size + 1) == 0 and np.all(numbers[::size + 1] == size):
+            # All faces have the same number of points (e.g. a hex mesh), so the layout is regular
+            n_faces = len(numbers) // (size + 1)
+            labels = numbers.reshape(n_faces, size + 1)[:, 1:].ravel()
+            return np.arange(n_faces + 1, dtype=np.int64) * size, labels
+        sizes, position = list(), 0
+        while position < len(numbers):
+            sizes.append(int(numbers[position]))
+            position += sizes[-1] + 1
+        sizes = np.array(sizes, dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(sizes + 1)[:-1]))
+        mask = np.ones(len(numbers), dtype=bool)
+        mask[starts] = False
+        return np.concatenate(([0], np.cumsum(sizes))), numbers[mask]
+
+
+    def face_geometry(self, start: int = 0, count: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the face centres and area vectors, computed like OpenFOAM from a fan of triangles. A range of
+        faces (e.g. of a patch) can be selected with the first face and the number of faces"""
+        offsets = self.face_offsets[start:None if count is None else start + count + 1]
+        if len(offsets) < 2:
+            return np.empty((0, 3)), np.empty((0, 3))
+        face_points = self.face_points[offsets[0]:offsets[-1]]
+        offsets = offsets - offsets[0]
+        sizes = np.diff(offsets)
+        starts = offsets[:-1]
+        first = np.repeat(self.points[face_points[starts]], sizes, axis=0)
+        # Every point forms a triangle with the next point of its face (wrapping around) and the first point
+        following = np.arange(1, len(face_points) + 1)
+        following[offsets[1:] - 1] = starts
+        current, next_points = self.points[face_points], self.points[face_points[following]]
+        triangle_areas = 0.5 * np.cross(current - first, next_points - first)
+        triangle_magnitudes = np.linalg.norm(triangle_areas, axis=1)
+        triangle_centres = (first + current + next_points) / 3
+        areas = np.add.reduceat(triangle_areas, starts, axis=0)
+        weights = np.add.reduceat(triangle_magnitudes, starts)
+        centres = np.add.reduceat(triangle_centres * triangle_magnitudes[:, None], starts, axis=0)
+        # Degenerate faces fall back to the average of their points
+        average = np.add.reduceat(current, starts, axis=0) / sizes[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centres = np.where(weights[:, None] > 0, centres / weights[:, None], average)
+        return centres, areas
+
+
+    def cell_centres(self) -> np.ndarray:
+        """Returns the cell centres, computed like OpenFOAM from the pyramids of the faces and an estimated centre"""
+        if self._cell_centres is None:
+            face_centres, face_areas = self.face_geometry()
+            n_internal = len(self.neighbour)
+            cells = np.concatenate((self.owner, self.neighbour))
+            centres = np.concatenate((face_centres, face_centres[:n_internal]))
+            areas = np.concatenate((face_areas, face_areas[:n_internal]))
+            counts = np.bincount(cells, minlength=self.n_cells)
+            estimate = np.stack([np.bincount(cells, centres[:, i], self.n_cells) / counts for i in range(3)], axis=1)
+            volumes = np.abs(np.einsum('ij,ij->i', areas, centres - estimate[cells])) / 3
+            pyramid_centres = 0.75 * centres + 0.25 * estimate[cells]
+            total_volumes = np.bincount(cells, volumes, self.n_cells)
+            self._cell_centres = np.stack([np.bincount(cells, volumes * pyramid_centres[:, i], self.n_cells)
+                                           for i in range(3)], axis=1)
+            valid = total_volumes > 0
+            self._cell_centres[valid] /= total_volumes[valid, None]
+            self._cell_centres[~valid] = estimate[~valid]
+            # The largest distance between a cell centre and its face centres is used as the size of the cell
+            distances = np.linalg.norm(centres - self._cell_centres[cells], axis=1)
+            self._cell_radii = np.zeros(self.n_cells)
+            np.maximum.at(self._cell_radii, cells, distances)
+        return self._cell_centres
+
+
+    def cell_radii(self) -> np.ndarray:
+        self.cell_centres()
+        return self._cell_radii
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+from time import time_ns
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+
+# Time directory names as written by OpenFOAM (fixed, scientific or general time format)
+TIME_PATTERN = re.compile(r'^(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+CASE_LOCATION = '.'
+CACHE_FILE = os.path.join('.foco', 'timeIndex.json')
+CACHE_VERSION = 2
+# Timestamp granularity of coarse file systems (e.g. NFS). A scan taken within this time of the last change of a
+# directory may have missed an entry added in the same tick, which leaves the mtime unchanged
+MTIME_RESOLUTION_NS = 2_000_000_000
+
+# Cache shared by all indexes of one process: {absolute directory: (mtime_ns, scanned_ns, [(time, name), ...])}
+_DIRECTORY_CACHE: dict[str, tuple[int, int, list[tuple[Decimal, str]]]] = dict()
+
+
+def parse_time(name: str) -> Decimal | None:
+    """Parses a time directory name into an exact decimal. Returns None if the name is not a time"""
+    return Decimal(name) if TIME_PATTERN.fullmatch(name) else None
+
+
+class TimeIndex:
+    """Index of the time directories of a case and of its processor* directories. Every directory is scanned
+    once with os.scandir, and rescanned only when its mtime changes (or changed shortly before the scan). The index is also kept in
+    '.foco/timeIndex.json' within the case, so that subsequent foco commands can reuse it."""
+
+    def __init__(self, case_dir: str = '.', use_cache_file: bool = True):
+        self.case_dir = os.path.abspath(case_dir)
+        self.use_cache_file = use_cache_file
+        self.locations: dict[str, list[tuple[Decimal, str]]] = dict()
+        self.time_values: dict[str, list[Decimal]] = dict()  # Sorted times of every location for bisection
+        self.refresh()
+
+
+    # ------------------- Scanning -------------------
+
+    @staticmethod
+    def scan_directory(directory: str) -> list[tuple[Decimal, str]]:
+        times = list()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                time = parse_time(entry.name)
+                if time is not None and entry.is_dir():
+                    times.append((time, entry.name))
+        return sorted(times)
+
+
+    def load_cache_file(self) -> dict:
+        if not self.use_cache_file:
+            return dict()
+        try:
+            with open(os.path.join(self.case_dir, CACHE_FILE)) as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return dict()
+        return cache.get('directories', dict()) if cache.get('version') == CACHE_VERSION else dict()
+
+
+    def save_cache_file(self, directories: dict) -> None:
+        """Writes the cache atomically. Failing to write it (e.g. read-only case) is not an error"""
+        cache_path = os.path.join(self.case_dir, CACHE_FILE)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, 'w') as cache_file:
+                json.dump({'version': CACHE_VERSION, 'directories': directories}, cache_file)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+    @staticmethod
+    def is_verified(mtime_ns: int, entry_mtime_ns, scanned_ns) -> bool:
+        """Checks that a scan is of the current state of a directory, i.e. it was taken after the mtime could tick"""
+        return entry_mtime_ns == mtime_ns and scanned_ns is not None and scanned_ns - mtime_ns >= MTIME_RESOLUTION_NS
+
+
+    def cached_scan(self, location: str, file_cache: dict) -> tuple[list[tuple[Decimal, str]], bool]:
+        """Returns the times of a location, rescanning it only if its mtime changed. Also returns if it was scanned"""
+        directory = os.path.normpath(os.path.join(self.case_dir, location))
+        mtime_ns = os.stat(directory).st_mtime_ns
+        cached = _DIRECTORY_CACHE.get(directory)
+        if cached is not None and self.is_verified(mtime_ns, cached[0], cached[1]):
+            return cached[2], False
+        file_entry = file_cache.get(location)
+        if file_entry is not None and self.is_verified(mtime_ns, file_entry.get('mtime_ns'),
+                                                       file_entry.get('scanned_ns')):
+            times = [(Decimal(name), name) for name in file_entry['names']]
+            _DIRECTORY_CACHE[directory] = (mtime_ns, file_entry['scanned_ns'], times)
+            return times, False
+        scanned_ns = time_ns()
+        times = self.scan_directory(directory)
+        _DIRECTORY_CACHE[directory] = (mtime_ns, scanned_ns, times)
+        return times, True
+
+
+    def refresh(self) -> None:
+        """Updates the index, rescanning only the directories that changed since the last scan"""
+        file_cache = self.load_cache_file()
+        with os.scandir(self.case_dir) as entries:
+            processors = sorted((entry.name for entry in entries
+                                 if entry.name.startswith('processor') and entry.is_dir()), key=self.processor_number)
+        self.locations.clear()
+        self.time_values.clear()
+        changed = set(file_cache) != {CASE_LOCATION, *processors}
+        for location in [CASE_LOCATION, *processors]:
+            self.locations[location], scanned = self.cached_scan(location, file_cache)
+            self.time_values[location] = [time for time, _ in self.locations[location]]
+            changed = changed or scanned
+        if changed and self.use_cache_file:
+            directories = dict()
+            for location, times in self.locations.items():
+                mtime_ns, scanned_ns, _ = _DIRECTORY_CACHE[os.path.normpath(os.path.join(self.case_dir, location))]
+                directories[location] = {'mtime_ns': mtime_ns, 'scanned_ns': scanned_ns,
+                                         'names': [name for _, name in times]}
+            self.save_cache_file(directories)
+
+
+    @staticmethod
+    def processor_number(name: str):
+        number = name[len('processor'):]
+        return (0, int(number), name) if number.isdigit() else (1, 0, name)
+
+
+    # ------------------- Queries -------------------
+
+    @property
+    def processors(self) -> list[str]:
+        return [location for location in self.locations if location != CASE_LOCATION]
+
+
+    def times(self, location: str = CASE_LOCATION, include_zero: bool = True) -> list[Decimal]:
+        return [time for time, _ in self.locations.get(location, []) if include_zero or time != 0]
+
+
+    def names(self, location: str = CASE_LOCATION, include_zero: bool = True) -> list[str]:
+        return [name for time, name in self.locations.get(location, []) if include_zero or time != 0]
+
+
+    def path(self, location: str, name: str) -> str:
+        return os.path.normpath(os.path.join(self.case_dir, location, name))
+
+
+    def latest(self, location: str = CASE_LOCATION, include_zero: bool = True) -> str | None:
+        """Returns the name of the latest time directory of a location"""
+        names = self.locations.get(location, [])
+        if names and (include_zero or names[-1][0] != 0):
+            return names[-1][1]
+        return None
+
+
+    def in_range(self, start=None, end=None, location: str = CASE_LOCATION) -> list[str]:
+        """Returns the names of the time directories with start <= time <= end"""
+        entries = self.locations.get(location, [])
+        times = self.time_values.get(location, [])
+        low = 0 if start is None else bisect_left(times, Decimal(str(start)))
+        high = len(times) if end is None else bisect_right(times, Decimal(str(end)))
+        return [name for _, name in entries[low:high]]
+
+
+    def nearest(self, time, location: str = CASE_LOCATION) -> str | None:
+        """Returns the name of the time directory closest to a time"""
+        entries = self.locations.get(location, [])
+        if not entries:
+            return None
+        time = Decimal(str(time))
+        position = bisect_left(self.time_values[location], time)
+        candidates = entries[max(position - 1, 0):position + 1]
+        return min(candidates, key=lambda entry: abs(entry[0] - time))[1]
+
+
+    def all_time_directories(self, include_zero: bool = True) -> dict[Decimal, list[str]]:
+        """Returns the paths of the time directories of the case and all processors, grouped by time"""
+        grouped: dict[Decimal, list[str]] = dict()
+        for location, entries in self.locations.items():
+            for time, name in entries:
+                if include_zero or time != 0:
+                    grouped.setdefault(time, []).append(self.path(location, name))
+        return dict(sorted(grouped.items()))
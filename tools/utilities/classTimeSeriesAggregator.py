@@ -0,0 +1,89 @@
+import csv
+import math
+import os
+
+# The running average is converged once its relative change stays below the tolerance for this many time steps
+CONVERGENCE_TOLERANCE = 1e-3
+CONVERGENCE_STEPS = 5
+TIME_SERIES_FILE = 'timeSeries.csv'
+SUMMARY_FILE = 'timeSeriesSummary.csv'
+
+
+class RunningStatistics:
+    """Running mean and variance of a series of values (Welford's algorithm), which needs O(1) memory"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.previous_mean = None
+        self.steady_steps = 0
+        self.converged_at = None
+
+    def update(self, value: float, time=None) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        # Convergence of the running mean: small relative changes over several consecutive time steps
+        if self.previous_mean is not None:
+            change = abs(self.mean - self.previous_mean) / max(abs(self.mean), 1e-30)
+            self.steady_steps = self.steady_steps + 1 if change < CONVERGENCE_TOLERANCE else 0
+            if self.steady_steps >= CONVERGENCE_STEPS and self.converged_at is None:
+                self.converged_at = time
+            elif self.steady_steps == 0:
+                self.converged_at = None
+        self.previous_mean = self.mean
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def cov(self) -> float:
+        return self.std / self.mean if self.mean != 0 else math.nan
+
+
+class TimeSeriesAggregator:
+    """Folds the statistics of one time step after another into running statistics per location and field.
+    Every time step is appended to a CSV table straight away, so the memory does not grow with the number of
+    time steps (only with the number of locations and fields)."""
+
+    def __init__(self, directory: str, fields: set):
+        self.directory = directory
+        self.fields = fields
+        self.statistics: dict[tuple[str, str], RunningStatistics] = dict()
+        os.makedirs(directory, exist_ok=True)
+        self.table_path = os.path.join(directory, TIME_SERIES_FILE)
+        self.table = open(self.table_path, 'w', newline='')
+        self.writer = csv.writer(self.table)
+        self.writer.writerow(['time', 'location', 'field', 'value', 'running_avg', 'running_std', 'running_cov'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, time, values: dict[str, dict[str, float]]) -> None:
+        """Adds the values of one time step, given as {location: {field: value}}"""
+        for location, location_values in values.items():
+            for field in self.fields:
+                value = location_values.get(field)
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                statistics = self.statistics.setdefault((location, field), RunningStatistics())
+                statistics.update(float(value), time)
+                self.writer.writerow([time, location, field, value, statistics.mean, statistics.std, statistics.cov])
+        self.table.flush()
+
+    def close(self) -> None:
+        if self.table.closed:
+            return
+        self.table.close()
+        with open(os.path.join(self.directory, SUMMARY_FILE), 'w', newline='') as summary:
+            writer = csv.writer(summary)
+            writer.writerow(['location', 'field', 'count', 'avg', 'std', 'cov', 'converged_at'])
+            for (location, field), statistics in self.statistics.items():
+                writer.writerow([location, field, statistics.count, statistics.mean, statistics.std, statistics.cov,
+                                 '' if statistics.converged_at is None else statistics.converged_at])
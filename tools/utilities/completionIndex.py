@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""Generates the index read by completion/foco-completion.bash: the commands, their flags and the kind of value
+every flag and positional argument takes. The argparse definitions of the tools (and of the utilities they import)
+are read statically with the ast module, so no tool has to be imported."""
+
+import argparse
+import ast
+import os
+import re
+import shlex
+import sys
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILITIES_PACKAGE = 'utilities'
+# Tools reading their arguments from sys.argv: the hints of their positional arguments (a trailing '...' repeats)
+ARGV_HINTS = {
+    'findMinMaxCoords': ['stl...'],
+    'stl_inverter': ['stl'],
+    'stl_copier': ['-', '-', '-', '-', '-', '-', 'stl...'],
+}
+# Executables which only pass their arguments on to a Python script of the utilities, e.g. tools/profile
+WRAPPED_SCRIPT_PATTERN = re.compile(r'exec python3 .*/utilities/(\w+\.py)')
+# Words in the names of arguments that determine the kind of value they take
+NAME_HINTS = [('time', 'time'), ('field', 'field'), ('patch', 'patch'), ('boundar', 'patch'), ('stl', 'stl'),
+              ('file', 'file'), ('dir', 'directory')]
+
+
+def literal(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def value_hint(names: list[str], keywords: dict) -> str:
+    """Returns the kind of value an argument takes: '' for none, a completion type, 'words:<choices>' or '-'"""
+    action = literal(keywords['action']) if 'action' in keywords else None
+    if action in ('store_true', 'store_false', 'store_const', 'count', 'help', 'version'):
+        return ''
+    choices = literal(keywords['choices']) if 'choices' in keywords else None
+    if choices:
+        return 'words:' + ','.join(str(choice) for choice in choices)
+    label = ' '.join([*names, str(literal(keywords.get('dest')) or ''), str(literal(keywords.get('metavar')) or '')])
+    hint = next((hint for word, hint in NAME_HINTS if word in label.lower()), '-')
+    nargs = literal(keywords['nargs']) if 'nargs' in keywords else None
+    return f"{hint}..." if nargs in ('*', '+') or isinstance(nargs, int) and nargs > 1 else hint
+
+
+def parse_arguments(path: str) -> tuple[dict[str, str], list[str]]:
+    """Collects the add_argument() calls of a module. Returns the hints of the flags and of the positionals"""
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read(), path)
+    flags, positionals = dict(), list()
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'add_argument'):
+            continue
+        names = [name for name in map(literal, node.args) if isinstance(name, str)]
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+        if not names:
+            continue
+        hint = value_hint(names, keywords)
+        if names[0].startswith('-'):
+            flags.update({name: hint for name in names})
+        else:
+            positionals.append(hint)
+    if flags or positionals:
+        flags.update({'-h': '', '--help': ''})
+    return flags, positionals
+
+
+def imported_utilities(path: str) -> list[str]:
+    """Returns the paths of the utilities modules a tool imports"""
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read(), path)
+    modules = [node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom) and node.module]
+    paths = [os.path.join(TOOL_DIR, *module.split('.')) + '.py' for module in modules
+             if module.startswith(f'{UTILITIES_PACKAGE}.')]
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def wrapped_script(path: str) -> str | None:
+    """Returns the Python script of the utilities an executable passes its arguments on to, if it does"""
+    try:
+        with open(path, encoding='utf-8') as file:
+            match = WRAPPED_SCRIPT_PATTERN.search(file.read())
+    except UnicodeDecodeError:
+        return None
+    return os.path.join(TOOL_DIR, UTILITIES_PACKAGE, match.group(1)) if match else None
+
+
+def build_index(tool_dir: str = TOOL_DIR) -> dict[str, tuple[dict[str, str], list[str]]]:
+    """Returns {command: (flag hints, positional hints)} of every tool"""
+    index = dict()
+    for name in sorted(os.listdir(tool_dir)):
+        path = os.path.join(tool_dir, name)
+        if name.startswith('.') or not os.path.isfile(path):
+            continue
+        command, extension = os.path.splitext(name)
+        flags, positionals = dict(), list()
+        if extension == '.py' or (extension == '' and (path := wrapped_script(path))):
+            try:
+                flags, positionals = parse_arguments(path)
+                for module_path in imported_utilities(path):
+                    module_flags, _ = parse_arguments(module_path)
+                    flags.update(module_flags)
+            except (SyntaxError, UnicodeDecodeError) as e:
+                print(f"WARNING: Could not parse {path}: {e}", file=sys.stderr)
+        index[command] = (flags, ARGV_HINTS.get(command, positionals))
+    return index
+
+
+def write_index(index: dict, path: str) -> None:
+    """Writes the index as bash code defining FOCO_COMMANDS, FOCO_FLAGS, FOCO_FLAG_HINTS and FOCO_POSITIONALS"""
+    lines = ["# Generated by tools/utilities/completionIndex.py, do not edit",
+             f"FOCO_COMMANDS={shlex.quote(' '.join(index))}",
+             "declare -gA FOCO_FLAGS=() FOCO_FLAG_HINTS=() FOCO_POSITIONALS=()"]
+    for command, (flags, positionals) in index.items():
+        if flags:
+            lines.append(f"FOCO_FLAGS[{command}]={shlex.quote(' '.join(flags))}")
+        for flag, hint in flags.items():
+            if hint:
+                lines.append(f"FOCO_FLAG_HINTS[{shlex.quote(f'{command} {flag}')}]={shlex.quote(hint)}")
+        if positionals:
+            lines.append(f"FOCO_POSITIONALS[{command}]={shlex.quote(' '.join(positionals))}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Written to a temporary file first, so that a completion running meanwhile never sources a partial index
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as file:
+        file.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('index_file', help='Path of the generated index')
+    args = parser.parse_args()
+    write_index(build_index(), args.index_file)
+
+
+if __name__ == "__main__":
+    main()
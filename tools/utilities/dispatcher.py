@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""Runs the foco tools inside one Python interpreter.
+
+    foco <command> [args]                 runs a single tool
+    foco --batch "<command> [args]" ...   runs several tools one after another (read from stdin if none are given)
+    foco --benchmark-imports              measures the import time of every tool
+    foco --phase <name> <command> [args]  runs an external command, recorded as a phase of the calling foco command
+
+Python tools are executed in-process like 'python3 <tool>.py', so a batch only pays the interpreter startup and the
+imports of the shared utilities and libraries once. Executables (bash scripts) are run as subprocesses. Every command
+is recorded in the profile of the case (see instrumentation.py)."""
+
+import argparse
+import os
+import runpy
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Executed in a fresh interpreter to time the import of a tool (its module code without the '__main__' block)
+BENCHMARK_CODE = ("import runpy, sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); "
+                  "runpy.run_path(sys.argv[2], run_name='foco_benchmark'); print(time.perf_counter() - start)")
+
+# Allow the tools to import the utilities, as if they were run from the tools directory
+if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+    sys.path[0] = TOOL_DIR
+elif TOOL_DIR not in sys.path:
+    sys.path.insert(0, TOOL_DIR)
+
+from utilities.instrumentation import phase, run_child
+
+
+def list_commands() -> list[str]:
+    """Lists the tools, without the '.py' extension of the Python tools"""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(TOOL_DIR)
+                  if os.path.isfile(os.path.join(TOOL_DIR, name)) and not name.startswith('.'))
+
+
+def tool_path(command: str) -> str | None:
+    for name in (f"{command}.py", command):
+        path = os.path.join(TOOL_DIR, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def exit_code(code) -> int:
+    """Converts the argument of sys.exit() into the exit status of the process"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_command(command: str, args: list[str]) -> int:
+    """Runs a tool with its arguments and returns its exit status"""
+    path = tool_path(command)
+    if path is None:
+        print(f"Unknown command: {command}")
+        return 1
+    if not path.endswith('.py'):
+        return run_child(command, [path, *args])[0]
+
+    saved_argv, cwd = sys.argv, os.getcwd()
+    sys.argv = [path, *args]
+    try:
+        with phase(command, args=args):
+            runpy.run_path(path, run_name='__main__')
+        return 0
+    except SystemExit as e:
+        return exit_code(e.code)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        sys.argv = saved_argv
+        # Tools may change the directory, which would break the following commands of a batch
+        os.chdir(cwd)
+        sys.stdout.flush()
+
+
+def run_batch(command_lines: list[str], keep_going: bool = False) -> int:
+    """Runs command lines such as 'deleteTimeSteps -keep 2' one after another. Stops at the first failing command
+    unless keep_going is set. Returns the exit status of the failed (or last) command"""
+    status = 0
+    for line in command_lines:
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        print(f"foco {shlex.join(words)}")
+        result = run_command(words[0], words[1:])
+        if result != 0:
+            print(f"foco {words[0]} failed with exit status {result}")
+            status = result
+            if not keep_going:
+                break
+    return status
+
+
+def benchmark_imports(commands: list[str] | None = None) -> None:
+    """Measures the import time of the Python tools, each in a fresh interpreter and an empty directory"""
+    commands = commands or [command for command in list_commands() if (tool_path(command) or '').endswith('.py')]
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    startup = time.perf_counter() - start
+    results = list()
+    with tempfile.TemporaryDirectory() as directory:
+        for command in commands:
+            path = tool_path(command)
+            if path is None or not path.endswith('.py'):
+                print(f"{command} is not a Python tool, skipping it")
+                continue
+            process = subprocess.run([sys.executable, '-c', BENCHMARK_CODE, TOOL_DIR, path], cwd=directory,
+                                     capture_output=True, text=True)
+            duration = float(process.stdout.split()[-1]) if process.returncode == 0 and process.stdout.split() else None
+            results.append((command, duration))
+    print(f"Interpreter startup: {startup:.3f} s")
+    for command, duration in sorted(results, key=lambda result: -1 if result[1] is None else result[1], reverse=True):
+        print(f"{command:<30} {'failed' if duration is None else f'{duration:.3f} s'}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--phase':
+        if len(sys.argv) < 4:
+            print("Usage: foco --phase <name> <command> [args]")
+            sys.exit(1)
+        sys.exit(run_child(sys.argv[2], sys.argv[3:])[0])
+    if len(sys.argv) > 1 and sys.argv[1] in ('--batch', '--benchmark-imports'):
+        parser = argparse.ArgumentParser(prog='foco', description=__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+        parser.add_argument('--batch', nargs='*', metavar='COMMAND',
+                            help='Command lines to run in one interpreter ("-" or none: read them from stdin)')
+        parser.add_argument('--keep-going', action='store_true', help='Continue a batch after a failing command')
+        parser.add_argument('--benchmark-imports', nargs='*', metavar='COMMAND',
+                            help='Measure the import time of the given (default: all) Python tools')
+        args = parser.parse_args()
+        if args.benchmark_imports is not None:
+            benchmark_imports(args.benchmark_imports)
+            return
+        command_lines = args.batch if args.batch and args.batch != ['-'] else sys.stdin.read().splitlines()
+        sys.exit(run_batch(command_lines, args.keep_going))
+
+    if len(sys.argv) < 2:
+        print("Usage: foco <command> [args]")
+        print("       foco --batch \"<command> [args]\" ...")
+        print("       foco --benchmark-imports [command ...]")
+        print("       foco --phase <name> <command> [args]")
+        print("Available commands:")
+        print("\n".join(list_commands()))
+        sys.exit(1)
+    sys.exit(run_command(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
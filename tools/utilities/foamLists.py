@@ -0,0 +1,180 @@
+import gzip
+import os
+import re
+import numpy as np
+from pathlib import Path
+from utilities.classFoamDictEditor import BINARY_COMPONENTS, binary_element_sizes
+
+# Number of elements formatted and written at a time, which bounds the memory of the text of ASCII lists
+WRITE_CHUNK_SIZE = 1024 * 1024
+# OpenFOAM writes short lists of primitives on a single line
+SHORT_LIST_LENGTH = 10
+DEFAULT_PRECISION = 6
+
+COMPONENTS = dict(BINARY_COMPONENTS, label=1)
+FOAM_FILE_PATTERN = re.compile(rb'FoamFile\s*\{[^}]*\}')
+LIST_CLASS_PATTERN = re.compile(rb'class\s+(label|scalar|vector|symmTensor|tensor)(?:List|Field)\s*;')
+SKIP_PATTERN = re.compile(rb'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+LIST_START_PATTERN = re.compile(rb'\s*(?:List<(\w+)>\s*)?(\d+)\s*([({])')
+UNIFORM_PATTERN = re.compile(rb'\s*uniform\s+([^;]*)')
+NONUNIFORM_PATTERN = re.compile(rb'\s*nonuniform\s+')
+EMPTY_LIST_PATTERN = re.compile(rb'\s*\)')
+COMPOUND_LIST_END_PATTERN = re.compile(rb'\)\s*\)')
+PARENTHESES = bytes.maketrans(b'()', b'  ')
+
+
+def element_dtype(element_type: str, element_sizes: dict | None = None) -> np.dtype:
+    """Returns the dtype of the components of a list element. Binary data is stored in native (little endian) order"""
+    sizes = element_sizes or {'label': 8, 'scalar': 8}
+    if element_type == 'bool':
+        return np.dtype('u1')
+    if element_type == 'label':
+        return np.dtype(f"<i{sizes['label']}")
+    return np.dtype(f"<f{sizes['scalar']}")
+
+
+def shape_values(values: np.ndarray, element_type: str) -> np.ndarray:
+    """Reshapes a flat array of components into one row per element (scalars and labels stay one-dimensional)"""
+    components = COMPONENTS.get(element_type, 1)
+    return values if components == 1 else values.reshape(-1, components)
+
+
+def parse_ascii_values(text: bytes, dtype) -> np.ndarray:
+    """Parses whitespace separated numbers, ignoring the parentheses of compound elements such as vectors"""
+    return np.fromstring(text.translate(PARENTHESES).decode('latin-1'), dtype=dtype, sep=' ')
+
+
+def read_list(data, position: int, element_type: str | None = None,
+              element_sizes: dict | None = None) -> tuple[np.ndarray, str, int]:
+    """Reads a list such as 'List<vector> 3((0 0 0) (1 0 0) (2 0 0))' (ASCII), '3{1.5}' (uniform) or 'N(...)' (binary)
+    starting at a position. Returns the values, the element type and the position after the list"""
+    match = LIST_START_PATTERN.match(data, position)
+    if match is None:
+        raise ValueError(f"No list found at position {position}")
+    element_type = match.group(1).decode() if match.group(1) else element_type or 'scalar'
+    count, start = int(match.group(2)), match.end()
+    dtype = element_dtype(element_type, element_sizes)
+    binary = element_sizes is not None and element_type in element_sizes
+    if match.group(3) == b'{':
+        end = start + element_sizes[element_type] if binary else data.find(b'}', start)
+        value = (np.frombuffer(data, dtype=dtype, count=COMPONENTS.get(element_type, 1), offset=start) if binary
+                 else parse_ascii_values(data[start:end], dtype))
+        return shape_values(np.tile(value, count), element_type), element_type, end + 1
+    if binary:
+        end = start + count * element_sizes[element_type]
+        values = np.frombuffer(data, dtype=dtype, count=count * COMPONENTS.get(element_type, 1), offset=start)
+        return shape_values(values, element_type), element_type, end + 1
+    if count == 0 or EMPTY_LIST_PATTERN.match(data, start):
+        return shape_values(np.empty(0, dtype=dtype), element_type), element_type, data.find(b')', start) + 1
+    if COMPONENTS.get(element_type, 1) == 1:
+        end = data.find(b')', start)
+        end_of_list = end + 1
+    else:
+        # Every element is enclosed in parentheses, so the list ends with the first '))'
+        list_end = COMPOUND_LIST_END_PATTERN.search(data, start)
+        end, end_of_list = list_end.start() + 1, list_end.end()
+    values = parse_ascii_values(data[start:end], dtype)
+    if values.size != count * COMPONENTS.get(element_type, 1):
+        raise ValueError(f"Expected {count} elements of type {element_type}, found {values.size} components")
+    return shape_values(values, element_type), element_type, end_of_list
+
+
+def read_field_value(data, position: int = 0, element_type: str | None = None,
+                     element_sizes: dict | None = None) -> tuple[np.ndarray, str | None, bool]:
+    """Reads a field value ('uniform 0', 'uniform (1 0 0)' or 'nonuniform List<scalar> ...').
+    Returns the values, the element type (None if it is unknown for a uniform value) and if it is uniform"""
+    uniform = UNIFORM_PATTERN.match(data, position)
+    if uniform is not None:
+        value = parse_ascii_values(bytes(uniform.group(1)), element_dtype('scalar'))
+        return value, element_type, True
+    nonuniform = NONUNIFORM_PATTERN.match(data, position)
+    if nonuniform is None:
+        raise ValueError("Field value is neither uniform nor nonuniform")
+    values, element_type, _ = read_list(data, nonuniform.end(), element_type, element_sizes)
+    return values, element_type, False
+
+
+def read_file_bytes(path) -> bytes:
+    """Reads a file, or its gzip compressed version (path.gz) if only that exists"""
+    path = Path(path)
+    if not path.is_file() and path.with_name(f"{path.name}.gz").is_file():
+        path = path.with_name(f"{path.name}.gz")
+    return gzip.decompress(path.read_bytes()) if path.suffix == '.gz' else path.read_bytes()
+
+
+def read_list_header(path) -> tuple[bytes, int, dict | None]:
+    """Reads a list file and returns its data, the position of the first list and the binary element sizes"""
+    data = read_file_bytes(path)
+    header = FOAM_FILE_PATTERN.search(data)
+    if header is None:
+        raise ValueError(f"No FoamFile header found in {path}")
+    element_sizes = binary_element_sizes(data[:header.end()].decode('latin-1'))
+    return data, SKIP_PATTERN.match(data, header.end()).end(), element_sizes
+
+
+def read_list_file(path) -> np.ndarray:
+    """Reads a file holding a single list after its header, e.g. polyMesh/owner or cellProcAddressing"""
+    data, position, element_sizes = read_list_header(path)
+    element_type = LIST_CLASS_PATTERN.search(data, 0, position)
+    element_type = element_type.group(1).decode() if element_type else 'label'
+    values, _, _ = read_list(data, position, element_type, element_sizes)
+    return values
+
+
+def list_length(path) -> int:
+    """Returns the number of elements of a list file without parsing its elements"""
+    with open(path, 'rb') as file:
+        window = file.read(64 * 1024)
+    header = FOAM_FILE_PATTERN.search(window)
+    match = LIST_START_PATTERN.match(window, SKIP_PATTERN.match(window, header.end()).end()) if header else None
+    if match is None:
+        raise ValueError(f"No list found in {path}")
+    return int(match.group(2))
+
+
+def write_precision() -> int:
+    """Reads writePrecision from system/controlDict, so that ASCII output matches the case settings"""
+    try:
+        with open(os.path.join("system", "controlDict")) as file:
+            match = re.search(r'^\s*writePrecision\s+(\d+)\s*;', file.read(), re.MULTILINE)
+    except OSError:
+        return DEFAULT_PRECISION
+    return int(match.group(1)) if match else DEFAULT_PRECISION
+
+
+def format_row(element_type: str, precision: int) -> str:
+    number = f"%.{precision}g" if element_type != 'label' else "%d"
+    components = COMPONENTS.get(element_type, 1)
+    return number if components == 1 else f"({' '.join([number] * components)})"
+
+
+def list_chunks(values: np.ndarray, element_type: str, element_sizes: dict | None = None, precision: int = 6):
+    """Yields the bytes of a list in OpenFOAM format, formatting a bounded number of elements at a time"""
+    count = len(values)
+    if element_sizes:
+        # The layout of OpenFOAM: the count and the raw bytes on lines of their own
+        yield f"\n{count}\n(".encode()
+        dtype = element_dtype(element_type, element_sizes)
+        for start in range(0, count, WRITE_CHUNK_SIZE):
+            yield np.ascontiguousarray(values[start:start + WRITE_CHUNK_SIZE], dtype=dtype).tobytes()
+        yield b")\n"
+        return
+    row = format_row(element_type, precision)
+    if count == 0:
+        yield b"0()"
+    elif count <= SHORT_LIST_LENGTH and COMPONENTS.get(element_type, 1) == 1:
+        yield f"{count}({' '.join(row % value for value in values)})".encode()
+    else:
+        yield f"\n{count}\n(\n".encode()
+        for start in range(0, count, WRITE_CHUNK_SIZE):
+            chunk = values[start:start + WRITE_CHUNK_SIZE]
+            rows = [row % tuple(value) for value in chunk] if chunk.ndim > 1 else [row % value for value in chunk]
+            yield ("\n".join(rows) + "\n").encode()
+        yield b")\n"
+
+
+def format_field_value(values: np.ndarray, element_type: str, element_sizes: dict | None = None,
+                       precision: int = 6) -> bytes:
+    """Formats a (small) nonuniform field value, e.g. of a boundary patch. The terminating ';' is not included"""
+    return b"".join([f"nonuniform List<{element_type}> ".encode(),
+                     *list_chunks(values, element_type, element_sizes, precision)]).rstrip(b"\n")
@@ -0,0 +1,148 @@
+"""Records the wall time, CPU time, peak memory and I/O of the foco commands and of their phases into the append-only
+file .foco/profile.jsonl of the case, which 'foco profile' aggregates. Phases nest: the name of a phase is the path of
+the phases it runs in, e.g. 'analyseLineProbes/load_csv_files_into_pandas'. The path and the id of the run are passed
+on to subprocesses in the environment, so foco commands started by a shell runner are recorded as its phases.
+Set FOCO_PROFILE=0 to disable the recording."""
+
+import functools
+import json
+import os
+import resource
+import subprocess
+import time
+from contextlib import contextmanager
+
+PROFILE_FILE = os.path.join('.foco', 'profile.jsonl')
+ENABLED_VARIABLE = 'FOCO_PROFILE'
+RUN_VARIABLE = 'FOCO_PROFILE_RUN'
+PHASE_VARIABLE = 'FOCO_PROFILE_PHASE'
+PROC_IO_FILE = '/proc/self/io'
+BLOCK_SIZE = 512
+
+
+def enabled() -> bool:
+    return os.environ.get(ENABLED_VARIABLE, '1') != '0'
+
+
+def run_id() -> str:
+    """Returns the id shared by all records of a top level foco command and the commands it starts"""
+    if RUN_VARIABLE not in os.environ:
+        os.environ[RUN_VARIABLE] = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    return os.environ[RUN_VARIABLE]
+
+
+def phase_path(name: str | None = None) -> str:
+    """Returns the path of a phase within the current one, which is kept in the environment"""
+    return '/'.join(part for part in (os.environ.get(PHASE_VARIABLE, ''), name or '') if part)
+
+
+def process_counters() -> dict:
+    """CPU time, peak RSS and bytes read and written by this process and its waited for children"""
+    times = os.times()
+    counters = {'cpu_time': times.user + times.system + times.children_user + times.children_system,
+                'peak_rss_kib': max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)}
+    try:
+        # Bytes passed to read and write calls (including the page cache), of the children once they are waited for
+        with open(PROC_IO_FILE) as file:
+            io = dict(line.split(':') for line in file.read().splitlines())
+        counters.update(read_bytes=int(io['rchar']), write_bytes=int(io['wchar']))
+    except (OSError, KeyError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        counters.update(read_bytes=usage.ru_inblock * BLOCK_SIZE, write_bytes=usage.ru_oublock * BLOCK_SIZE)
+    return counters
+
+
+def write_record(record: dict, profile_file: str) -> None:
+    """Appends a record as one line. A single write in append mode keeps the lines of concurrent commands intact"""
+    try:
+        os.makedirs(os.path.dirname(profile_file), exist_ok=True)
+        with open(profile_file, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+    except OSError:
+        pass
+
+
+def case_profile_file() -> str | None:
+    """Returns the profile file of the case in the working directory, or None outside of a case"""
+    return os.path.abspath(PROFILE_FILE) if os.path.isdir('system') else None
+
+
+def make_record(path: str, start: float, wall_time: float, status: str, **values) -> dict:
+    return {'run': run_id(), 'command': path.split('/')[0], 'phase': path,
+            'start': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start)),
+            'end': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start + wall_time)),
+            'wall_time': round(wall_time, 6), 'status': status, 'pid': os.getpid(), **values}
+
+
+@contextmanager
+def phase(name: str, **details):
+    """Records the code run within the context as a phase. The peak RSS is the one of the process at the end of the
+    phase, which is the peak of the phase unless an earlier phase used more memory. Phases are meant to be opened by
+    the main thread"""
+    profile_file = case_profile_file() if enabled() else None
+    if profile_file is None:
+        yield
+        return
+    path = phase_path(name)
+    before = process_counters()
+    start, start_counter = time.time(), time.perf_counter()
+    saved_phase = os.environ.get(PHASE_VARIABLE)
+    os.environ[PHASE_VARIABLE] = path
+    status = 'ok'
+    try:
+        yield
+    except SystemExit as e:
+        status = 'ok' if e.code in (None, 0) else 'failed'
+        raise
+    except BaseException:
+        status = 'failed'
+        raise
+    finally:
+        if saved_phase is None:
+            os.environ.pop(PHASE_VARIABLE, None)
+        else:
+            os.environ[PHASE_VARIABLE] = saved_phase
+        after = process_counters()
+        write_record(make_record(path, start, time.perf_counter() - start_counter, status,
+                                 cpu_time=round(after['cpu_time'] - before['cpu_time'], 6),
+                                 peak_rss_kib=after['peak_rss_kib'],
+                                 read_bytes=after['read_bytes'] - before['read_bytes'],
+                                 write_bytes=after['write_bytes'] - before['write_bytes'], **details),
+                     profile_file)
+
+
+def instrumented(function):
+    """Records every call of a function as a phase named after it"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with phase(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def run_child(name: str, command: list[str], **popen_kwargs) -> tuple[int, float, resource.struct_rusage | None]:
+    """Runs a command as a phase. Returns its exit status, wall time and resource usage, which wait4 reports for this
+    child alone (its peak RSS is that of its largest process). Safe to call from several threads"""
+    path = phase_path(name)
+    env = dict(popen_kwargs.pop('env', None) or os.environ, **{RUN_VARIABLE: run_id(), PHASE_VARIABLE: path})
+    profile_file = case_profile_file() if enabled() else None
+    start, start_counter = time.time(), time.perf_counter()
+    try:
+        process = subprocess.Popen(command, env=env, **popen_kwargs)
+    except OSError:
+        return 127, time.perf_counter() - start_counter, None
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except KeyboardInterrupt:
+        process.wait()
+        raise
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall_time = time.perf_counter() - start_counter
+    if profile_file is not None:
+        write_record(make_record(path, start, wall_time, 'ok' if process.returncode == 0 else 'failed',
+                                 cpu_time=round(usage.ru_utime + usage.ru_stime, 6), peak_rss_kib=usage.ru_maxrss,
+                                 read_bytes=usage.ru_inblock * BLOCK_SIZE, write_bytes=usage.ru_oublock * BLOCK_SIZE,
+                                 returncode=process.returncode),
+                     profile_file)
+    return process.returncode, wall_time, usage
@@ -0,0 +1,24 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """Stands in for a module that is only imported on the first access of one of its attributes"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}'{' (loaded)' if self._module is not None else ''}>"
+
+
+def lazy_import(name: str):
+    """Returns a module that is imported on first use. Heavy libraries such as pandas or matplotlib are thereby not
+    loaded for '--help' or for code paths that do not use them"""
+    return sys.modules.get(name) or LazyModule(name)
@@ -21,6 +21,10 @@ def detect_and_parse_arguments(sys):
     parser.add_argument("-turb_dissipation_rate", type=float, help="Turbulence dissipation rate")
     parser.add_argument("-specific_dissipation", type=float, help="Specific dissipation rate")
     parser.add_argument("-turb_viscosity", type=float, help="Turbulent viscosity")
+    parser.add_argument("-fluid", choices=["air", "water"],
+                        help="Fluid, sets the kinematic viscosity from the fluid property tables")
+    parser.add_argument("-temperature", type=float, help="Fluid temperature (C), used with -fluid (default: 20)")
+    parser.add_argument("-pressure", type=float, help="Fluid pressure (Pa), used with -fluid (default: 101325)")
 
     # Use parse_known_args() to ignore any extra arguments
     args, unknown_args = parser.parse_known_args()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""Aggregates the profile of the case (.foco/profile.jsonl, written by every foco command) per command and phase:
+the number of calls, wall and CPU time, peak memory and the bytes read and written. Run as 'foco profile'."""
+
+import argparse
+import json
+import os
+import sys
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow the import of the utilities when run as a script, like the dispatcher
+if TOOL_DIR not in sys.path:
+    sys.path.insert(0, TOOL_DIR)
+
+from utilities.instrumentation import PROFILE_FILE
+
+SORT_KEYS = {'wall': 'wall_time', 'cpu': 'cpu_time', 'memory': 'peak_rss_kib', 'read': 'read_bytes',
+             'write': 'write_bytes', 'calls': 'calls'}
+
+
+def read_records(path: str = PROFILE_FILE) -> list[dict]:
+    """Reads the records, skipping a line that is incomplete (e.g. of a command that is still writing)"""
+    records = list()
+    with open(path) as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def select_runs(records: list[dict], runs: list[str] | None = None, last: int | None = None) -> list[dict]:
+    """Selects the records of runs by id, or of the last runs"""
+    order = list(dict.fromkeys(record['run'] for record in records))
+    selected = set(order[-last:]) if last else set(order)
+    if runs:
+        selected &= set(runs)
+    return [record for record in records if record['run'] in selected]
+
+
+def aggregate(records: list[dict]) -> dict[str, dict]:
+    """Sums the records of every phase. The share is the part of the wall time of the command spent in the phase"""
+    phases = dict()
+    for record in records:
+        phase = phases.setdefault(record['phase'], {'calls': 0, 'failed': 0, 'wall_time': 0.0, 'max_wall_time': 0.0,
+                                                    'cpu_time': 0.0, 'peak_rss_kib': 0, 'read_bytes': 0,
+                                                    'write_bytes': 0})
+        phase['calls'] += 1
+        phase['failed'] += record.get('status') != 'ok'
+        phase['wall_time'] += record['wall_time']
+        phase['max_wall_time'] = max(phase['max_wall_time'], record['wall_time'])
+        phase['cpu_time'] += record.get('cpu_time', 0.0)
+        phase['peak_rss_kib'] = max(phase['peak_rss_kib'], record.get('peak_rss_kib', 0))
+        phase['read_bytes'] += record.get('read_bytes', 0)
+        phase['write_bytes'] += record.get('write_bytes', 0)
+    for name, phase in phases.items():
+        command = phases.get(name.split('/')[0])
+        phase['share'] = phase['wall_time'] / command['wall_time'] if command and command['wall_time'] else None
+    return phases
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def print_phases(phases: dict[str, dict], sort: str = 'wall', tree: bool = True) -> None:
+    """Prints a row for every phase, grouped under their commands (tree) or sorted over all phases"""
+    key = SORT_KEYS[sort]
+    if tree:
+        # Every phase follows its parent, siblings sorted by the key
+        def sort_path(name):
+            parts = name.split('/')
+            return [(-phases.get('/'.join(parts[:depth + 1]), {}).get(key, 0), part)
+                    for depth, part in enumerate(parts)]
+        names = sorted(phases, key=sort_path)
+    else:
+        names = sorted(phases, key=lambda name: -phases[name][key])
+    width = max([5, *(len(name.split('/')[-1]) + 2 * name.count('/') if tree else len(name) for name in names)])
+    print(f"{'Phase':<{width}} {'Calls':>6} {'Wall':>10} {'Max':>9} {'Share':>6} {'CPU':>10} {'CPU/wall':>8} "
+          f"{'Peak RSS':>10} {'Read':>10} {'Written':>10}")
+    for name in names:
+        phase = phases[name]
+        label = '  ' * name.count('/') + name.split('/')[-1] if tree else name
+        share = f"{phase['share']:.0%}" if phase['share'] is not None else '-'
+        usage = phase['cpu_time'] / phase['wall_time'] if phase['wall_time'] else 0.0
+        failed = f" ({phase['failed']} failed)" if phase['failed'] else ''
+        print(f"{label:<{width}} {phase['calls']:>6} {phase['wall_time']:>8.2f} s {phase['max_wall_time']:>7.2f} s "
+              f"{share:>6} {phase['cpu_time']:>8.2f} s {usage:>8.2f} {format_bytes(phase['peak_rss_kib'] * 1024):>10} "
+              f"{format_bytes(phase['read_bytes']):>10} {format_bytes(phase['write_bytes']):>10}{failed}")
+
+
+def print_runs(records: list[dict]) -> None:
+    """Lists the runs: their id, start, top level commands and wall time"""
+    runs = dict()
+    for record in records:
+        run = runs.setdefault(record['run'], {'start': record['start'], 'commands': dict(), 'wall_time': 0.0})
+        run['start'] = min(run['start'], record['start'])
+        if '/' not in record['phase']:
+            run['commands'][record['phase']] = None
+            run['wall_time'] += record['wall_time']
+    for run_id, run in runs.items():
+        print(f"{run_id:<28} {run['start']:<20} {run['wall_time']:>10.2f} s  {' '.join(run['commands'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='foco profile', description=__doc__)
+    parser.add_argument('commands', nargs='*', help='Commands to report (default: all)')
+    parser.add_argument('--file', default=PROFILE_FILE, help=f'Profile to read (default: {PROFILE_FILE})')
+    parser.add_argument('--run', nargs='+', default=None, help='Ids of the runs to report (see --runs)')
+    parser.add_argument('--last', type=int, default=None, help='Report the last N runs only')
+    parser.add_argument('--sort', choices=list(SORT_KEYS), default='wall', help='Sort the phases by (default: wall)')
+    parser.add_argument('--flat', action='store_true', help='Sort all phases together instead of grouping them')
+    parser.add_argument('--runs', action='store_true', help='List the recorded runs instead')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.file):
+        print(f"No profile found at {args.file}, it is written by the foco commands run in a case. Exiting.")
+        sys.exit(1)
+    records = select_runs(read_records(args.file), args.run, args.last)
+    if args.commands:
+        records = [record for record in records if record['command'] in args.commands]
+    if not records:
+        print("No records match the selection. Exiting.")
+        sys.exit(1)
+    if args.runs:
+        print_runs(records)
+    else:
+        print_phases(aggregate(records), args.sort, not args.flat)
+
+
+if __name__ == "__main__":
+    main()